@@ -0,0 +1,64 @@
+#------------------------------------------------------------------------------
+# franca_parser: benchmarks/comment_benchmark.py
+#
+# Measures parse time and retained AST size of a comment heavy model, with
+# and without Franca comments.
+#
+# Run with 'python comment_benchmark.py' from this directory.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath('..'))
+
+from franca_parser import franca_ast
+from franca_parser.franca_parser import FrancaParser
+from synthetic_corpus import generate_interface
+
+def retained_size(obj, seen=None):
+    """ Approximate number of bytes kept alive by an AST. Objects that are
+        shared with the source buffer (the input text) are not counted.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    # PyPy has no sys.getsizeof(), the default is returned there
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, franca_ast.Node):
+        size += retained_size(obj.__dict__, seen)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            size += retained_size(key, seen) + retained_size(value, seen)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            size += retained_size(item, seen)
+    return size
+
+def bench(parser, text, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        document = parser.parse(text)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, document
+
+def main():
+    text = generate_interface(0, methods=200, comment_lines=6)
+    print('Model: %d bytes, %d lines' % (len(text), text.count('\n')))
+
+    for label, drop in (('comments kept', False), ('comments dropped', True)):
+        parser = FrancaParser(drop_comments=drop)
+        elapsed, document = bench(parser, text, repeat=15)
+        # The source buffer is shared by all comments, count it separately.
+        size = retained_size(document, seen=set([id(text)]))
+        print('%-18s parse: %7.1f ms  retained AST: %8.1f KiB' % (label, elapsed * 1000.0, size / 1024.0))
+
+if __name__ == '__main__':
+    main()
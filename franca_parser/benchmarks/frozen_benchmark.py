@@ -0,0 +1,95 @@
+#------------------------------------------------------------------------------
+# franca_parser: benchmarks/frozen_benchmark.py
+#
+# Measures the memory and startup time of worker processes that
+# each load the same model (ModelSet.load()) against workers that attach to
+# a frozen model (FrozenModel.open(), see franca_frozen) written once by the
+# parent. Every worker then walks all declarations and their nodes.
+#
+# Run with 'python frozen_benchmark.py [documents] [workers]' from this
+# directory. Linux only, the memory of a worker is read from
+# /proc/self/smaps_rollup as the proportional set size, so pages shared by
+# the workers (e.g. those of the frozen model) are split between them.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath('..'))
+
+from franca_parser.franca_frozen import FrozenModel, freeze
+from franca_parser.franca_model import ModelSet
+from synthetic_corpus import generate_corpus
+
+def proportional_memory():
+    """ Proportional set size of this process, in bytes.
+    """
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def walk(model):
+    """ Touch every declaration and the attributes of its node. """
+    count = 0
+    for declaration in model.declarations():
+        node = declaration.node
+        for child_name, child in node.children():
+            count += 1
+        count += len(declaration.type_refs)
+    return count
+
+def worker(args):
+    mode, path = args
+    before = proportional_memory()
+    start = time.time()
+    if mode == 'load':
+        model = ModelSet.load([path])
+    else:
+        model = FrozenModel.open(path)
+    loaded = time.time() - start
+    walk(model)
+    return loaded, time.time() - start, proportional_memory() - before
+
+def main(argv):
+    documents = int(argv[1]) if len(argv) > 1 else 200
+    workers = int(argv[2]) if len(argv) > 2 else 4
+
+    # the workers are forked before the parent builds any model, so they
+    # start out small
+    context = multiprocessing.get_context('fork') if hasattr(multiprocessing, 'get_context') else multiprocessing
+    pools = [context.Pool(workers), context.Pool(workers)]
+    directory = tempfile.mkdtemp()
+    try:
+        for filename, text in generate_corpus(documents, methods=20, comment_lines=2):
+            with open(os.path.join(directory, filename), 'w') as f:
+                f.write(text)
+        frozen = os.path.join(directory, 'model.frozen')
+        start = time.time()
+        freeze(ModelSet.load([directory]), frozen)
+        print('%d documents, frozen in %.2f s to %.1f MiB' % (
+            documents, time.time() - start, os.path.getsize(frozen) / 1048576.0))
+
+        for pool, (mode, path) in zip(pools, (('load', directory), ('attach', frozen))):
+            results = pool.map(worker, [(mode, path)] * workers)
+            load = max(result[0] for result in results)
+            total = max(result[1] for result in results)
+            memory = sum(result[2] for result in results)
+            print('%-7s %d workers: load %7.3f s, load and walk %7.3f s, memory %8.1f MiB in total' % (
+                mode, workers, load, total, memory / 1048576.0))
+    finally:
+        for pool in pools:
+            pool.close()
+            pool.join()
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,114 @@
+#------------------------------------------------------------------------------
+# franca_parser: benchmarks/interpreter_matrix.py
+#
+# Compares the parse throughput of several Python interpreters (e.g. CPython
+# 2.7, current CPython 3 releases and PyPy) on the synthetic corpus. Every
+# interpreter runs this script as a worker, which parses the whole corpus
+# for a number of rounds and reports its timings as JSON. The first round
+# is reported separately, it includes the warm-up of PyPy's JIT.
+#
+# Run with 'python interpreter_matrix.py [interpreter ...]' from this
+# directory, by default with the interpreters from INTERPRETERS found on
+# the PATH. ply must be importable by every interpreter.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+sys.path.insert(0, os.path.abspath('..'))
+
+from synthetic_corpus import generate_corpus
+
+INTERPRETERS = ('python2.7', 'python3.8', 'python3.9', 'python3.10', 'python3.11',
+                'python3.12', 'python3.13', 'pypy', 'pypy3')
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+def find_executable(name):
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+def worker(documents, rounds):
+    """ Parse the corpus rounds times and return the timings. """
+    from franca_parser.franca_parser import FrancaParser
+
+    corpus = generate_corpus(documents, methods=20, comment_lines=2)
+    parser = FrancaParser()
+    times = []
+    for i in range(rounds):
+        start = _clock()
+        for filename, text in corpus:
+            parser.parse(text, filename)
+        times.append(_clock() - start)
+    return {
+        'implementation': platform.python_implementation(),
+        'version': platform.python_version(),
+        'documents': documents,
+        'bytes': sum(len(text) for filename, text in corpus),
+        'times': times,
+    }
+
+def run(interpreter, documents, rounds):
+    """ Run the worker with interpreter, returns its result or an error
+        message.
+    """
+    try:
+        process = subprocess.Popen([interpreter, os.path.abspath(__file__), '--worker',
+                                    '--documents', str(documents), '--rounds', str(rounds)],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError as e:
+        return str(e)
+    out, err = process.communicate()
+    if process.returncode != 0:
+        lines = err.decode('utf-8', 'replace').strip().splitlines()
+        return lines[-1] if lines else 'exit status %d' % process.returncode
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Compare the parse throughput of Python interpreters.')
+    argparser.add_argument('interpreters', nargs='*', help='interpreters to compare, the first is the baseline')
+    argparser.add_argument('--documents', type=int, default=100)
+    argparser.add_argument('--rounds', type=int, default=5)
+    argparser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = argparser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.documents, args.rounds)))
+        return 0
+
+    interpreters = args.interpreters or [name for name in INTERPRETERS if find_executable(name)]
+    if not interpreters:
+        argparser.error('no interpreters found')
+
+    print('%-14s %-18s %10s %10s %9s %8s %8s' % (
+        'interpreter', 'implementation', 'first [s]', 'best [s]', 'docs/s', 'MiB/s', 'speedup'))
+    baseline = None
+    for interpreter in interpreters:
+        result = run(interpreter, args.documents, args.rounds)
+        if not isinstance(result, dict):
+            print('%-14s failed: %s' % (interpreter, result))
+            continue
+        best = min(result['times'])
+        if baseline is None:
+            baseline = best
+        print('%-14s %-18s %10.3f %10.3f %9.1f %8.2f %7.2fx' % (
+            os.path.basename(interpreter), '%s %s' % (result['implementation'], result['version']),
+            result['times'][0], best, result['documents'] / best,
+            result['bytes'] / best / 1048576.0, baseline / best))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
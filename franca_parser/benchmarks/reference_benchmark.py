@@ -0,0 +1,58 @@
+#------------------------------------------------------------------------------
+# franca_parser: benchmarks/reference_benchmark.py
+#
+# Measures ReferenceGenerator.build() (see franca_reference) on the synthetic
+# corpus: a full build, a rebuild without changes, and a rebuild after one
+# comment changed. Model loading is not included.
+#
+# Run with 'python reference_benchmark.py [documents] [jobs] [format]' from
+# this directory.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath('..'))
+
+from franca_parser.franca_model import ModelSet
+from franca_parser.franca_reference import SEARCH_INDEX, ReferenceGenerator
+from synthetic_corpus import generate_corpus
+
+def main(argv):
+    documents = int(argv[1]) if len(argv) > 1 else 200
+    jobs = int(argv[2]) if len(argv) > 2 else None
+    format = argv[3] if len(argv) > 3 else 'html'
+
+    directory = tempfile.mkdtemp()
+    try:
+        model_set = ModelSet()
+        corpus = generate_corpus(documents, methods=20, comment_lines=2)
+        for filename, text in corpus:
+            model_set.parse(filename, text)
+        declarations = sum(1 for declaration in model_set.declarations())
+        print('%d documents, %d declarations' % (documents, declarations))
+
+        generator = ReferenceGenerator(os.path.join(directory, 'reference'), format)
+        filename, text = corpus[0]
+        runs = (('full build', None),
+                ('no changes', None),
+                ('one comment changed', (filename, text.replace('Benchmark interface', 'Changed interface'))))
+        for name, change in runs:
+            if change is not None:
+                model_set.parse(*change)
+            start = time.time()
+            result = generator.build(model_set, jobs)
+            print('%-20s %8.3f s, %5d pages rendered' % (name, time.time() - start, len(result.rendered)))
+        print('search index: %.1f KiB' % (
+            os.path.getsize(os.path.join(generator.directory, SEARCH_INDEX)) / 1024.0))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,79 @@
+#------------------------------------------------------------------------------
+# franca_parser: benchmarks/synthetic_corpus.py
+#
+# Generates synthetic Franca IDL models for benchmarking.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+
+BASIC_TYPES = ('UInt8', 'UInt16', 'UInt32', 'UInt64', 'Int32', 'Boolean',
+               'String', 'Float', 'Double', 'ByteBuffer')
+
+def _comment(lead, text, comment_lines):
+    if comment_lines <= 0:
+        return ''
+    lines = ['%s<** @description: %s' % (lead, text)]
+    for i in range(comment_lines - 1):
+        lines.append('%s    @details%d: line %d of the documentation for %s' % (lead, i, i, text))
+    lines[-1] += ' **>'
+    return '\n'.join(lines) + '\n'
+
+def generate_interface(index, methods=20, comment_lines=0, package='org.franca_parser.bench'):
+    """ Generate the text of a single .fidl document with one interface.
+
+        index:
+            Number used to make the interface and type names unique.
+
+        methods:
+            Number of methods (and of structs, enumerations and
+            broadcasts) in the interface.
+
+        comment_lines:
+            Number of lines of Franca comments attached to every
+            declaration and argument. 0 means no comments at all.
+    """
+    out = ['package %s' % package, '']
+    out.append(_comment('', 'Benchmark interface %d' % index, comment_lines) +
+               'interface Bench%d' % index)
+    out.append('{')
+    out.append('    version { major 1 minor 0 }')
+    for m in range(methods):
+        basic = BASIC_TYPES[m % len(BASIC_TYPES)]
+        out.append(_comment('    ', 'Enumeration %d' % m, comment_lines) +
+                   '    enumeration Enum%d {' % m)
+        for e in range(4):
+            out.append(_comment('        ', 'Enumerator %d' % e, comment_lines) +
+                       '        kValue%d = %d' % (e, e))
+        out.append('    }')
+        out.append(_comment('    ', 'Struct %d' % m, comment_lines) +
+                   '    struct Struct%d {' % m)
+        out.append(_comment('        ', 'Field a', comment_lines) + '        %s field_a' % basic)
+        out.append(_comment('        ', 'Field b', comment_lines) + '        Enum%d field_b' % m)
+        out.append(_comment('        ', 'Field c', comment_lines) + '        UInt32[] field_c')
+        out.append('    }')
+        out.append('    attribute Struct%d attribute%d' % (m, m))
+        out.append(_comment('    ', 'Method %d' % m, comment_lines) +
+                   '    method Method%d {' % m)
+        out.append('        in {')
+        out.append(_comment('            ', 'Argument a', comment_lines) + '            %s arg_a' % basic)
+        out.append(_comment('            ', 'Argument b', comment_lines) + '            Struct%d arg_b' % m)
+        out.append('        }')
+        out.append('        out {')
+        out.append(_comment('            ', 'Result', comment_lines) + '            Enum%d result' % m)
+        out.append('        }')
+        out.append('    }')
+        out.append(_comment('    ', 'Broadcast %d' % m, comment_lines) +
+                   '    broadcast Broadcast%d {' % m)
+        out.append('        out {')
+        out.append('            Struct%d value' % m)
+        out.append('        }')
+        out.append('    }')
+    out.append('}')
+    return '\n'.join(out) + '\n'
+
+def generate_corpus(documents=10, methods=20, comment_lines=0):
+    """ Generate a list of (filename, text) tuples.
+    """
+    return [('bench%d.fidl' % i, generate_interface(i, methods, comment_lines))
+            for i in range(documents)]
@@ -2,4 +2,4 @@
 # Author: Ingmar Lehmann (lehmann.ingmar@gmail.com) 
  
 __version__ = '0.1'
-__all__ = ['franca_parser','franca_ast','franca_lexer']
+__all__ = ['franca_parser','franca_ast','franca_lexer','franca_constants','franca_lsp','franca_model','franca_inheritance','franca_lazy','franca_query','franca_sqlindex','franca_depgraph','franca_compat','franca_generator','franca_watch','franca_loadgen','franca_cache','franca_frozen','franca_lint','franca_doxygen','franca_reference']
@@ -10,12 +10,10 @@
 # Copyright (C) 2016, Ingmar Lehmann
 # License: BSD
 #------------------------------------------------------------------------------
+import re
 import sys
 
 class Node(object):
-    def __init__(self):
-        print ("node constructor")
-    
     def children(self):
         pass
 
@@ -56,7 +54,7 @@ class Node(object):
                 attrstr = ', '.join('%s' % v for v in vlist)
             buf.write(attrstr)
 
-        if showcoord:
+        if showcoord and getattr(self, 'coord', None) is not None:
             buf.write(' (at %s)' % self.coord)
         buf.write('\n')
 
@@ -69,6 +67,62 @@ class Node(object):
                 showcoord=showcoord,
                 _my_node_name=child_name)
 
+class Coord(object):
+    """ Coordinates of a syntactic element. Consists of:
+            - File name
+            - Line number
+            - (optional) column number, for the Lexer
+    """
+    __slots__ = ('file', 'line', 'column', '__weakref__')
+
+    def __init__(self, file, line, column=None):
+        self.file = file
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        str = "%s:%s" % (self.file, self.line)
+        if self.column: str += ":%s" % self.column
+        return str
+
+class NodeVisitor(object):
+    """ A base NodeVisitor class for visiting franca_ast nodes.
+        Subclass it and define your own visit_XXX methods, where
+        XXX is the class name you want to visit with these
+        methods.
+
+        For example:
+
+        class MethodNameCollector(NodeVisitor):
+            def __init__(self):
+                self.names = []
+
+            def visit_Method(self, node):
+                self.names.append(node.name.id)
+                self.generic_visit(node)
+
+        Notes:
+
+        *   generic_visit() will be called for AST nodes for which
+            no visit_XXX method was defined.
+        *   The children of nodes for which a visit_XXX was
+            defined will not be visited - if you need this, call
+            generic_visit() on the node.
+    """
+    def visit(self, node):
+        """ Visit a node.
+        """
+        method = 'visit_' + node.__class__.__name__
+        visitor = getattr(self, method, self.generic_visit)
+        return visitor(node)
+
+    def generic_visit(self, node):
+        """ Called if no explicit visitor function exists for a
+            node. Implements preorder visiting of the node.
+        """
+        for c_name, c in node.children():
+            self.visit(c)
+
 class ArrayTypeDeclaration(Node):
     def __init__(self, typename, type, dimension):
         self.typename = typename
@@ -96,6 +150,36 @@ class Attribute(Node):
 
     attr_names = ()
 
+# Expression nodes (BinaryOp, UnaryOp, Reference, the constants and String)
+# have a 'folded' attribute: the value the parser computed for them, an int,
+# float, bool or str, or None if it depends on a Reference or could not be
+# computed. See franca_constants and franca_model.ConstantEvaluator.
+class BinaryOp(Node):
+    def __init__(self, op, left, right, folded=None, coord=None):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.folded = folded
+        self.coord = coord
+
+    def children(self):
+        nodelist = []
+        if self.left is not None: nodelist.append(("left", self.left))
+        if self.right is not None: nodelist.append(("right", self.right))
+        return tuple(nodelist)
+
+    attr_names = ('op',)
+
+class BooleanConstant(Node):
+    def __init__(self, value, folded=None):
+        self.value = value
+        self.folded = folded
+
+    def children(self):
+        return tuple()
+
+    attr_names = ('value',)
+
 class BroadcastMethod(Node):
     def __init__(self, name, comment, out_args, is_selective=False):
         self.name = name
@@ -125,23 +209,33 @@ class ComplexTypeDeclarationList(Node):
     attr_names = ()
 
 class Constant(Node):
-    def __init__(self, comment):
+    def __init__(self, typename, name, value, comment=None):
+        self.typename = typename
+        self.name = name
         self.value = value
+        self.comment = comment
 
     def children(self):
-        return tuple()
+        nodelist = []
+        if self.typename is not None: nodelist.append(("typename", self.typename))
+        if self.name is not None: nodelist.append(("name", self.name))
+        if self.value is not None: nodelist.append(("value", self.value))
+        if self.comment is not None: nodelist.append(("comment", self.comment))
+        return tuple(nodelist)
 
-    attr_names = ('value',)
+    attr_names = ()
 
 class Enum(Node):
-    def __init__(self, name, values, comment=None):
+    def __init__(self, name, values, comment=None, base=None):
         self.name = name
         self.values = values
         self.comment = comment
+        self.base = base
     
     def children(self):
         nodelist = []
         if self.name is not None: nodelist.append(("name", self.name))
+        if self.base is not None: nodelist.append(("base", self.base))
         if self.values is not None: nodelist.append(("values", self.values))
         if self.comment is not None: nodelist.append(("comment", self.comment))
         return tuple(nodelist)
@@ -175,9 +269,77 @@ class EnumeratorList(Node):
 
     attr_names = ()
 
+class FloatConstant(Node):
+    def __init__(self, value, folded=None):
+        self.value = value
+        self.folded = folded
+
+    def children(self):
+        return tuple()
+
+    attr_names = ('value',)
+
 class FrancaComment(Node):
-    def __init__(self, comment):
-        self.comment = comment
+    """ A Franca documentation comment (<** ... **>).
+
+        The comment does not own a copy of its text. It keeps a
+        reference to the source buffer it was lexed from and the
+        [start, end) span of the comment inside that buffer. The raw
+        text and the parsed tags are only produced when first accessed,
+        and cached afterwards.
+    """
+    _tag_re = re.compile(r'@(\w+)\s*:')
+
+    def __init__(self, source, start=None, end=None):
+        if start is None:
+            # Plain string comment, e.g. built by hand.
+            start, end = 0, len(source)
+        self.source = source
+        self.start = start
+        self.end = end
+        self._comment = None
+        self._tags = None
+
+    @property
+    def comment(self):
+        """ The raw comment text, including the <** and **> delimiters.
+        """
+        if self._comment is None:
+            self._comment = self.source[self.start:self.end]
+        return self._comment
+
+    @property
+    def text(self):
+        """ The comment text with the <** and **> delimiters stripped.
+        """
+        return self.comment.lstrip('<').lstrip('*').rstrip('>').rstrip('*').strip()
+
+    @property
+    def tags(self):
+        """ A {tag: value} dictionary of the '@tag: value' entries in the
+            comment, e.g. {'description': 'Adds two numbers'}. If a tag
+            occurs more than once, the last value wins.
+        """
+        if self._tags is None:
+            self._tags = self.parse_tags(self.text)
+        return self._tags
+
+    @classmethod
+    def parse_tags(cls, text):
+        """ Returns the {tag: value} dictionary of a comment text.
+        """
+        tags = {}
+        matches = list(cls._tag_re.finditer(text))
+        for i, match in enumerate(matches):
+            if i + 1 < len(matches):
+                value_end = matches[i + 1].start()
+            else:
+                value_end = len(text)
+            tags[match.group(1)] = text[match.end():value_end].strip()
+        return tags
+
+    def tag(self, name, default=None):
+        return self.tags.get(name, default)
 
     def children(self):
         return tuple()
@@ -200,8 +362,9 @@ class FrancaDocument(Node):
     attr_names = ()
 
 class ID(Node):
-    def __init__(self, id):
+    def __init__(self, id, coord=None):
         self.id = id
+        self.coord = coord
 
     def children(self):
         return tuple()
@@ -244,8 +407,9 @@ class ImportStatementList(Node):
     attr_names = ()
 
 class IntegerConstant(Node):
-    def __init__(self, value):
+    def __init__(self, value, folded=None):
         self.value = value
+        self.folded = folded
 
     def children(self):
         return tuple()
@@ -253,14 +417,16 @@ class IntegerConstant(Node):
     attr_names = ('value',)
 
 class Interface(Node):
-    def __init__(self, name, members, comment=None):
+    def __init__(self, name, members, comment=None, base=None):
         self.name = name
         self.members = members
         self.comment = comment
+        self.base = base
 
     def children(self):
         nodelist = []
         if self.name is not None: nodelist.append(("name", self.name))
+        if self.base is not None: nodelist.append(("base", self.base))
         if self.members is not None: nodelist.append(("members", self.members))
         if self.comment is not None: nodelist.append(("comment", self.comment))
         return tuple(nodelist)
@@ -382,6 +548,17 @@ class PackageIdentifier(Node):
 
     attr_names = ('package_identifier',)
 
+class Reference(Node):
+    def __init__(self, name, coord=None):
+        self.name = name
+        self.coord = coord
+        self.folded = None
+
+    def children(self):
+        return tuple()
+
+    attr_names = ('name',)
+
 class RootLevelObjectList(Node):
     def __init__(self, root_level_objects):
         self.members = root_level_objects
@@ -395,8 +572,9 @@ class RootLevelObjectList(Node):
     attr_names = ()
 
 class String(Node):
-    def __init__(self, string):
+    def __init__(self, string, folded=None):
         self.string = string
+        self.folded = folded
 
     def children(self):
         return tuple()
@@ -404,19 +582,22 @@ class String(Node):
     attr_names = ('string',)
 
 class Struct(Node):
-    def __init__(self, name, struct_members, comment=None):
+    def __init__(self, name, struct_members, comment=None, base=None, is_polymorphic=False):
         self.name = name
         self.struct_members = struct_members
         self.comment = comment
+        self.base = base
+        self.is_polymorphic = is_polymorphic
     
     def children(self):
         nodelist = []
         if self.name is not None: nodelist.append(("name", self.name))
+        if self.base is not None: nodelist.append(("base", self.base))
         if self.struct_members is not None: nodelist.append(("struct_members", self.struct_members))
         if self.comment is not None: nodelist.append(("comment", self.comment))
         return tuple(nodelist)
 
-    attr_names = ()
+    attr_names = ('is_polymorphic',)
 
 class TypeCollection(Node):
     def __init__(self, name, members, comment=None):
@@ -447,8 +628,9 @@ class Typedef(Node):
     attr_names = ()
 
 class Typename(Node):
-    def __init__(self, typename):
+    def __init__(self, typename, coord=None):
         self.typename = typename
+        self.coord = coord
 
     def children(self):
         nodelist = []
@@ -457,15 +639,31 @@ class Typename(Node):
 
     attr_names = ('typename',)
 
+class UnaryOp(Node):
+    def __init__(self, op, expr, folded=None, coord=None):
+        self.op = op
+        self.expr = expr
+        self.folded = folded
+        self.coord = coord
+
+    def children(self):
+        nodelist = []
+        if self.expr is not None: nodelist.append(("expr", self.expr))
+        return tuple(nodelist)
+
+    attr_names = ('op',)
+
 class Union(Node):
-    def __init__(self, name, member_list, comment=None):
+    def __init__(self, name, member_list, comment=None, base=None):
         self.name = name
         self.member_list = member_list
         self.comment = comment
+        self.base = base
 
     def children(self):
         nodelist = []
         if self.name is not None: nodelist.append(("name", self.name))
+        if self.base is not None: nodelist.append(("base", self.base))
         if self.member_list is not None: nodelist.append(("member_list", self.member_list))
         if self.comment is not None: nodelist.append(("comment", self.comment))
         return tuple(nodelist)
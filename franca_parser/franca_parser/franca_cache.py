@@ -0,0 +1,172 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_cache.py
+#
+# ParseCache class: In-process cache of parse results, for processes that
+#                   parse the same .fidl contents over and over (test
+#                   suites, the language server).
+#
+# Results are keyed by a hash of the source text and the file name (which
+# ends up in the coordinates of the nodes) and evicted least recently used
+# first, within a budget of entries and bytes. The cache keeps a pickled
+# snapshot of every document instead of the document itself, and a hit
+# unpickles it, so every caller gets a tree of its own and nothing a caller
+# does to it can corrupt the cached result. Unpickling is several times
+# faster than parsing.
+#
+# ParseCache has the parse() and parse_many() methods of FrancaParser, so it
+# can be passed wherever a parser is, e.g. to ModelSet:
+#
+#   cache = ParseCache(max_bytes=64 * 1024 * 1024)
+#   model_set = ModelSet.load(['models/'], parser=cache)
+#   print(cache.stats())
+#
+# Parsers are reentrant, so shared_parser() hands out one ready-to-use
+# FrancaParser per configuration for the whole process instead of building
+# the lexer and parsing tables again for every user.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+import hashlib
+import threading
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from collections import OrderedDict, namedtuple
+
+from .franca_parser import FrancaParser, ParseResult
+
+# Result of ParseCache.stats(). size is the number of bytes of the cached
+# snapshots.
+CacheStats = namedtuple('CacheStats', 'hits misses evictions entries size')
+
+_shared_parsers = {}
+_shared_lock = threading.Lock()
+
+def shared_parser(drop_comments=False):
+    """ Returns the FrancaParser of the process for drop_comments,
+        created on first use. It reports errors to the error_func given
+        to its parse() calls, or prints them.
+    """
+    with _shared_lock:
+        parser = _shared_parsers.get(drop_comments)
+        if parser is None:
+            parser = _shared_parsers[drop_comments] = FrancaParser(drop_comments)
+        return parser
+
+class ParseCache(object):
+    """ LRU cache of parse results.
+
+        max_entries:
+            Number of documents kept at most, None for no limit.
+
+        max_bytes:
+            Total size of the pickled documents kept at most, None for
+            no limit. A document larger than this is not cached.
+
+        parser:
+            The FrancaParser that parses the misses, shared_parser() by
+            default.
+
+        The cache can be used from several threads.
+    """
+    def __init__(self, max_entries=512, max_bytes=None, parser=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.parser = parser if parser is not None else shared_parser()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, filename):
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        return (hashlib.sha1(text).digest(), filename)
+
+    def parse(self, text, filename='', error_func=None):
+        """ Same as FrancaParser.parse(). The errors of a cached result are
+            reported again to error_func.
+        """
+        key = self.key(text, filename)
+        result = self._lookup(key, filename)
+        if result is None:
+            errors = []
+            document = self.parser.parse(text, filename,
+                                         lambda msg, line, column: errors.append((msg, line, column)))
+            result = ParseResult(filename, document, errors)
+            self._store(key, result)
+        for msg, line, column in result.errors:
+            (error_func or self.parser.error_func)(msg, line, column)
+        return result.document
+
+    def parse_many(self, sources, max_workers=None):
+        """ Same as FrancaParser.parse_many(), only the sources that are
+            not cached are parsed.
+        """
+        sources = list(sources)
+        results = [None] * len(sources)
+        keys = {}
+        misses = []
+        for index, (filename, text) in enumerate(sources):
+            keys[index] = self.key(text, filename)
+            results[index] = self._lookup(keys[index], filename)
+            if results[index] is None:
+                misses.append(index)
+        parsed = self.parser.parse_many([sources[index] for index in misses], max_workers)
+        for index, result in zip(misses, parsed):
+            self._store(keys[index], result)
+            results[index] = result
+        return results
+
+    def _lookup(self, key, filename):
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            # most recently used last
+            del self._entries[key]
+            self._entries[key] = snapshot
+        document, errors = pickle.loads(snapshot)
+        return ParseResult(filename, document, errors)
+
+    def _store(self, key, result):
+        try:
+            snapshot = pickle.dumps((result.document, result.errors), pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # e.g. too deeply nested to pickle, parse it again next time
+            return
+        if self.max_bytes is not None and len(snapshot) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = snapshot
+            self._size += len(snapshot)
+            while ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                   (self.max_bytes is not None and self._size > self.max_bytes)):
+                key, snapshot = self._entries.popitem(last=False)
+                self._size -= len(snapshot)
+                self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._entries), self._size)
+
+    def clear(self):
+        """ Drop all cached documents. The statistics are kept. """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,481 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_compat.py
+#
+# Compatibility checker: compares two revisions of a set of Franca models and
+#                        reports API/ABI breaking changes, compatible changes
+#                        and whether the interface versions were bumped
+#                        accordingly.
+#
+# Every declaration gets a structural (Merkle style) hash, computed bottom up
+# from its children. Comments and source positions are not part of the hash.
+# Declarations with equal hashes in both revisions are skipped without
+# looking at their contents.
+#
+# Run 'python -m franca_parser.franca_compat OLD NEW' to compare two model
+# trees.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import sys
+
+from . import franca_ast
+from .franca_depgraph import DependencyGraph
+from .franca_inheritance import base_name
+from .franca_constants import ConstantError
+from .franca_model import (ROOT_KINDS, ConstantEvaluator, ModelSet,
+                           method_arguments, typename_text, version_of)
+
+BREAKING = 'breaking'
+COMPATIBLE = 'compatible'
+INFO = 'info'
+
+_SEVERITY_ORDER = {None: 0, INFO: 1, COMPATIBLE: 2, BREAKING: 3}
+
+class StructuralHasher(object):
+    """ Computes structural hashes of AST nodes. The hash of a node covers
+        its class, its attributes and the hashes of its children, so two
+        subtrees have the same hash if and only if they describe the same
+        declarations. Hashes are cached per node.
+
+        include_comments:
+            If True, FrancaComment nodes are part of the hash.
+    """
+    def __init__(self, include_comments=False):
+        self.include_comments = include_comments
+        self._cache = {}
+
+    def hash(self, node):
+        key = id(node)
+        digest = self._cache.get(key)
+        if digest is not None:
+            return digest[0]
+        h = hashlib.sha1(node.__class__.__name__.encode('utf-8'))
+        for name in node.attr_names:
+            if name == 'comment' and not self.include_comments:
+                continue
+            value = getattr(node, name)
+            if not isinstance(value, franca_ast.Node):
+                h.update(('\0%s=%r' % (name, value)).encode('utf-8'))
+        for child_name, child in node.children():
+            if isinstance(child, franca_ast.FrancaComment) and not self.include_comments:
+                continue
+            h.update(('\0' + child_name + '\0' + self.hash(child)).encode('utf-8'))
+        digest = h.hexdigest()
+        # keep the node alive while its id is used as key
+        self._cache[key] = (digest, node)
+        return digest
+
+class Change(object):
+    """ A single difference between two revisions.
+
+        severity:
+            BREAKING, COMPATIBLE or INFO.
+
+        path:
+            Qualified name of the changed declaration.
+    """
+    __slots__ = ('severity', 'path', 'message')
+
+    def __init__(self, severity, path, message):
+        self.severity = severity
+        self.path = path
+        self.message = message
+
+    def to_dict(self):
+        return {'severity': self.severity, 'path': self.path, 'message': self.message}
+
+class RootReport(object):
+    """ The changes of one interface or type collection.
+
+        status:
+            'added', 'removed' or 'changed'.
+    """
+    def __init__(self, kind, name, status, old_version=None, new_version=None):
+        self.kind = kind
+        self.name = name
+        self.status = status
+        self.old_version = old_version
+        self.new_version = new_version
+        self.changes = []
+
+    def add(self, severity, path, message):
+        self.changes.append(Change(severity, path, message))
+
+    @property
+    def severity(self):
+        severity = None
+        for change in self.changes:
+            if _SEVERITY_ORDER[change.severity] > _SEVERITY_ORDER[severity]:
+                severity = change.severity
+        return severity
+
+    @property
+    def required_bump(self):
+        """ 'major', 'minor' or 'none'.
+        """
+        severity = self.severity
+        if severity == BREAKING:
+            return 'major'
+        if severity == COMPATIBLE:
+            return 'minor'
+        return 'none'
+
+    @property
+    def version_ok(self):
+        """ True if the version change matches the required bump, None if
+            it cannot be checked (added or removed, or no version).
+        """
+        if self.status != 'changed' or self.old_version is None or self.new_version is None:
+            return None
+        old, new = self.old_version, self.new_version
+        required = self.required_bump
+        if required == 'major':
+            return new[0] > old[0]
+        if required == 'minor':
+            return new[0] > old[0] or (new[0] == old[0] and new[1] > old[1])
+        return new >= old
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'status': self.status,
+            'old_version': list(self.old_version) if self.old_version else None,
+            'new_version': list(self.new_version) if self.new_version else None,
+            'required_bump': self.required_bump,
+            'version_ok': self.version_ok,
+            'changes': [change.to_dict() for change in self.changes],
+        }
+
+class CompatibilityReport(object):
+    """ Result of check_compatibility(). roots holds a RootReport for
+        every interface or type collection that was added, removed or
+        changed, sorted by name.
+    """
+    def __init__(self, roots, unchanged):
+        self.roots = roots
+        self.unchanged = unchanged
+
+    @property
+    def compatible(self):
+        """ True if there are no breaking changes.
+        """
+        return all(root.severity != BREAKING for root in self.roots)
+
+    @property
+    def versions_ok(self):
+        """ True if no version check failed.
+        """
+        return all(root.version_ok is not False for root in self.roots)
+
+    def to_dict(self):
+        return {
+            'compatible': self.compatible,
+            'versions_ok': self.versions_ok,
+            'unchanged': self.unchanged,
+            'roots': [root.to_dict() for root in self.roots],
+        }
+
+def _signature(arguments):
+    return [(argument.name.id, typename_text(argument.type)) for argument in arguments]
+
+def _constant_value(constants, declaration):
+    try:
+        return constants.value(declaration)
+    except ConstantError:
+        return 'invalid'
+
+def _enumerator_values(constants, declaration):
+    table = constants.enumeration(declaration)
+    values = dict(table.by_name)
+    values.update((name, 'invalid') for name in table.errors)
+    return values
+
+class _Comparer(object):
+    """ Compares two revisions of a declaration and adds the differences
+        to a RootReport.
+    """
+    def __init__(self, report, old_hasher, new_hasher, old_constants, new_constants):
+        self.report = report
+        self.old_hasher = old_hasher
+        self.new_hasher = new_hasher
+        self.old_constants = old_constants
+        self.new_constants = new_constants
+
+    def compare(self, path, kind, old, new):
+        if self.old_hasher.hash(old.node) == self.new_hasher.hash(new.node):
+            if kind not in ('constant', 'enumeration'):
+                return
+            # the value may still depend on a changed constant
+            getattr(self, '_compare_' + kind)(path, old, new)
+            return
+        before = len(self.report.changes)
+        method = getattr(self, '_compare_' + kind, None)
+        if method is not None:
+            method(path, old, new)
+        if len(self.report.changes) == before:
+            self.report.add(INFO, path, '%s changed' % kind)
+
+    def _compare_base(self, path, old, new):
+        old_base, new_base = base_name(old), base_name(new)
+        if old_base != new_base:
+            self.report.add(BREAKING, path, 'base changed from %s to %s' % (old_base, new_base))
+        if getattr(old.node, 'is_polymorphic', False) != getattr(new.node, 'is_polymorphic', False):
+            self.report.add(BREAKING, path, 'polymorphic changed')
+
+    def _compare_fields(self, path, old, new):
+        self._compare_base(path, old, new)
+        old_fields = [(field.name, typename_text(field.node.typename)) for field in old.members()]
+        new_fields = [(field.name, typename_text(field.node.typename)) for field in new.members()]
+        old_types = dict(old_fields)
+        new_types = dict(new_fields)
+        for name, type_name in old_fields:
+            if name not in new_types:
+                self.report.add(BREAKING, path + '.' + name, 'member removed')
+            elif new_types[name] != type_name:
+                self.report.add(BREAKING, path + '.' + name,
+                                'member type changed from %s to %s' % (type_name, new_types[name]))
+        for name, type_name in new_fields:
+            if name not in old_types:
+                self.report.add(BREAKING, path + '.' + name, 'member added')
+        old_order = [name for name, type_name in old_fields if name in new_types]
+        new_order = [name for name, type_name in new_fields if name in old_types]
+        if old_order != new_order:
+            self.report.add(BREAKING, path, 'members reordered')
+
+    _compare_struct = _compare_fields
+    _compare_union = _compare_fields
+
+    def _compare_enumeration(self, path, old, new):
+        self._compare_base(path, old, new)
+        old_values = _enumerator_values(self.old_constants, old)
+        new_values = _enumerator_values(self.new_constants, new)
+        for name, value in old_values.items():
+            if name not in new_values:
+                self.report.add(BREAKING, path + '.' + name, 'enumerator removed')
+            elif new_values[name] != value:
+                self.report.add(BREAKING, path + '.' + name,
+                                'enumerator value changed from %s to %s' % (value, new_values[name]))
+        for name in new_values:
+            if name not in old_values:
+                self.report.add(COMPATIBLE, path + '.' + name, 'enumerator added')
+
+    def _compare_type(self, path, what, old_type, new_type):
+        if old_type != new_type:
+            self.report.add(BREAKING, path, '%s changed from %s to %s' % (what, old_type, new_type))
+
+    def _compare_map(self, path, old, new):
+        self._compare_type(path, 'key type', typename_text(old.node.key_type), typename_text(new.node.key_type))
+        self._compare_type(path, 'value type', typename_text(old.node.value_type), typename_text(new.node.value_type))
+
+    def _compare_typedef(self, path, old, new):
+        self._compare_type(path, 'type', typename_text(old.node.existing_type), typename_text(new.node.existing_type))
+
+    def _compare_array(self, path, old, new):
+        self._compare_type(path, 'element type', typename_text(old.node.type), typename_text(new.node.type))
+
+    def _compare_constant(self, path, old, new):
+        self._compare_type(path, 'type', typename_text(old.node.typename), typename_text(new.node.typename))
+        old_value = _constant_value(self.old_constants, old)
+        new_value = _constant_value(self.new_constants, new)
+        if old_value != new_value:
+            self.report.add(BREAKING, path, 'value changed from %s to %s' % (old_value, new_value))
+
+    def _compare_attribute(self, path, old, new):
+        self._compare_type(path, 'type', typename_text(old.node.typename), typename_text(new.node.typename))
+
+    def _compare_arguments(self, path, direction, old_args, new_args):
+        old_signature = _signature(old_args)
+        new_signature = _signature(new_args)
+        if [t for n, t in old_signature] != [t for n, t in new_signature]:
+            self.report.add(BREAKING, path, '%s arguments changed from (%s) to (%s)' % (
+                direction,
+                ', '.join('%s %s' % (t, n) for n, t in old_signature),
+                ', '.join('%s %s' % (t, n) for n, t in new_signature)))
+        elif old_signature != new_signature:
+            self.report.add(INFO, path, '%s arguments renamed' % direction)
+
+    def _compare_method(self, path, old, new):
+        if old.node.is_fire_and_forget != new.node.is_fire_and_forget:
+            self.report.add(BREAKING, path, 'fireAndForget changed')
+        old_in, old_out = method_arguments(old.node)
+        new_in, new_out = method_arguments(new.node)
+        self._compare_arguments(path, 'in', old_in, new_in)
+        self._compare_arguments(path, 'out', old_out, new_out)
+
+    def _compare_broadcast(self, path, old, new):
+        if old.node.is_selective != new.node.is_selective:
+            self.report.add(BREAKING, path, 'selective changed')
+        self._compare_arguments(path, 'out', method_arguments(old.node)[1], method_arguments(new.node)[1])
+
+def _roots(model_set):
+    roots = {}
+    for declaration in model_set.declarations():
+        if declaration.kind in ROOT_KINDS:
+            roots[declaration.qualified_name] = declaration
+    return roots
+
+def _compare_members(comparer, report, old, new, changed_types, kinds=None):
+    """ Compares the members of two revisions of an interface or type
+        collection (only those of the given kinds, if not None), adding
+        the changed types to changed_types.
+    """
+    name = report.name
+    old_members = dict(((member.kind, member.name), member) for member in old.members()
+                       if kinds is None or member.kind in kinds)
+    new_members = dict(((member.kind, member.name), member) for member in new.members()
+                       if kinds is None or member.kind in kinds)
+    for key in sorted(set(old_members) | set(new_members)):
+        kind, member_name = key
+        path = name + '.' + member_name
+        if key not in new_members:
+            report.add(BREAKING, path, '%s removed' % kind)
+        elif key not in old_members:
+            report.add(COMPATIBLE, path, '%s added' % kind)
+        else:
+            before = len(report.changes)
+            comparer.compare(path, kind, old_members[key], new_members[key])
+            if len(report.changes) > before and kind not in ('method', 'broadcast', 'attribute'):
+                changed_types.append((new_members[key], report.changes[before:]))
+
+# Kinds whose values may come from constants of other interfaces or type
+# collections.
+_VALUE_KINDS = ('constant', 'enumeration')
+
+def _has_values(*roots):
+    return any(member.kind in _VALUE_KINDS for root in roots if root is not None
+               for member in root.members())
+
+def check_compatibility(old_models, new_models):
+    """ Compare two ModelSets and return a CompatibilityReport.
+
+        Changes of a type are also reported for every interface and type
+        collection of the new revision using that type, directly or
+        through other types, and changes of an interface for every
+        interface extending it. If constants or enumerations changed,
+        the values of the constants and enumerators of the unchanged
+        interfaces and type collections are compared as well, since
+        they may be computed from the changed ones.
+    """
+    old_hasher = StructuralHasher()
+    new_hasher = StructuralHasher()
+    old_constants = ConstantEvaluator(old_models)
+    new_constants = ConstantEvaluator(new_models)
+    old_roots = _roots(old_models)
+    new_roots = _roots(new_models)
+    reports = {}
+    unchanged = []
+    values_changed = False
+    changed_types = []
+
+    for name in sorted(set(old_roots) | set(new_roots)):
+        old, new = old_roots.get(name), new_roots.get(name)
+        if new is None:
+            report = RootReport(old.kind, name, 'removed', version_of(old.node))
+            report.add(BREAKING, name, '%s removed' % old.kind)
+            reports[name] = report
+        elif old is None:
+            report = RootReport(new.kind, name, 'added', None, version_of(new.node))
+            report.add(COMPATIBLE, name, '%s added' % new.kind)
+            reports[name] = report
+        elif old_hasher.hash(old.node) == new_hasher.hash(new.node):
+            unchanged.append(name)
+            continue
+        else:
+            report = RootReport(new.kind, name, 'changed', version_of(old.node), version_of(new.node))
+            comparer = _Comparer(report, old_hasher, new_hasher, old_constants, new_constants)
+            comparer._compare_base(name, old, new)
+            _compare_members(comparer, report, old, new, changed_types)
+            if new.kind == 'interface' and report.changes:
+                # interfaces extending this one change as well
+                changed_types.append((new, list(report.changes)))
+            reports[name] = report
+        values_changed = values_changed or _has_values(old, new)
+
+    if values_changed:
+        for name in list(unchanged):
+            old, new = old_roots[name], new_roots[name]
+            report = RootReport(new.kind, name, 'changed', version_of(old.node), version_of(new.node))
+            comparer = _Comparer(report, old_hasher, new_hasher, old_constants, new_constants)
+            _compare_members(comparer, report, old, new, changed_types, _VALUE_KINDS)
+            if report.changes:
+                reports[name] = report
+                unchanged.remove(name)
+    unchanged = len(unchanged)
+
+    # Propagate type (and constant) changes to the interfaces using them
+    if changed_types:
+        graph = DependencyGraph(new_models)
+        for declaration, changes in changed_types:
+            severity = max((change.severity for change in changes), key=lambda s: _SEVERITY_ORDER[s])
+            if severity == INFO:
+                continue
+            path = declaration.qualified_name
+            for root in graph.impact(changed_declarations=[declaration]).roots:
+                if root is declaration.root():
+                    continue
+                name = root.qualified_name
+                report = reports.get(name)
+                if report is None:
+                    old = old_roots.get(name)
+                    if old is None:
+                        continue
+                    report = reports[name] = RootReport(root.kind, name, 'changed',
+                                                        version_of(old.node), version_of(root.node))
+                    unchanged -= 1
+                if declaration.kind == 'interface':
+                    report.add(severity, path, 'extends changed interface %s' % path)
+                elif declaration.kind == 'constant':
+                    report.add(severity, path, 'uses changed constant %s' % path)
+                else:
+                    report.add(severity, path, 'uses changed type %s' % path)
+
+    return CompatibilityReport([reports[name] for name in sorted(reports)], unchanged)
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Check the compatibility of two revisions of a set of Franca models.')
+    argparser.add_argument('old', help='.fidl file or directory of the old revision')
+    argparser.add_argument('new', help='.fidl file or directory of the new revision')
+    argparser.add_argument('--format', choices=('text', 'json'), default='text')
+    argparser.add_argument('--strict', action='store_true',
+                           help='fail on breaking changes even if the major version was increased')
+    args = argparser.parse_args(argv)
+
+    models = []
+    for path in (args.old, args.new):
+        model_set = ModelSet.load([path])
+        for filename, msg, line, column in model_set.errors:
+            print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+        models.append(model_set)
+
+    report = check_compatibility(models[0], models[1])
+    if args.format == 'json':
+        json.dump(report.to_dict(), sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        for root in report.roots:
+            versions = ''
+            if root.old_version or root.new_version:
+                versions = ' %s -> %s' % (
+                    '.'.join(map(str, root.old_version)) if root.old_version else '-',
+                    '.'.join(map(str, root.new_version)) if root.new_version else '-')
+            verdict = {True: 'version ok', False: 'VERSION MISMATCH', None: ''}[root.version_ok]
+            print('%s %s: %s%s, requires %s bump %s' % (root.kind, root.name, root.status, versions,
+                                                        root.required_bump, verdict))
+            for change in root.changes:
+                print('    %-10s %s: %s' % (change.severity, change.path, change.message))
+        print('%d unchanged, %s' % (report.unchanged, 'compatible' if report.compatible else 'NOT compatible'))
+
+    if not report.versions_ok or (args.strict and not report.compatible):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_constants.py
+#
+# Values of Franca constant expressions: conversion of literals, folding of
+# unary and binary operators and the checks of a value against the declared
+# type of a constant.
+#
+# The parser folds every expression that only uses literals while building
+# the AST and stores the result in the 'folded' attribute of the expression
+# node. Expressions referencing other constants or enumerators are evaluated
+# by franca_model.ConstantEvaluator, with the same functions.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+
+class ConstantError(Exception):
+    """ An expression that cannot be evaluated, e.g. a division by zero or
+        an operator applied to operands of the wrong type.
+    """
+    pass
+
+# Integer type name -> (minimum, maximum). Integer is unbounded.
+INTEGER_RANGES = {
+    'Int8': (-2**7, 2**7 - 1),
+    'Int16': (-2**15, 2**15 - 1),
+    'Int32': (-2**31, 2**31 - 1),
+    'Int64': (-2**63, 2**63 - 1),
+    'UInt8': (0, 2**8 - 1),
+    'UInt16': (0, 2**16 - 1),
+    'UInt32': (0, 2**32 - 1),
+    'UInt64': (0, 2**64 - 1),
+    'Integer': (None, None),
+}
+
+FLOAT_TYPES = ('Float', 'Double')
+
+try:
+    _INTEGER_TYPES = (int, long)
+    _STRING_TYPES = (basestring,)
+except NameError:
+    _INTEGER_TYPES = (int,)
+    _STRING_TYPES = (str,)
+
+def integer_value(text):
+    """ Returns the int value of an integer literal (decimal, hex, binary
+        or octal, with an optional C style suffix).
+    """
+    text = text.rstrip('uUlL')
+    if text[:2] in ('0x', '0X'):
+        return int(text[2:], 16)
+    if text[:2] in ('0b', '0B'):
+        return int(text[2:], 2)
+    if len(text) > 1 and text[0] == '0':
+        return int(text[1:], 8)
+    return int(text)
+
+def float_value(text):
+    """ Returns the float value of a (decimal or hex) floating literal,
+        with an optional suffix, e.g. '1.5f' or '2e3d'.
+    """
+    if text[:2] in ('0x', '0X'):
+        text = text.rstrip('fFlL')
+        return float.fromhex(text)
+    return float(text.rstrip('fFlLdD'))
+
+def string_value(text):
+    """ Returns the contents of a string literal, without the quotes.
+    """
+    return text[1:-1]
+
+def is_integer(value):
+    return isinstance(value, _INTEGER_TYPES) and not isinstance(value, bool)
+
+def is_number(value):
+    return is_integer(value) or isinstance(value, float)
+
+def is_string(value):
+    return isinstance(value, _STRING_TYPES)
+
+def _require(condition, op, *operands):
+    if not condition:
+        raise ConstantError("operator %s not applicable to %s" % (
+            op, ' and '.join(_describe(operand) for operand in operands)))
+
+def _describe(value):
+    if isinstance(value, bool):
+        return 'Boolean'
+    if is_integer(value):
+        return 'integer'
+    if isinstance(value, float):
+        return 'float'
+    return 'String'
+
+def _divide(left, right):
+    if right == 0:
+        raise ConstantError('division by zero')
+    if isinstance(left, float) or isinstance(right, float):
+        return left / float(right)
+    # integer division truncates towards zero, as in the generated code
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+def _modulo(left, right):
+    if right == 0:
+        raise ConstantError('division by zero')
+    return left - right * _divide(left, right)
+
+# Larger shifts cannot be meant for any of the Franca integer types.
+_MAX_SHIFT = 128
+
+def _shift(op, left, right):
+    if not 0 <= right <= _MAX_SHIFT:
+        raise ConstantError('shift count %d out of range' % right)
+    return left << right if op == '<<' else left >> right
+
+_ARITHMETIC = {
+    '+': lambda left, right: left + right,
+    '-': lambda left, right: left - right,
+    '*': lambda left, right: left * right,
+    '/': _divide,
+    '%': _modulo,
+}
+
+_BITWISE = {
+    '&': lambda left, right: left & right,
+    '|': lambda left, right: left | right,
+    '^': lambda left, right: left ^ right,
+}
+
+_COMPARISON = {
+    '<': lambda left, right: left < right,
+    '<=': lambda left, right: left <= right,
+    '>': lambda left, right: left > right,
+    '>=': lambda left, right: left >= right,
+}
+
+def fold_unary(op, operand):
+    """ Returns the value of the unary operator op ('-', '+', '~' or '!')
+        applied to operand. Raises ConstantError if it is not applicable.
+    """
+    if op in ('-', '+'):
+        _require(is_number(operand), op, operand)
+        return -operand if op == '-' else operand
+    if op == '~':
+        _require(is_integer(operand), op, operand)
+        return ~operand
+    _require(isinstance(operand, bool), op, operand)
+    return not operand
+
+def fold_binary(op, left, right):
+    """ Returns the value of the binary operator op applied to left and
+        right. Raises ConstantError if it is not applicable.
+    """
+    if op in _ARITHMETIC:
+        if op == '+' and is_string(left) and is_string(right):
+            return left + right
+        _require(is_number(left) and is_number(right), op, left, right)
+        if op == '%':
+            _require(is_integer(left) and is_integer(right), op, left, right)
+        return _ARITHMETIC[op](left, right)
+    if op in _BITWISE:
+        _require(is_integer(left) and is_integer(right), op, left, right)
+        return _BITWISE[op](left, right)
+    if op in ('<<', '>>'):
+        _require(is_integer(left) and is_integer(right), op, left, right)
+        return _shift(op, left, right)
+    if op in _COMPARISON:
+        _require((is_number(left) and is_number(right)) or
+                 (is_string(left) and is_string(right)), op, left, right)
+        return _COMPARISON[op](left, right)
+    if op in ('==', '!='):
+        _require(_describe(left) == _describe(right) or
+                 (is_number(left) and is_number(right)), op, left, right)
+        return (left == right) == (op == '==')
+    if op in ('&&', '||'):
+        _require(isinstance(left, bool) and isinstance(right, bool), op, left, right)
+        return (left and right) if op == '&&' else (left or right)
+    raise ConstantError('unknown operator %s' % op)
+
+def convert(type_name, value):
+    """ Returns value as a value of the Franca type type_name, e.g. an
+        integer as a float for a Double. Raises ConstantError if value
+        does not fit the type. Values of user defined types (e.g. an
+        enumerator for an enumeration typed constant) are returned as
+        they are.
+    """
+    if type_name in INTEGER_RANGES:
+        if not is_integer(value):
+            raise ConstantError('%s value expected, got %s' % (type_name, _describe(value)))
+        minimum, maximum = INTEGER_RANGES[type_name]
+        if minimum is not None and not minimum <= value <= maximum:
+            raise ConstantError('value %d out of range for %s' % (value, type_name))
+        return value
+    if type_name in FLOAT_TYPES:
+        if not is_number(value):
+            raise ConstantError('%s value expected, got %s' % (type_name, _describe(value)))
+        return float(value)
+    if type_name == 'Boolean' and not isinstance(value, bool):
+        raise ConstantError('Boolean value expected, got %s' % _describe(value))
+    if type_name == 'String' and not is_string(value):
+        raise ConstantError('String value expected, got %s' % _describe(value))
+    return value
@@ -0,0 +1,326 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_depgraph.py
+#
+# DependencyGraph class: Resolved type references and imports of a ModelSet,
+#                        in both directions, and impact analysis on top of
+#                        them: which interfaces (and generated files) are
+#                        affected by a change to some files or declarations.
+#
+# Example:
+#
+#   graph = DependencyGraph(ModelSet.load(['models/']))
+#   impact = graph.impact(changed_files=['models/common_types.fidl'])
+#   for interface in impact.interfaces:
+#       regenerate(interface)
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+
+from .franca_model import BASIC_TYPES, REFERENCE_KINDS, ROOT_KINDS, ModelSet, NameResolver
+
+_BASIC_TYPES = frozenset(BASIC_TYPES)
+_VALUE_KINDS = ('constant', 'enumerator')
+
+def _normalize(filename):
+    return os.path.normcase(os.path.abspath(filename))
+
+def user_of(declaration):
+    """ The declaration a type reference is accounted to: the struct or
+        union for its fields, the method or broadcast for its arguments,
+        the declaration itself otherwise.
+    """
+    if declaration.kind in ('field', 'argument') and declaration.parent is not None:
+        return declaration.parent
+    return declaration
+
+class Impact(object):
+    """ Result of DependencyGraph.impact().
+
+        declarations:
+            Set of all affected declarations: the changed ones, the
+            types using them (transitively), the methods, broadcasts
+            and attributes using any of those, their interfaces and the
+            interfaces extending those.
+
+        roots:
+            Set of affected interfaces and type collections.
+    """
+    def __init__(self, declarations, roots):
+        self.declarations = declarations
+        self.roots = roots
+
+    @property
+    def interfaces(self):
+        return sorted((root for root in self.roots if root.kind == 'interface'),
+                      key=lambda root: root.qualified_name)
+
+    @property
+    def type_collections(self):
+        return sorted((root for root in self.roots if root.kind == 'typeCollection'),
+                      key=lambda root: root.qualified_name)
+
+    @property
+    def files(self):
+        """ Files holding an affected interface or type collection.
+        """
+        return sorted(set(root.document.filename for root in self.roots))
+
+    def outputs(self, output_func):
+        """ Returns the sorted list of output files to regenerate.
+
+            output_func:
+                Called with an affected interface or type collection,
+                returns the list of files a generator produces for it.
+        """
+        outputs = set()
+        for root in self.roots:
+            outputs.update(output_func(root))
+        return sorted(outputs)
+
+class DependencyGraph(object):
+    """ Reverse-dependency graph of a ModelSet.
+
+        Type references are resolved with a NameResolver. If a name is
+        still ambiguous, all candidates are kept, which is conservative
+        for impact analysis. References in the value expressions of
+        constants and enumerators, e.g. 'Limits.MAX', are edges to the
+        referenced constant or enumerator as well; a reference to an
+        enumerator also uses its enumeration, whose values it depends on.
+
+        uses:
+            user Declaration -> set of type (or constant) Declarations it
+            references
+
+        users:
+            type (or constant) Declaration -> set of user Declarations
+            referencing it
+
+        unresolved:
+            user Declaration -> set of type or constant names that did not
+            resolve
+
+        imports:
+            filename -> set of imported filenames (of the ModelSet)
+
+        importers:
+            filename -> set of filenames importing it
+    """
+    def __init__(self, model_set):
+        self.model_set = model_set
+        self.resolver = NameResolver(model_set, REFERENCE_KINDS)
+        self.value_resolver = NameResolver(model_set, _VALUE_KINDS)
+        self.types_by_name = self.resolver.by_name
+        self.uses = {}
+        self.users = {}
+        self.unresolved = {}
+        self.imports = {}
+        self.importers = {}
+        self._by_qualified_name = {}
+        # (declaration, type name) -> resolve() result
+        self._resolved = {}
+        # (declaration, constant name) -> resolve_value() result
+        self._resolved_values = {}
+        # normalized filename -> ModelDocument, see document_of()
+        self._documents = dict((_normalize(filename), document)
+                               for filename, document in model_set.documents.items())
+
+        for declaration in model_set.declarations():
+            self._by_qualified_name[declaration.qualified_name] = declaration
+
+        for document in model_set.documents.values():
+            imported = set()
+            for namespace, imported_file in document.imports:
+                filename = document.resolve_import(imported_file)
+                if filename in model_set.documents:
+                    imported.add(filename)
+                    self.importers.setdefault(filename, set()).add(document.filename)
+            self.imports[document.filename] = imported
+
+        for declaration in model_set.declarations():
+            for type_name in declaration.type_refs:
+                if type_name not in _BASIC_TYPES:
+                    self._add_reference(declaration, type_name, self.resolve(declaration, type_name))
+            for name in declaration.value_refs:
+                targets = self.resolve_value(declaration, name)
+                enumerations = [target.parent for target in targets
+                                if target.kind == 'enumerator' and target.parent is not declaration.parent]
+                self._add_reference(declaration, name, targets + enumerations)
+
+    def _add_reference(self, declaration, type_name, targets):
+        user = user_of(declaration)
+        if not targets:
+            self.unresolved.setdefault(user, set()).add(type_name)
+            return
+        for target in targets:
+            self.uses.setdefault(user, set()).add(target)
+            self.users.setdefault(target, set()).add(user)
+
+    def resolve(self, declaration, type_name):
+        """ Returns the list of type Declarations type_name, referenced
+            from declaration, resolves to. The result is kept, so
+            resolving the references of the model set again (e.g. to
+            render them) costs a dictionary lookup.
+        """
+        key = (declaration, type_name)
+        targets = self._resolved.get(key)
+        if targets is None:
+            targets = self._resolved[key] = self.resolver.candidates(declaration, type_name)
+        return targets
+
+    def resolve_value(self, declaration, name):
+        """ Returns the list of constant and enumerator Declarations name,
+            referenced from the value of declaration, resolves to.
+        """
+        key = (declaration, name)
+        targets = self._resolved_values.get(key)
+        if targets is None:
+            targets = self._resolved_values[key] = self.value_resolver.candidates(declaration, name)
+        return targets
+
+    def document_of(self, filename):
+        """ Returns the ModelDocument of filename, or None if it is not
+            part of the model set. filename need not be spelled as in the
+            model set, e.g. './models/a.fidl' finds 'models/a.fidl'.
+        """
+        document = self.model_set.documents.get(filename)
+        if document is None:
+            document = self._documents.get(_normalize(filename))
+        return document
+
+    def find(self, qualified_name):
+        """ Returns the Declaration with the given qualified name, or None.
+        """
+        return self._by_qualified_name.get(qualified_name)
+
+    def impact(self, changed_files=(), changed_declarations=(), removed_names=()):
+        """ Compute the declarations, interfaces and type collections
+            affected by a change.
+
+            changed_files:
+                Filenames of changed documents (see document_of()). All
+                their declarations count as changed.
+
+            changed_declarations:
+                Changed Declarations, or their qualified names.
+
+            removed_names:
+                Names of types that no longer exist. Declarations still
+                referencing them (now unresolved) count as changed.
+        """
+        pending = []
+        for filename in changed_files:
+            document = self.document_of(filename)
+            if document is not None:
+                pending.extend(document.declarations)
+        for declaration in changed_declarations:
+            if not hasattr(declaration, 'kind'):
+                declaration = self.find(declaration)
+            if declaration is not None:
+                pending.append(declaration)
+        if removed_names:
+            removed_names = set(removed_names)
+            for user, names in self.unresolved.items():
+                if names & removed_names:
+                    pending.append(user)
+
+        affected = set()
+        roots = set()
+        while pending:
+            declaration = pending.pop()
+            if declaration in affected:
+                continue
+            affected.add(declaration)
+            roots.add(declaration.root())
+            if declaration.kind in ('field', 'argument', 'enumerator', 'method', 'broadcast', 'attribute'):
+                # a changed member changes the declaration it belongs to
+                pending.append(declaration.parent)
+            for user in self.users.get(declaration, ()):
+                if user not in affected:
+                    pending.append(user)
+        return Impact(affected, roots)
+
+    def dependencies(self, root):
+        """ Returns the set of type Declarations an interface or type
+            collection uses, directly or transitively, including the
+            interfaces it extends and the types those use.
+        """
+        result = set()
+        pending = [root]
+        seen = set()
+        while pending:
+            declaration = pending.pop()
+            if declaration in seen:
+                continue
+            seen.add(declaration)
+            if declaration.kind in ROOT_KINDS:
+                pending.extend(member for member in declaration.document.declarations
+                               if member.root() is declaration and member is not declaration)
+            for target in self.uses.get(user_of(declaration), ()):
+                if target not in result:
+                    result.add(target)
+                    pending.append(target)
+        return result
+
+    def file_dependencies(self, filename):
+        """ Returns the set of files the declarations of filename depend
+            on: the files declaring the types they use, transitively, and
+            the files they import.
+        """
+        document = self.document_of(filename)
+        if document is None:
+            raise KeyError(filename)
+        filename = document.filename
+        files = set(self.imports.get(filename, ()))
+        for root in document.declarations:
+            if root.kind in ROOT_KINDS:
+                files.update(target.document.filename for target in self.dependencies(root))
+        files.discard(filename)
+        return files
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='List the interfaces and type collections affected by a change to Franca models.')
+    argparser.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+    argparser.add_argument('--changed-file', action='append', default=[], metavar='FILE',
+                           help='a changed .fidl file, may be given more than once')
+    argparser.add_argument('--changed', action='append', default=[], metavar='QUALIFIED_NAME',
+                           help='a changed declaration, may be given more than once')
+    argparser.add_argument('--removed-type', action='append', default=[], metavar='NAME',
+                           help='a type that was removed, may be given more than once')
+    argparser.add_argument('--format', choices=('text', 'json'), default='text')
+    args = argparser.parse_args(argv)
+
+    model_set = ModelSet.load(args.paths)
+    for filename, msg, line, column in model_set.errors:
+        print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+
+    graph = DependencyGraph(model_set)
+    for filename in args.changed_file:
+        if graph.document_of(filename) is None:
+            print('warning: %s is not one of the parsed model files' % filename, file=sys.stderr)
+    for name in args.changed:
+        if graph.find(name) is None:
+            print('warning: no declaration named %s' % name, file=sys.stderr)
+    impact = graph.impact(args.changed_file, args.changed, args.removed_type)
+
+    if args.format == 'json':
+        json.dump({
+            'interfaces': [root.qualified_name for root in impact.interfaces],
+            'type_collections': [root.qualified_name for root in impact.type_collections],
+            'files': impact.files,
+        }, sys.stdout, indent=2)
+        print()
+    else:
+        for root in impact.interfaces + impact.type_collections:
+            print('%-14s %s  (%s)' % (root.kind, root.qualified_name, root.document.filename))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,454 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_doxygen.py
+#
+# Doxygen input filter: turns a .fidl file into C++-like pseudo-source that
+# doxygen documents, with the Franca comments (<** @description: ... **>) as
+# doc comments. Interfaces become classes, broadcasts Qt style signals,
+# type collections namespaces, and structs, unions, enumerations, arrays,
+# maps and typedefs their C++ counterparts. Declarations are kept on the
+# line they have in the .fidl file where possible, so doxygen's warnings
+# and source listings point at the right lines.
+#
+# Doxygen starts the filter once for every file, so its start-up time is
+# paid thousands of times per documentation build. The filter therefore
+# imports nothing but os, sys and socket until it has to parse, and first
+# tries to forward the file to a helper process (--serve) that keeps a
+# parser loaded. Without a helper, the file is parsed in-process;
+# --spawn-helper also starts a helper in the background for the following
+# files, which exits again when it has been idle for a while. --prepare
+# builds the parsing tables and byte-compiles the package once, e.g. after
+# installing it, so a cold start does not build or compile anything.
+#
+# Doxyfile:
+#
+#   FILE_PATTERNS     = *.fidl
+#   EXTENSION_MAPPING = fidl=C++
+#   INPUT_FILTER      = "python -m franca_parser.franca_doxygen --spawn-helper"
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import os
+import sys
+
+# Everything else is imported where it is used, see above.
+
+# Doxygen commands for Franca comment tags, other tags become paragraphs.
+DOXYGEN_TAGS = {
+    'author': '@author',
+    'deprecated': '@deprecated',
+    'see': '@see',
+    'since': '@since',
+    'param': '@param',
+    'return': '@return',
+}
+
+DEFAULT_IDLE_TIMEOUT = 900
+
+class DoxygenWriter(object):
+    """ Renders a FrancaDocument as C++-like pseudo-source for doxygen.
+    """
+    def __init__(self, indent='    '):
+        self.indent = indent
+        self._lines = []
+
+    def render(self, document):
+        from . import franca_ast
+
+        self._ast = franca_ast
+        self._lines = []
+        namespaces = []
+        if document.package_identifier is not None:
+            namespaces = document.package_identifier.package_identifier.package_identifier.split('.')
+        if namespaces:
+            self._add(0, ' '.join('namespace %s {' % name for name in namespaces))
+        for root in document.child_objects.members:
+            if isinstance(root, franca_ast.Interface):
+                self._interface(root, 0)
+            else:
+                self._type_collection(root, 0)
+        if namespaces:
+            self._add(0, '}' * len(namespaces))
+        return '\n'.join(self._lines) + '\n'
+
+    def _add(self, level, text, line=None):
+        """ Appends a line of text, after blank lines up to line if the
+            output is not there yet.
+        """
+        if line is not None:
+            while len(self._lines) < line - 1:
+                self._lines.append('')
+        self._lines.append(self.indent * level + text)
+
+    def _declare(self, level, node, name, text, notes=(), params=()):
+        """ Appends the doc comment of node and the declaration text, on
+            the line of name in the source if possible.
+        """
+        doc = self._doc(getattr(node, 'comment', None), notes, params)
+        line = name.coord.line if name is not None and name.coord is not None else None
+        if line is not None:
+            line -= len(doc)
+        for index, doc_line in enumerate(doc):
+            self._add(level, doc_line, line if index == 0 else None)
+        self._add(level, text, line if not doc else None)
+
+    def _doc(self, comment, notes=(), params=()):
+        """ Returns the lines of the doxygen comment for a Franca comment,
+            notes and (direction, name, comment) parameters. Empty if
+            there is nothing to document.
+        """
+        paragraphs = []
+        if comment is not None:
+            tags = comment.tags
+            if not tags:
+                paragraphs.append(comment.text)
+            if 'description' in tags:
+                paragraphs.append(tags['description'])
+            for tag in sorted(tags):
+                if tag == 'description':
+                    continue
+                if tag in DOXYGEN_TAGS:
+                    paragraphs.append('%s %s' % (DOXYGEN_TAGS[tag], tags[tag]))
+                else:
+                    paragraphs.append('@par %s\n%s' % (tag, tags[tag]))
+        paragraphs.extend(notes)
+        for direction, name, param_comment in params:
+            description = ''
+            if param_comment is not None:
+                description = param_comment.tags.get('description') or param_comment.text
+            paragraphs.append('@param[%s] %s %s' % (direction, name, description))
+        lines = []
+        for paragraph in paragraphs:
+            for line in paragraph.replace('*/', '* /').splitlines():
+                line = line.strip().lstrip('*').strip()
+                if line:
+                    lines.append(line)
+        if not lines:
+            return []
+        if len(lines) == 1:
+            return ['/** %s */' % lines[0]]
+        return ['/**'] + [' * ' + line for line in lines] + [' */']
+
+    def _type(self, typename):
+        if isinstance(typename.typename, self._ast.ArrayTypeDeclaration):
+            return 'std::vector<%s>' % self._type(typename.typename.type)
+        return typename.typename.replace('.', '::')
+
+    def _base(self, node):
+        base = getattr(node, 'base', None)
+        return ' : public %s' % self._type(base) if base is not None else ''
+
+    def _interface(self, node, level):
+        from .franca_model import version_of
+
+        notes = []
+        version = version_of(node)
+        if version is not None:
+            notes.append('@version %d.%d' % version)
+        self._declare(level, node, node.name, 'class %s%s { public:' % (node.name.id, self._base(node)), notes)
+        section = 'public'
+        for member in node.members.members:
+            if isinstance(member, self._ast.BroadcastMethod) != (section == 'signals'):
+                section = 'signals' if section == 'public' else 'public'
+                self._add(level, section + ':')
+            self._member(member, level + 1, in_class=True)
+        self._add(level, '};')
+
+    def _type_collection(self, node, level):
+        from .franca_model import version_of
+
+        notes = []
+        version = version_of(node)
+        if version is not None:
+            notes.append('@version %d.%d' % version)
+        self._declare(level, node, node.name, 'namespace %s {' % node.name.id, notes)
+        for member in node.members.members:
+            self._member(member, level + 1, in_class=False)
+        self._add(level, '}')
+
+    def _member(self, node, level, in_class):
+        from .franca_model import method_arguments
+
+        ast = self._ast
+        if isinstance(node, ast.Version):
+            return
+        if isinstance(node, (ast.Method, ast.BroadcastMethod)):
+            in_args, out_args = method_arguments(node)
+            if isinstance(node, ast.BroadcastMethod):
+                # the values of a signal, passed to the receivers
+                in_args, out_args = in_args + out_args, []
+            arguments = ['%s %s' % (self._type(arg.type), arg.name.id) for arg in in_args]
+            arguments.extend('%s &%s' % (self._type(arg.type), arg.name.id) for arg in out_args)
+            params = [('in', arg.name.id, arg.comment) for arg in in_args if arg.comment is not None]
+            params.extend(('out', arg.name.id, arg.comment) for arg in out_args if arg.comment is not None)
+            notes = []
+            if getattr(node, 'is_fire_and_forget', False):
+                notes.append('@note fireAndForget, there is no reply.')
+            if getattr(node, 'is_selective', False):
+                notes.append('@note Selective broadcast.')
+            self._declare(level, node, node.name, 'void %s(%s);' % (node.name.id, ', '.join(arguments)),
+                          notes, params)
+        elif isinstance(node, ast.Attribute):
+            self._declare(level, node, node.name, '%s %s;' % (self._type(node.typename), node.name.id))
+        elif isinstance(node, ast.Constant):
+            self._declare(level, node, node.name, '%sconst %s %s = %s;' % (
+                'static ' if in_class else '', self._type(node.typename), node.name.id,
+                self._expression(node.value)))
+        elif isinstance(node, (ast.Struct, ast.Union)):
+            keyword = 'struct' if isinstance(node, ast.Struct) else 'union'
+            notes = ['@note Polymorphic.'] if getattr(node, 'is_polymorphic', False) else []
+            self._declare(level, node, node.name, '%s %s%s {' % (keyword, node.name.id, self._base(node)), notes)
+            fields = node.struct_members if keyword == 'struct' else node.member_list
+            for field in (fields.members if fields is not None else []):
+                self._declare(level + 1, field, field.name, '%s %s;' % (self._type(field.typename), field.name.id))
+            self._add(level, '};')
+        elif isinstance(node, ast.Enum):
+            notes = []
+            if node.base is not None:
+                notes.append('Extends %s.' % self._type(node.base))
+            self._declare(level, node, node.name, 'enum %s {' % node.name.id, notes)
+            enumerators = node.values.enumerators if node.values is not None else []
+            for enumerator in enumerators:
+                value = ''
+                if enumerator.value is not None:
+                    value = ' = ' + self._expression(enumerator.value)
+                self._declare(level + 1, enumerator, enumerator.name, '%s%s,' % (enumerator.name.id, value))
+            self._add(level, '};')
+        elif isinstance(node, ast.Map):
+            self._declare(level, node, node.name, 'typedef std::map<%s, %s> %s;' % (
+                self._type(node.key_type), self._type(node.value_type), node.name.id))
+        elif isinstance(node, ast.Typedef):
+            self._declare(level, node, node.new_type, 'typedef %s %s;' % (
+                self._type(node.existing_type), node.new_type.id))
+        elif isinstance(node, ast.ArrayTypeDeclaration):
+            self._declare(level, node, node.typename, 'typedef std::vector<%s> %s;' % (
+                self._type(node.type), node.typename.id))
+
+    def _expression(self, node):
+        """ Returns the source text of a constant expression. """
+        ast = self._ast
+        if isinstance(node, ast.BinaryOp):
+            return '(%s %s %s)' % (self._expression(node.left), node.op, self._expression(node.right))
+        if isinstance(node, ast.UnaryOp):
+            return '%s%s' % (node.op, self._expression(node.expr))
+        if isinstance(node, ast.String):
+            return node.string
+        if isinstance(node, ast.Reference):
+            return node.name.replace('.', '::')
+        return str(node.value)
+
+def filter_file(filename, parser=None):
+    """ Returns the pseudo-source of a .fidl file and the list of
+        'filename:line:column: message' errors. The pseudo-source is
+        empty if the file does not parse.
+    """
+    from .franca_cache import shared_parser
+
+    with open(filename) as f:
+        text = f.read()
+    errors = []
+    document = (parser or shared_parser()).parse(
+        text, filename, lambda msg, line, column: errors.append('%s:%s:%s: %s' % (filename, line, column, msg)))
+    if document is None:
+        return '', errors
+    return DoxygenWriter().render(document), errors
+
+def default_socket_path():
+    """ The socket of the helper process: FRANCA_DOXYGEN_SOCKET, or a
+        per-user socket in the temporary directory.
+    """
+    path = os.environ.get('FRANCA_DOXYGEN_SOCKET')
+    if path:
+        return path
+    import tempfile
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(), 'franca-doxygen-%d.sock' % uid)
+
+def _encode_reply(output, errors):
+    output = output.encode('utf-8')
+    messages = ''.join(error + '\n' for error in errors).encode('utf-8')
+    return ('%d %d\n' % (len(output), len(messages))).encode('ascii') + output + messages
+
+def forward(filename, path=None):
+    """ Has the helper at path filter filename. Returns (pseudo-source,
+        errors), or None if no helper (of this user) is listening.
+    """
+    import socket
+
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    path = path or default_socket_path()
+    try:
+        if os.stat(path).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+        connection.sendall(os.path.abspath(filename).encode('utf-8') + b'\n')
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except socket.error:
+        return None
+    finally:
+        connection.close()
+    reply = b''.join(chunks)
+    header, _, body = reply.partition(b'\n')
+    try:
+        output_size, messages_size = [int(value) for value in header.split()]
+    except ValueError:
+        return None
+    if len(body) != output_size + messages_size:
+        return None
+    errors = body[output_size:].decode('utf-8').splitlines()
+    return body[:output_size].decode('utf-8'), errors
+
+def serve(path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """ Runs the helper process: filters the files sent to the Unix
+        socket at path until no request came for idle_timeout seconds
+        (None to run forever).
+    """
+    import signal
+    import socket
+    try:
+        import socketserver
+    except ImportError:
+        import SocketServer as socketserver
+    from .franca_cache import shared_parser
+
+    path = path or default_socket_path()
+    parser = shared_parser()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            filename = self.rfile.readline().decode('utf-8').rstrip('\n')
+            try:
+                output, errors = filter_file(filename, parser)
+            except (IOError, OSError) as e:
+                output, errors = '', ['%s: %s' % (filename, e)]
+            self.wfile.write(_encode_reply(output, errors))
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        idle = False
+
+        def handle_timeout(self):
+            self.idle = True
+
+    # Leave a running helper alone, replace the socket of a dead one.
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return 1
+    except socket.error:
+        pass
+    finally:
+        probe.close()
+    if os.path.exists(path):
+        os.unlink(path)
+
+    umask = os.umask(0o077)
+    try:
+        server = Server(path, Handler)
+    finally:
+        os.umask(umask)
+    server.timeout = idle_timeout
+    # remove the socket when killed as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while not server.idle:
+            server.handle_request()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+def spawn_helper(path=None):
+    """ Starts a helper process in the background. """
+    import subprocess
+
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_parent, env.get('PYTHONPATH')]))
+    devnull = open(os.devnull, 'r+b')
+    try:
+        subprocess.Popen([sys.executable, '-m', 'franca_parser.franca_doxygen', '--serve',
+                          '--socket', path or default_socket_path()],
+                         stdin=devnull, stdout=devnull, stderr=devnull, env=env,
+                         close_fds=True, preexec_fn=getattr(os, 'setsid', None))
+    finally:
+        devnull.close()
+
+def prepare():
+    """ Builds the parsing tables and byte-compiles the package, so later
+        starts of the filter only load them.
+    """
+    import compileall
+    from .franca_parser import FrancaParser
+
+    FrancaParser()
+    return compileall.compile_dir(os.path.dirname(os.path.abspath(__file__)), quiet=1)
+
+def run_filter(filename, spawn=False, path=None, use_helper=True):
+    """ The filter: writes the pseudo-source of filename to stdout and
+        the errors to stderr.
+    """
+    result = forward(filename, path) if use_helper else None
+    if result is None:
+        if spawn:
+            spawn_helper(path)
+        try:
+            result = filter_file(filename)
+        except (IOError, OSError) as e:
+            print('%s: %s' % (filename, e), file=sys.stderr)
+            return 1
+    output, errors = result
+    for error in errors:
+        print(error, file=sys.stderr)
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    stdout.write(output.encode('utf-8'))
+    stdout.flush()
+    return 1 if errors and not output else 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Doxygen's call, 'filter [--spawn-helper] FILE', skips argparse
+    options = [arg for arg in argv if arg.startswith('-')]
+    if len(argv) == len(options) + 1 and set(options) <= set(['--spawn-helper']):
+        filename = [arg for arg in argv if not arg.startswith('-')][0]
+        return run_filter(filename, spawn=bool(options))
+
+    import argparse
+    argparser = argparse.ArgumentParser(
+        description='Doxygen input filter for Franca .fidl files.')
+    argparser.add_argument('file', nargs='?', help='the .fidl file to filter')
+    argparser.add_argument('--socket', help='socket of the helper process (default: %s)' % default_socket_path())
+    argparser.add_argument('--no-helper', action='store_true', help='always parse in this process')
+    argparser.add_argument('--spawn-helper', action='store_true',
+                           help='start a helper process in the background if none is running')
+    argparser.add_argument('--serve', action='store_true', help='run the helper process')
+    argparser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                           help='seconds without requests after which the helper exits, 0 to run forever')
+    argparser.add_argument('--prepare', action='store_true',
+                           help='build the parsing tables and byte-compile the package')
+    args = argparser.parse_args(argv)
+
+    if args.prepare:
+        return 0 if prepare() else 1
+    if args.serve:
+        return serve(args.socket, args.idle_timeout or None)
+    if not args.file:
+        argparser.error('no file given')
+    return run_filter(args.file, args.spawn_helper, args.socket, not args.no_helper)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,710 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_frozen.py
+#
+# Frozen models: freeze() writes a loaded ModelSet into one flat binary
+# file: every AST node, the declarations with their type references
+# resolved, and an index of the qualified names. FrozenModel maps such a
+# file read-only and decodes nodes and declarations only when they are
+# accessed. Worker processes attach to a model loaded and resolved once
+# without parsing, unpickling or copying it. The pages of the file are
+# shared between all processes through the page cache.
+#
+# The node views are instances of the franca_ast classes they stand for,
+# with the same attributes, children() and show(), so isinstance() checks,
+# NodeVisitors and helpers like franca_model.method_arguments() work on
+# them. They cannot be modified, and lists come back as tuples.
+# FrozenModel, FrozenDocument and FrozenDeclaration mirror the read-only
+# API of ModelSet, ModelDocument and Declaration.
+#
+# Example:
+#
+#   freeze(ModelSet.load(['models/']), 'models.frozen')
+#
+#   # in every worker
+#   model = FrozenModel.open('models.frozen')
+#   point = model.find('org.example.Common.Point')
+#   for field in point.members():
+#       print(field.name, field.node.typename.typename)
+#
+# Run 'python -m franca_parser.franca_frozen --help' for the command line
+# interface.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from collections import OrderedDict
+
+from . import franca_ast
+from .franca_model import BASIC_TYPES, REFERENCE_KINDS, ModelSet, NameResolver, declaration_name
+
+MAGIC = b'FRANCAFZ'
+FORMAT_VERSION = 1
+
+try:
+    _INTEGER_TYPES = (int, long)
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _INTEGER_TYPES = (int,)
+    _STRING_TYPES = (str,)
+
+# Tags of the values of node fields and lists.
+(_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _NODE, _LIST, _TUPLE, _COORD, _BIGINT, _ABSENT,
+ _DECLARATION) = range(13)
+
+_VALUE = struct.Struct('<Bq')           # tag, payload
+_INT64 = struct.Struct('<q')
+_DOUBLE = struct.Struct('<d')
+_OFFSET = struct.Struct('<Q')
+_NODE_HEAD = struct.Struct('<HH')       # class, number of fields
+_COUNT = struct.Struct('<I')
+_COORD_RECORD = struct.Struct('<Qqq')        # file, line, column (-1 for None)
+# filename, package, AST node, imports list, first declaration, number of
+# declarations, list of the interfaces and type collections
+_DOCUMENT = struct.Struct('<QQQQQQQ')
+# kind, name, qualified name, parent (-1 for None), document, node, type
+# references list, resolved references list, members list
+_DECLARATION_RECORD = struct.Struct('<QQQqQQQQQ')
+
+_HEADER_FIELDS = ('strings', 'strings_index', 'classes_offset', 'classes_size', 'nodes', 'nodes_index',
+                  'lists', 'lists_index', 'coords', 'coords_offset', 'documents', 'documents_offset',
+                  'declarations', 'declarations_offset', 'names_offset')
+_HEADER = struct.Struct('<8sI' + 'Q' * len(_HEADER_FIELDS))
+
+# os.replace() is Python 3 only; os.rename() replaces files too on POSIX.
+_replace = getattr(os, 'replace', os.rename)
+
+class FreezeError(Exception):
+    """ A model that cannot be frozen, or a file that is not a frozen
+        model (of this version).
+    """
+    pass
+
+##
+## Writing
+##
+
+class _Writer(object):
+    """ Collects the sections of a frozen model in memory.
+    """
+    def __init__(self):
+        self.strings = {}
+        self.string_data = []
+        self.classes = OrderedDict()
+        self.class_ids = {}
+        self.node_ids = {}
+        self.nodes = []
+        self.node_offsets = []
+        self.node_data = bytearray()
+        self.list_offsets = []
+        self.list_data = bytearray()
+        self.coord_ids = {}
+        self.coord_data = bytearray()
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.string_data)
+            self.string_data.append(value if isinstance(value, bytes) else value.encode('utf-8'))
+        return index
+
+    def node(self, node):
+        """ Returns the index of node, which is written by write_nodes().
+        """
+        index = self.node_ids.get(id(node))
+        if index is None:
+            index = self.node_ids[id(node)] = len(self.nodes)
+            self.nodes.append(node)
+        return index
+
+    def coord(self, coord):
+        index = self.coord_ids.get(id(coord))
+        if index is None:
+            index = self.coord_ids[id(coord)] = len(self.coord_ids)
+            self.coord_data += _COORD_RECORD.pack(self.string(coord.file or ''),
+                                                  -1 if coord.line is None else coord.line,
+                                                  -1 if coord.column is None else coord.column)
+        return index
+
+    def value(self, value):
+        """ Returns the (tag, payload) of a field or list value.
+        """
+        if value is None:
+            return _NONE, 0
+        if value is True:
+            return _TRUE, 0
+        if value is False:
+            return _FALSE, 0
+        if isinstance(value, franca_ast.Node):
+            return _NODE, self.node(value)
+        if isinstance(value, _INTEGER_TYPES):
+            if -2 ** 63 <= value < 2 ** 63:
+                return _INT, value
+            return _BIGINT, self.string(str(value))
+        if isinstance(value, float):
+            return _FLOAT, _INT64.unpack(_DOUBLE.pack(value))[0]
+        if isinstance(value, _STRING_TYPES):
+            return _STR, self.string(value)
+        if isinstance(value, list):
+            return _LIST, self.list(value)
+        if isinstance(value, tuple):
+            return _TUPLE, self.list(value)
+        if isinstance(value, franca_ast.Coord):
+            return _COORD, self.coord(value)
+        raise FreezeError('cannot freeze %r' % (value,))
+
+    def list(self, values):
+        return self.raw_list([self.value(value) for value in values])
+
+    def raw_list(self, values):
+        """ Writes a list of (tag, payload) values, returns its index.
+        """
+        index = len(self.list_offsets)
+        self.list_offsets.append(len(self.list_data))
+        self.list_data += _COUNT.pack(len(values))
+        for tag, payload in values:
+            self.list_data += _VALUE.pack(tag, payload)
+        return index
+
+    @staticmethod
+    def fields(node):
+        if isinstance(node, franca_ast.FrancaComment):
+            # the comment text instead of the whole source it points into
+            return [('comment', node.comment), ('start', node.start), ('end', node.end)]
+        # private attributes are caches, e.g. of FrancaComment
+        return [(name, value) for name, value in vars(node).items() if not name.startswith('_')]
+
+    def write_nodes(self):
+        """ Writes the nodes registered with node() and all nodes they
+            refer to, breadth first, so deep trees need no recursion.
+        """
+        position = 0
+        while position < len(self.nodes):
+            node = self.nodes[position]
+            position += 1
+            fields = self.fields(node)
+            class_name = node.__class__.__name__
+            names = self.classes.get(class_name)
+            if names is None:
+                names = self.classes[class_name] = []
+                self.class_ids[class_name] = len(self.class_ids)
+            # the fields of a class are only ever appended to, so the
+            # positions of the ones already written stay valid
+            names.extend(sorted(name for name, value in fields if name not in names))
+            values = dict(fields)
+            self.node_offsets.append(len(self.node_data))
+            self.node_data += _NODE_HEAD.pack(self.class_ids[class_name], len(names))
+            for name in names:
+                if name in values:
+                    self.node_data += _VALUE.pack(*self.value(values[name]))
+                else:
+                    self.node_data += _VALUE.pack(_ABSENT, 0)
+
+def _write_offsets(f, base, offsets):
+    """ Writes base + offset for every offset, as 64 bit integers.
+    """
+    chunk = 65536
+    for start in range(0, len(offsets), chunk):
+        part = offsets[start:start + chunk]
+        f.write(struct.pack('<%dQ' % len(part), *[base + offset for offset in part]))
+
+def freeze(model_set, filename):
+    """ Writes model_set, a ModelSet, to filename as a frozen model. The
+        file is written to a temporary file first and renamed, so
+        workers never see a partly written model.
+    """
+    writer = _Writer()
+    documents = list(model_set.documents.values())
+    for document in documents:
+        writer.node(document.ast)
+    writer.write_nodes()
+
+    declarations = []
+    declaration_ids = {}
+    for document in documents:
+        for declaration in document.declarations:
+            declaration_ids[declaration] = len(declarations)
+            declarations.append(declaration)
+
+    document_data = bytearray()
+    for document in documents:
+        roots = writer.raw_list([(_DECLARATION, declaration_ids[root]) for root in document.members_of(None)])
+        first = declaration_ids[document.declarations[0]] if document.declarations else 0
+        document_data += _DOCUMENT.pack(writer.string(document.filename), writer.string(document.package),
+                                        writer.node_ids[id(document.ast)], writer.list(document.imports),
+                                        first, len(document.declarations), roots)
+
+    resolver = NameResolver(model_set, REFERENCE_KINDS)
+    document_ids = dict((document, index) for index, document in enumerate(documents))
+    declaration_data = bytearray()
+    for declaration in declarations:
+        references = []
+        for type_name in declaration.type_refs:
+            target = None if type_name in BASIC_TYPES else resolver.resolve(declaration, type_name)
+            references.append((_DECLARATION, declaration_ids[target]) if target is not None else (_NONE, 0))
+        members = [(_DECLARATION, declaration_ids[member]) for member in declaration.members()]
+        declaration_data += _DECLARATION_RECORD.pack(
+            writer.string(declaration.kind), writer.string(declaration.name),
+            writer.string(declaration.qualified_name),
+            declaration_ids[declaration.parent] if declaration.parent is not None else -1,
+            document_ids[declaration.document], writer.node_ids[id(declaration.node)],
+            writer.list(declaration.type_refs), writer.raw_list(references), writer.raw_list(members))
+    names = sorted(range(len(declarations)), key=lambda index: declarations[index].qualified_name)
+
+    classes = json.dumps(list(writer.classes.items())).encode('utf-8')
+    header = dict((name, 0) for name in _HEADER_FIELDS)
+    directory = os.path.dirname(filename) or os.curdir
+    fd, temporary = tempfile.mkstemp(prefix='.' + os.path.basename(filename) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'\0' * _HEADER.size)
+
+            header['strings'] = len(writer.string_data)
+            header['strings_index'] = f.tell()
+            string_offsets = []
+            position = 0
+            for data in writer.string_data:
+                string_offsets.append(position)
+                position += len(data)
+            string_offsets.append(position)
+            _write_offsets(f, f.tell() + 8 * len(string_offsets), string_offsets)
+            for data in writer.string_data:
+                f.write(data)
+
+            header['classes_offset'] = f.tell()
+            header['classes_size'] = len(classes)
+            f.write(classes)
+
+            header['nodes'] = len(writer.node_offsets)
+            header['nodes_index'] = f.tell()
+            _write_offsets(f, f.tell() + 8 * len(writer.node_offsets), writer.node_offsets)
+            f.write(writer.node_data)
+
+            header['lists'] = len(writer.list_offsets)
+            header['lists_index'] = f.tell()
+            _write_offsets(f, f.tell() + 8 * len(writer.list_offsets), writer.list_offsets)
+            f.write(writer.list_data)
+
+            header['coords'] = len(writer.coord_ids)
+            header['coords_offset'] = f.tell()
+            f.write(writer.coord_data)
+
+            header['documents'] = len(documents)
+            header['documents_offset'] = f.tell()
+            f.write(document_data)
+
+            header['declarations'] = len(declarations)
+            header['declarations_offset'] = f.tell()
+            f.write(declaration_data)
+
+            header['names_offset'] = f.tell()
+            _write_offsets(f, 0, names)
+
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, *[header[name] for name in _HEADER_FIELDS]))
+        _replace(temporary, filename)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+##
+## Reading
+##
+
+class FrozenNode(object):
+    """ Base class of the node views of a FrozenModel. Every view class
+        also derives from the franca_ast class of the node, e.g. the view
+        of a Struct is a franca_ast.Struct. Views of the same node compare
+        equal.
+    """
+    __slots__ = ('_model', '_offset')
+
+    def __init__(self, model, offset):
+        object.__setattr__(self, '_model', model)
+        object.__setattr__(self, '_offset', offset)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('frozen %s nodes are read-only' % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('frozen %s nodes are read-only' % self.__class__.__name__)
+
+    def __eq__(self, other):
+        return isinstance(other, FrozenNode) and other._model is self._model and other._offset == self._offset
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._offset)
+
+    def __repr__(self):
+        return '<frozen %s at %d>' % (self.__class__.__name__, self._offset)
+
+class FrozenComment(FrozenNode):
+    """ Base class of the views of FrancaComments. Only the text of the
+        comment is kept, not the source it was lexed from.
+    """
+    __slots__ = ()
+
+    @property
+    def tags(self):
+        return franca_ast.FrancaComment.parse_tags(self.text)
+
+def _field_property(position):
+    return property(lambda self: self._model._field(self._offset, position))
+
+def _view_class(name, fields):
+    ast_class = getattr(franca_ast, name, franca_ast.Node)
+    namespace = {'__slots__': ()}
+    for position, field in enumerate(fields):
+        namespace[str(field)] = _field_property(position)
+    base = FrozenComment if ast_class is franca_ast.FrancaComment else FrozenNode
+    return type(str(name), (base, ast_class), namespace)
+
+class FrozenDocument(object):
+    """ A document of a FrozenModel, like a ModelDocument.
+    """
+    def __init__(self, model, index):
+        (filename, package, self._ast, imports, self._first, self._count,
+         self._roots) = _DOCUMENT.unpack_from(model._buffer, model._documents_offset + _DOCUMENT.size * index)
+        self.model = model
+        self.filename = model.string(filename)
+        self.package = model.string(package)
+        self.imports = list(model._list(imports))
+
+    @property
+    def ast(self):
+        return self.model.node(self._ast)
+
+    @property
+    def declarations(self):
+        return [self.model.declaration(index) for index in range(self._first, self._first + self._count)]
+
+    def members_of(self, declaration):
+        if declaration is None:
+            return list(self.model._list(self._roots))
+        return declaration.members()
+
+    def resolve_import(self, imported_file):
+        return os.path.normpath(os.path.join(os.path.dirname(self.filename), imported_file))
+
+    def __repr__(self):
+        return '<frozen document %s>' % self.filename
+
+class FrozenDeclaration(object):
+    """ A declaration of a FrozenModel, like a franca_model.Declaration.
+        Only the position of the declaration is kept, the attributes are
+        read from the model when they are used. Two FrozenDeclarations of
+        the same declaration compare equal.
+
+        references:
+            (type name, FrozenDeclaration) tuples of the type references,
+            resolved when the model was frozen. The declaration is None
+            for basic types and names that did not resolve.
+    """
+    __slots__ = ('model', '_index')
+
+    def __init__(self, model, index):
+        self.model = model
+        self._index = index
+
+    def _record(self):
+        return _DECLARATION_RECORD.unpack_from(
+            self.model._buffer, self.model._declarations_offset + _DECLARATION_RECORD.size * self._index)
+
+    def __eq__(self, other):
+        return isinstance(other, FrozenDeclaration) and other.model is self.model and other._index == self._index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._index)
+
+    @property
+    def kind(self):
+        return self.model.string(self._record()[0])
+
+    @property
+    def name(self):
+        return self.model.string(self._record()[1])
+
+    @property
+    def qualified_name(self):
+        return self.model.string(self._record()[2])
+
+    @property
+    def _parent(self):
+        return self._record()[3]
+
+    @property
+    def _document(self):
+        return self._record()[4]
+
+    @property
+    def _node(self):
+        return self._record()[5]
+
+    @property
+    def _type_refs(self):
+        return self._record()[6]
+
+    @property
+    def _references(self):
+        return self._record()[7]
+
+    @property
+    def _members(self):
+        return self._record()[8]
+
+    @property
+    def parent(self):
+        return self.model.declaration(self._parent) if self._parent >= 0 else None
+
+    @property
+    def document(self):
+        return self.model.document(self._document)
+
+    @property
+    def package(self):
+        return self.document.package
+
+    @property
+    def node(self):
+        return self.model.node(self._node)
+
+    @property
+    def type_refs(self):
+        return list(self.model._list(self._type_refs))
+
+    @property
+    def references(self):
+        return list(zip(self.type_refs, self.model._list(self._references)))
+
+    @property
+    def coord(self):
+        return declaration_name(self.node).coord
+
+    @property
+    def comment(self):
+        comment = getattr(self.node, 'comment', None)
+        return comment if isinstance(comment, franca_ast.FrancaComment) else None
+
+    def root(self):
+        declaration = self
+        while declaration.parent is not None:
+            declaration = declaration.parent
+        return declaration
+
+    def members(self):
+        return list(self.model._list(self._members))
+
+    def ancestors(self):
+        declaration = self.parent
+        while declaration is not None:
+            yield declaration
+            declaration = declaration.parent
+
+    def __repr__(self):
+        return '<%s %s>' % (self.kind, self.qualified_name)
+
+class FrozenModel(object):
+    """ Read-only view of a frozen model, see freeze(). Mirrors the
+        reading API of ModelSet: documents (filename -> FrozenDocument)
+        and declarations().
+
+        buffer:
+            The frozen model, any object supporting the buffer protocol
+            and slicing, e.g. an mmap or the buf of a
+            multiprocessing.shared_memory.SharedMemory. open() maps a
+            file.
+    """
+    # A frozen model never changes, for caches keyed by ModelSet.revision
+    revision = 0
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        if len(buffer) < _HEADER.size:
+            raise FreezeError('not a frozen model')
+        values = _HEADER.unpack_from(buffer, 0)
+        if values[0] != MAGIC:
+            raise FreezeError('not a frozen model')
+        if values[1] != FORMAT_VERSION:
+            raise FreezeError('frozen model format %d, expected %d' % (values[1], FORMAT_VERSION))
+        header = dict(zip(_HEADER_FIELDS, values[2:]))
+        self._strings_index = header['strings_index']
+        self._nodes_index = header['nodes_index']
+        self._lists_index = header['lists_index']
+        self._coords_offset = header['coords_offset']
+        self._documents_offset = header['documents_offset']
+        self._declarations_offset = header['declarations_offset']
+        self._names_offset = header['names_offset']
+        self.counts = dict((name, header[name]) for name in ('strings', 'nodes', 'lists', 'coords',
+                                                              'documents', 'declarations'))
+        classes = json.loads(bytes(buffer[header['classes_offset']:
+                                          header['classes_offset'] + header['classes_size']]).decode('utf-8'))
+        self._classes = [_view_class(name, fields) for name, fields in classes]
+        self._documents = None
+        self._document_list = None
+
+    @classmethod
+    def open(cls, filename):
+        """ Maps a frozen model file read-only. """
+        with open(filename, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self):
+        close = getattr(self._buffer, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, index):
+        start, end = struct.unpack_from('<QQ', self._buffer, self._strings_index + 8 * index)
+        data = bytes(self._buffer[start:end])
+        return data if str is bytes else data.decode('utf-8')
+
+    def node(self, index):
+        """ Returns the view of node index. """
+        offset = _OFFSET.unpack_from(self._buffer, self._nodes_index + 8 * index)[0]
+        return self._classes[_NODE_HEAD.unpack_from(self._buffer, offset)[0]](self, offset)
+
+    def _field(self, offset, position):
+        if position >= _NODE_HEAD.unpack_from(self._buffer, offset)[1]:
+            raise AttributeError('no such field')
+        return self._value(*_VALUE.unpack_from(self._buffer, offset + _NODE_HEAD.size + _VALUE.size * position))
+
+    def _value(self, tag, payload):
+        if tag == _STR:
+            return self.string(payload)
+        if tag == _NODE:
+            return self.node(payload)
+        if tag == _INT:
+            return payload
+        if tag == _NONE:
+            return None
+        if tag == _LIST or tag == _TUPLE:
+            return self._list(payload)
+        if tag == _COORD:
+            file, line, column = _COORD_RECORD.unpack_from(self._buffer, self._coords_offset + _COORD_RECORD.size * payload)
+            return franca_ast.Coord(self.string(file), None if line < 0 else line, None if column < 0 else column)
+        if tag == _DECLARATION:
+            return self.declaration(payload)
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _FLOAT:
+            return _DOUBLE.unpack(_INT64.pack(payload))[0]
+        if tag == _BIGINT:
+            return int(self.string(payload))
+        raise AttributeError('no such field')
+
+    def _list(self, index):
+        offset = _OFFSET.unpack_from(self._buffer, self._lists_index + 8 * index)[0]
+        count = _COUNT.unpack_from(self._buffer, offset)[0]
+        offset += _COUNT.size
+        return tuple(self._value(*_VALUE.unpack_from(self._buffer, offset + _VALUE.size * i)) for i in range(count))
+
+    def declaration(self, index):
+        return FrozenDeclaration(self, index)
+
+    def document(self, index):
+        if self._documents is None:
+            self._load_documents()
+        return self._document_list[index]
+
+    def _load_documents(self):
+        self._document_list = [FrozenDocument(self, index) for index in range(self.counts['documents'])]
+        self._documents = OrderedDict((document.filename, document) for document in self._document_list)
+
+    @property
+    def documents(self):
+        if self._documents is None:
+            self._load_documents()
+        return self._documents
+
+    def declarations(self):
+        for index in range(self.counts['declarations']):
+            yield self.declaration(index)
+
+    def find(self, qualified_name):
+        """ Returns the FrozenDeclaration with the qualified name (the
+            first one if there are several), or None. A binary search of
+            the name index, so only a few names are decoded.
+        """
+        low, high = 0, self.counts['declarations']
+        while low < high:
+            middle = (low + high) // 2
+            index = _OFFSET.unpack_from(self._buffer, self._names_offset + 8 * middle)[0]
+            if self.declaration(index).qualified_name < qualified_name:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.counts['declarations']:
+            declaration = self.declaration(_OFFSET.unpack_from(self._buffer, self._names_offset + 8 * low)[0])
+            if declaration.qualified_name == qualified_name:
+                return declaration
+        return None
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Freeze Franca models for sharing them between processes.')
+    commands = argparser.add_subparsers(dest='command')
+    freeze_command = commands.add_parser('freeze', help='load models and write them as a frozen model')
+    freeze_command.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+    freeze_command.add_argument('-o', '--output', required=True, help='the frozen model file to write')
+    info = commands.add_parser('info', help='print the size of a frozen model')
+    info.add_argument('model', help='frozen model file')
+    find = commands.add_parser('find', help='print declarations of a frozen model')
+    find.add_argument('model', help='frozen model file')
+    find.add_argument('names', nargs='+', metavar='QUALIFIED_NAME')
+    args = argparser.parse_args(argv)
+
+    if args.command == 'freeze':
+        model_set = ModelSet.load(args.paths)
+        for filename, msg, line, column in model_set.errors:
+            print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+        freeze(model_set, args.output)
+        return 0
+    if args.command not in ('info', 'find'):
+        argparser.error('a command is required')
+
+    with FrozenModel.open(args.model) as model:
+        if args.command == 'info':
+            for name in ('documents', 'declarations', 'nodes', 'lists', 'strings', 'coords'):
+                print('%-14s %d' % (name, model.counts[name]))
+            print('%-14s %d' % ('bytes', os.path.getsize(args.model)))
+            return 0
+        status = 0
+        for name in args.names:
+            declaration = model.find(name)
+            if declaration is None:
+                print('%s: not found' % name, file=sys.stderr)
+                status = 1
+                continue
+            coord = declaration.coord
+            print('%s %s (%s:%s)' % (declaration.kind, declaration.qualified_name, coord.file, coord.line))
+            for member in declaration.members():
+                print('    %s %s' % (member.kind, member.name))
+        return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_generator.py
+#
+# Generator class: Base class of the code/documentation generators driven by
+#                  the franca_parser tools (e.g. the watch mode).
+#
+# A generator produces output files for interfaces and type collections.
+# It is given one root Declaration (see franca_model) at a time, so tools can
+# rerun it for the affected roots only.
+#
+# For build systems, generators write their outputs with write_output(),
+# which replaces a file atomically and leaves it alone (timestamp included)
+# if its content did not change, and write_depfile() lists the .fidl files
+# every output depends on, following the resolved imports and type
+# references. With ninja, use 'restat = 1' so unchanged outputs stop the
+# rebuild:
+#
+#   rule franca
+#     command = python -m franca_parser.franca_generator $in --generator mod:name --depfile $out.d
+#     depfile = $out.d
+#     restat = 1
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import binascii
+import errno
+import importlib
+import os
+import sys
+
+from collections import OrderedDict
+
+from .franca_depgraph import DependencyGraph
+from .franca_model import ModelSet
+
+# os.replace() is Python 3 only; os.rename() replaces files too on POSIX.
+_replace = getattr(os, 'replace', os.rename)
+
+def _create_temporary(filename):
+    """ Creates a new temporary file next to filename and returns (file
+        descriptor, path). Unlike tempfile.mkstemp(), which creates
+        files only readable by their owner, the file gets the mode a new
+        file gets, 0666 minus the current umask.
+    """
+    directory = os.path.dirname(filename) or os.curdir
+    prefix = os.path.join(directory, '.' + os.path.basename(filename) + '.')
+    while True:
+        temporary = '%s%d.%s.tmp' % (prefix, os.getpid(), binascii.hexlify(os.urandom(4)).decode('ascii'))
+        try:
+            return os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temporary
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+def write_output(filename, content):
+    """ Write content (bytes, or text, written as UTF-8) to filename,
+        unless the file already has exactly this content. Returns True
+        if the file was written.
+
+        The content is written to a temporary file in the same
+        directory, which is then renamed to filename, so readers never
+        see a partly written output. A replaced file keeps its mode, a
+        new one gets the mode of newly created files. Missing
+        directories are created.
+    """
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    try:
+        if os.path.getsize(filename) == len(content):
+            with open(filename, 'rb') as f:
+                if f.read() == content:
+                    return False
+        mode = os.stat(filename).st_mode & 0o7777
+    except (IOError, OSError):
+        mode = None
+    directory = os.path.dirname(filename) or os.curdir
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # created concurrently
+            if not os.path.isdir(directory):
+                raise
+    fd, temporary = _create_temporary(filename)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(temporary, mode)
+        _replace(temporary, filename)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    return True
+
+class Generator(object):
+    """ Base class for generators. Subclasses override outputs() and
+        generate().
+
+        name:
+            Name used in reports.
+
+        root_kinds:
+            Kinds of the root declarations the generator handles,
+            'interface' and/or 'typeCollection'.
+
+        uses_comments:
+            True if the outputs include the Franca comments, so changes
+            to comments have to regenerate them.
+    """
+    name = 'generator'
+    root_kinds = ('interface', 'typeCollection')
+    uses_comments = False
+
+    def handles(self, root):
+        return root.kind in self.root_kinds
+
+    def outputs(self, root):
+        """ Returns the list of files generated for root.
+        """
+        return []
+
+    def generate(self, root, model_set):
+        """ Generate the outputs of root. model_set is the ModelSet
+            root belongs to, e.g. to look up the types it uses.
+        """
+        raise NotImplementedError
+
+    def finish(self, model_set):
+        """ Called once generate() ran for all the roots of a run (see
+            run_generators()) or of a watch cycle, e.g. to write an index
+            of all roots. Returns the list of files written.
+        """
+        return []
+
+    def write(self, filename, content):
+        """ Write an output file with write_output(), so outputs whose
+            content did not change keep their timestamps.
+        """
+        return write_output(filename, content)
+
+def _roots(model_set, roots):
+    if roots is None:
+        roots = [declaration for declaration in model_set.declarations() if declaration.parent is None]
+    return roots
+
+def input_files(graph, root):
+    """ Returns the sorted list of the .fidl files the outputs of root
+        depend on: its own file, the files it imports (transitively) and
+        the files declaring the types and base interfaces it uses.
+    """
+    filename = root.document.filename
+    files = set([filename])
+    pending = [filename]
+    while pending:
+        for imported in graph.imports.get(pending.pop(), ()):
+            if imported not in files:
+                files.add(imported)
+                pending.append(imported)
+    files.update(target.document.filename for target in graph.dependencies(root))
+    return sorted(files)
+
+def output_dependencies(model_set, generators, roots=None, graph=None):
+    """ Returns an OrderedDict of the outputs of generators for roots
+        (all interfaces and type collections by default) -> the list of
+        .fidl files the output depends on, see input_files().
+
+        graph:
+            The DependencyGraph of model_set, built if not given.
+    """
+    if graph is None:
+        graph = DependencyGraph(model_set)
+    dependencies = OrderedDict()
+    for generator in generators:
+        for root in _roots(model_set, roots):
+            if generator.handles(root):
+                inputs = input_files(graph, root)
+                for output in generator.outputs(root):
+                    dependencies[output] = inputs
+    return dependencies
+
+def run_generators(model_set, generators, roots=None, graph=None):
+    """ Run generators for roots (all interfaces and type collections
+        by default), then their finish(). Returns the
+        output_dependencies() of the run.
+    """
+    roots = _roots(model_set, roots)
+    for generator in generators:
+        for root in roots:
+            if generator.handles(root):
+                generator.generate(root, model_set)
+        generator.finish(model_set)
+    return output_dependencies(model_set, generators, roots, graph)
+
+def _escape(path):
+    return path.replace('$', '$$').replace('#', '\\#').replace(' ', '\\ ')
+
+def format_depfile(dependencies, phony_targets=False):
+    """ Returns the text of a Makefile style depfile, as understood by
+        make and ninja, with a rule per output.
+
+        dependencies:
+            output -> list of input files, e.g. from
+            output_dependencies().
+
+        phony_targets:
+            Add an empty rule per input, like 'gcc -MP', so make does
+            not fail once an input is deleted.
+    """
+    lines = []
+    inputs = set()
+    for output, files in dependencies.items():
+        lines.append(' \\\n  '.join(['%s:' % _escape(output)] + [_escape(name) for name in files]))
+        inputs.update(files)
+    if phony_targets:
+        lines.extend('%s:' % _escape(name) for name in sorted(inputs))
+    return ''.join(line + '\n' for line in lines)
+
+def write_depfile(filename, dependencies, phony_targets=False):
+    """ Write a depfile (see format_depfile()) with write_output().
+    """
+    return write_output(filename, format_depfile(dependencies, phony_targets))
+
+def load_generator(spec):
+    """ Create a generator from a 'module:name' specification. name is
+        looked up in the module and called without arguments, so it can
+        be a Generator subclass or a factory function.
+    """
+    module_name, _, attribute = spec.partition(':')
+    if not attribute:
+        raise ValueError("generator must be given as 'module:name', got %r" % spec)
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute)()
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Run generators for all interfaces and type collections of Franca models, e.g. as a build step.')
+    argparser.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+    argparser.add_argument('--generator', action='append', default=[], metavar='MODULE:NAME', required=True,
+                           help='generator to run, a Generator subclass or factory, may be given more than once')
+    argparser.add_argument('--depfile', metavar='FILE', help='write the .fidl files every output depends on to FILE')
+    argparser.add_argument('--phony-targets', action='store_true',
+                           help='add an empty rule per .fidl file to the depfile, like gcc -MP')
+    args = argparser.parse_args(argv)
+
+    model_set = ModelSet.load(args.paths)
+    for filename, msg, line, column in model_set.errors:
+        print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+    if model_set.errors:
+        return 1
+
+    generators = [load_generator(spec) for spec in args.generator]
+    dependencies = run_generators(model_set, generators)
+    if args.depfile:
+        write_depfile(args.depfile, dependencies, args.phony_targets)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_inheritance.py
+#
+# TypeHierarchy class: Resolves the bases of structs, unions, enumerations
+#                      and interfaces ('extends') in a ModelSet and caches
+#                      the flattened layout of every type and the dispatch
+#                      tables of every interface, so code generators,
+#                      marshalling code and stubs do not walk inheritance
+#                      chains per message or per field.
+#
+# Example:
+#
+#   hierarchy = TypeHierarchy(model_set)
+#   layout = hierarchy.layout(struct_declaration)
+#   for field in layout.members:
+#       marshal(field)
+#
+#   methods = hierarchy.layout(interface_declaration).methods
+#   handlers = [make_handler(method) for method in methods]
+#   ...
+#   handlers[request.method_id](request)
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from .franca_model import REFERENCE_KINDS, NameResolver, method_arguments, typename_text
+
+# Kinds that can extend another declaration of the same kind.
+EXTENSIBLE_KINDS = frozenset(('struct', 'union', 'enumeration', 'interface'))
+
+# Kinds of the interface members with a dispatch table, in InterfaceLayout.
+DISPATCH_KINDS = ('method', 'broadcast', 'attribute')
+
+class InheritanceError(Exception):
+    """ A base that does not resolve, is not of the same kind as the
+        derived type, is part of a cycle or declares a member name the
+        derived type declares again (with another signature, for the
+        members of interfaces).
+    """
+    pass
+
+def base_name(declaration):
+    """ Returns the name of the base of a struct, union, enumeration or
+        interface Declaration as written in the source, or None.
+    """
+    base = getattr(declaration.node, 'base', None)
+    return typename_text(base) if base is not None else None
+
+def member_signature(declaration):
+    """ Returns what a method, broadcast or attribute Declaration of a
+        derived interface must keep to override the one of a base: the
+        argument (or attribute) types and the fireAndForget or selective
+        flag. Argument names do not count.
+    """
+    node = declaration.node
+    if declaration.kind == 'attribute':
+        return typename_text(node.typename)
+    in_args, out_args = method_arguments(node)
+    flag = node.is_fire_and_forget if declaration.kind == 'method' else node.is_selective
+    return (flag,
+            tuple(typename_text(argument.type) for argument in in_args),
+            tuple(typename_text(argument.type) for argument in out_args))
+
+class TypeLayout(object):
+    """ The flattened layout of a struct, union or enumeration.
+
+        declaration:
+            The type.
+
+        bases:
+            The base Declarations, the direct base first.
+
+        members:
+            The fields (or enumerators) of the type and its bases, those
+            of the outermost base first, each in declaration order.
+
+        inherited:
+            The number of members declared by the bases, i.e. the index
+            of the first member declared by the type itself.
+
+        is_polymorphic:
+            True if the type or one of its bases is a polymorphic struct.
+    """
+    __slots__ = ('declaration', 'bases', 'members', 'inherited', 'is_polymorphic',
+                 'documents', '_index')
+
+    def __init__(self, declaration, base_layout=None):
+        self.declaration = declaration
+        own = declaration.members()
+        if base_layout is None:
+            self.bases = []
+            self.members = list(own)
+            self.inherited = 0
+            self.is_polymorphic = False
+            self._index = {}
+            self.documents = frozenset((declaration.document,))
+        else:
+            self.bases = [base_layout.declaration] + base_layout.bases
+            self.members = base_layout.members + own
+            self.inherited = len(base_layout.members)
+            self.is_polymorphic = base_layout.is_polymorphic
+            self._index = dict(base_layout._index)
+            self.documents = base_layout.documents | frozenset((declaration.document,))
+        self.is_polymorphic = self.is_polymorphic or bool(getattr(declaration.node, 'is_polymorphic', False))
+        for index in range(self.inherited, len(self.members)):
+            member = self.members[index]
+            if member.name in self._index:
+                owner = self.members[self._index[member.name]].parent
+                raise InheritanceError('%s %s of %s is already declared by %s' % (
+                    member.kind, member.name, declaration.qualified_name, owner.qualified_name))
+            self._index[member.name] = index
+
+    def index(self, name):
+        """ Returns the position of the member called name in members,
+            or None.
+        """
+        return self._index.get(name)
+
+    def member(self, name):
+        index = self._index.get(name)
+        return self.members[index] if index is not None else None
+
+    def __len__(self):
+        return len(self.members)
+
+class MemberTable(object):
+    """ The flattened methods, broadcasts or attributes of an interface,
+        indexed by member ID.
+
+        kind:
+            'method', 'broadcast' or 'attribute'.
+
+        members:
+            The Declarations, the ID of a member is its index. The members
+            of the outermost base come first, so an interface keeps the
+            IDs of its bases and a handler table built for a base stays
+            valid for calls on the derived interface. An overriding
+            member takes the ID of the member it overrides.
+
+        inherited:
+            The number of members declared by the bases.
+    """
+    __slots__ = ('kind', 'members', 'inherited', '_index')
+
+    def __init__(self, kind, base_table=None):
+        self.kind = kind
+        if base_table is None:
+            self.members = []
+            self._index = {}
+        else:
+            self.members = list(base_table.members)
+            self._index = dict(base_table._index)
+        self.inherited = len(self.members)
+
+    def id(self, name):
+        """ Returns the ID of the member called name, or None.
+        """
+        return self._index.get(name)
+
+    def member(self, name):
+        member_id = self._index.get(name)
+        return self.members[member_id] if member_id is not None else None
+
+    def __getitem__(self, member_id):
+        return self.members[member_id]
+
+    def __len__(self):
+        return len(self.members)
+
+class InterfaceLayout(object):
+    """ The flattened dispatch tables of an interface.
+
+        declaration:
+            The interface.
+
+        bases:
+            The base interfaces, the direct base first.
+
+        methods, broadcasts, attributes:
+            The MemberTables of the interface.
+
+        overrides:
+            List of (member, overridden member) Declaration tuples, for
+            the members of the interface redeclaring one of a base with
+            the same signature.
+    """
+    __slots__ = ('declaration', 'bases', 'methods', 'broadcasts', 'attributes', 'overrides',
+                 'documents')
+
+    def __init__(self, declaration, base_layout=None):
+        self.declaration = declaration
+        self.overrides = []
+        if base_layout is None:
+            self.bases = []
+            self.documents = frozenset((declaration.document,))
+        else:
+            self.bases = [base_layout.declaration] + base_layout.bases
+            self.documents = base_layout.documents | frozenset((declaration.document,))
+        for kind in DISPATCH_KINDS:
+            base_table = base_layout.table(kind) if base_layout is not None else None
+            setattr(self, kind + 's', MemberTable(kind, base_table))
+        for member in declaration.members():
+            if member.kind in DISPATCH_KINDS:
+                self._add(self.table(member.kind), member)
+
+    def _add(self, table, member):
+        member_id = table._index.get(member.name)
+        if member_id is None:
+            table._index[member.name] = len(table.members)
+            table.members.append(member)
+            return
+        existing = table.members[member_id]
+        if existing.parent is self.declaration:
+            raise InheritanceError('%s %s of %s is already declared' % (
+                member.kind, member.name, self.declaration.qualified_name))
+        if member_signature(member) != member_signature(existing):
+            raise InheritanceError('%s %s of %s conflicts with %s, its signature differs' % (
+                member.kind, member.name, self.declaration.qualified_name, existing.qualified_name))
+        table.members[member_id] = member
+        self.overrides.append((member, existing))
+
+    def table(self, kind):
+        """ Returns the MemberTable of kind, one of DISPATCH_KINDS.
+        """
+        return getattr(self, kind + 's')
+
+class TypeHierarchy(object):
+    """ Bases and flattened layouts of the structs, unions and
+        enumerations of a ModelSet, and the dispatch tables of its
+        interfaces.
+
+        Layouts are computed on first use and cached. A cached layout is
+        dropped once a document it was built from (the one of the type or
+        of one of its bases) is replaced or removed from the ModelSet, so
+        a hierarchy can be kept across reparses, e.g. in the watch mode.
+    """
+    def __init__(self, model_set):
+        self.model_set = model_set
+        self._revision = None
+        self._resolver = None
+        self._layouts = {}
+        self._building = set()
+
+    def _refresh(self):
+        if self._revision == self.model_set.revision:
+            return
+        self._revision = self.model_set.revision
+        self._resolver = NameResolver(self.model_set, REFERENCE_KINDS)
+        documents = self.model_set.documents
+        self._layouts = dict(
+            (declaration, layout) for declaration, layout in self._layouts.items()
+            if all(documents.get(document.filename) is document for document in layout.documents))
+
+    def base(self, declaration):
+        """ Returns the Declaration declaration extends, or None. Raises
+            InheritanceError if the base does not resolve or is of
+            another kind.
+        """
+        self._refresh()
+        name = base_name(declaration)
+        if name is None:
+            return None
+        base = self._resolver.resolve(declaration, name)
+        if base is None:
+            raise InheritanceError('base %s of %s not found' % (name, declaration.qualified_name))
+        if base.kind != declaration.kind:
+            raise InheritanceError('%s %s cannot extend %s %s' % (
+                declaration.kind, declaration.qualified_name, base.kind, base.qualified_name))
+        return base
+
+    def layout(self, declaration):
+        """ Returns the TypeLayout of a struct, union or enumeration
+            Declaration, or the InterfaceLayout of an interface. Raises
+            InheritanceError if its bases or members are invalid.
+        """
+        self._refresh()
+        layout = self._layouts.get(declaration)
+        if layout is not None:
+            return layout
+        if declaration in self._building:
+            raise InheritanceError('%s extends itself' % declaration.qualified_name)
+        self._building.add(declaration)
+        try:
+            base = self.base(declaration)
+            layout_class = InterfaceLayout if declaration.kind == 'interface' else TypeLayout
+            layout = layout_class(declaration, self.layout(base) if base is not None else None)
+        finally:
+            self._building.discard(declaration)
+        self._layouts[declaration] = layout
+        return layout
+
+    def derived(self, declaration):
+        """ Returns the list of types extending declaration directly.
+        """
+        self._refresh()
+        return [candidate for candidate in self.model_set.declarations()
+                if candidate.kind == declaration.kind and base_name(candidate) is not None and
+                   declaration in self._resolver.candidates(candidate, base_name(candidate))]
+
+    def errors(self):
+        """ Returns the list of (Declaration, InheritanceError) tuples of
+            all types and interfaces with invalid bases or members.
+        """
+        errors = []
+        for declaration in self.model_set.declarations():
+            if declaration.kind in EXTENSIBLE_KINDS:
+                try:
+                    self.layout(declaration)
+                except InheritanceError as e:
+                    errors.append((declaration, e))
+        return errors
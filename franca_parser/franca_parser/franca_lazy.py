@@ -0,0 +1,353 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_lazy.py
+#
+# Lazy parsing of Franca documents: skim() finds the package, the imports,
+# the interfaces and type collections and the name, kind and source span of
+# every member of those with a single regular expression pass and brace
+# matching, without lexing or parsing the member bodies. The AST of a member
+# is only parsed when it is first accessed, and cached.
+#
+# This is what tools that mostly need names (completion, indexing, doc
+# navigation) should use to open large sets of documents.
+#
+# Example:
+#
+#   document = skim(text, 'big.fidl')
+#   for root in document.roots:
+#       for member in root.members:
+#           print(root.name, member.kind, member.name)
+#   method_node = document.roots[0].member('Add').node
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+import re
+
+from . import franca_ast
+from .franca_parser import FrancaParser
+
+# Member keyword -> (declaration kind, index of the name among the
+# identifiers before the body, None if the member has no name).
+MEMBER_KEYWORDS = {
+    'version': ('version', None),
+    'struct': ('struct', 0),
+    'union': ('union', 0),
+    'enumeration': ('enumeration', 0),
+    'map': ('map', 0),
+    'method': ('method', 0),
+    'broadcast': ('broadcast', 0),
+    'array': ('array', 0),
+    'typedef': ('typedef', 0),
+    'attribute': ('attribute', 1),
+    'const': ('constant', 1),
+}
+
+ROOT_KEYWORDS = {
+    'interface': 'interface',
+    'typeCollection': 'typeCollection',
+}
+
+# Members whose declaration ends with the brace closing their body. The
+# others (attributes, arrays, typedefs and constants) end with their last
+# token.
+_BRACED_KINDS = frozenset(('version', 'struct', 'union', 'enumeration', 'map', 'method', 'broadcast'))
+
+# The tokens skim() looks at: the starts of comments and strings, braces
+# and, outside of member bodies, (qualified) identifiers. Comments are then
+# skipped with str.find() and unterminated ones run to the end of the input,
+# so every position is looked at once.
+_token_re = re.compile(r'<\*\*|/\*|//|"|\{|\}|[a-zA-Z_$][0-9a-zA-Z_$]*(?:\.[a-zA-Z_$][0-9a-zA-Z_$]*)*')
+_body_token_re = re.compile(r'<\*\*|/\*|//|"|\{|\}')
+_string_re = re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"?')
+
+class LazyMember(object):
+    """ A member of an interface or type collection found by skim().
+
+        kind:
+            The declaration kind, e.g. 'struct' or 'method', or
+            'version'.
+
+        name:
+            The name, None for the version.
+
+        line, column:
+            The (1-based) position of the name, like a Coord.
+
+        start, end:
+            The span of the declaration in the document text, including
+            its Franca comment.
+
+        comment:
+            The FrancaComment of the member, or None.
+
+        root:
+            The LazyRoot the member belongs to.
+    """
+    __slots__ = ('kind', 'name', 'line', 'column', 'start', 'end', 'start_line', 'start_column',
+                 'comment', 'root', 'errors', '_node')
+
+    def __init__(self, kind, root, start, start_line, start_column):
+        self.kind = kind
+        self.name = None
+        self.line = start_line
+        self.column = start_column
+        self.start = start
+        self.end = start
+        self.start_line = start_line
+        self.start_column = start_column
+        self.comment = None
+        self.root = root
+        self.errors = None
+        self._node = None
+
+    @property
+    def text(self):
+        return self.root.document.text[self.start:self.end]
+
+    @property
+    def node(self):
+        """ The AST node of the member, e.g. a Struct, parsed on first
+            access. None if it has syntax errors, which are then in
+            errors as (msg, line, column) tuples.
+        """
+        if self.errors is None:
+            self.errors = []
+            document = self.root.document
+            self._node = document.parser.parse_declaration(
+                self.text, document.filename, self.start_line, self.start_column,
+                lambda msg, line, column: self.errors.append((msg, line, column)))
+        return self._node
+
+    @property
+    def is_parsed(self):
+        return self.errors is not None
+
+    def __repr__(self):
+        return '<lazy %s %s>' % (self.kind, self.name)
+
+class LazyRoot(object):
+    """ An interface or type collection found by skim().
+
+        kind:
+            'interface' or 'typeCollection'.
+
+        name, line, column:
+            The name and its (1-based) position.
+
+        base:
+            The name of the base interface as written in the source, or
+            None.
+
+        comment:
+            The FrancaComment of the root, or None.
+
+        members:
+            The LazyMembers, in source order.
+
+        document:
+            The LazyDocument.
+    """
+    __slots__ = ('kind', 'name', 'line', 'column', 'base', 'comment', 'members', 'document')
+
+    def __init__(self, kind, document):
+        self.kind = kind
+        self.name = None
+        self.line = None
+        self.column = None
+        self.base = None
+        self.comment = None
+        self.members = []
+        self.document = document
+
+    def member(self, name, kind=None):
+        """ Returns the first LazyMember called name (and of kind, if
+            given), or None.
+        """
+        for member in self.members:
+            if member.name == name and (kind is None or member.kind == kind):
+                return member
+        return None
+
+    def __repr__(self):
+        return '<lazy %s %s>' % (self.kind, self.name)
+
+class LazyDocument(object):
+    """ Result of skim().
+
+        filename, text:
+            The file name and source text.
+
+        package:
+            The package name, e.g. 'org.example', or ''.
+
+        imports:
+            List of (imported namespace, imported file) tuples, as in
+            franca_model.ModelDocument.
+
+        roots:
+            The LazyRoots, in source order.
+
+        parser:
+            The FrancaParser members are parsed with, created on first
+            use if none was given.
+    """
+    def __init__(self, filename, text, parser=None):
+        self.filename = filename
+        self.text = text
+        self.package = ''
+        self.imports = []
+        self.roots = []
+        self._parser = parser
+        self._ast = None
+        self._errors = None
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            self._parser = FrancaParser()
+        return self._parser
+
+    def members(self):
+        """ Yields all LazyMembers of the document.
+        """
+        for root in self.roots:
+            for member in root.members:
+                yield member
+
+    def parse(self):
+        """ Returns the (FrancaDocument, errors) of a full parse of the
+            document, cached, e.g. for a tool that needs the complete AST
+            after all.
+        """
+        if self._errors is None:
+            self._errors = []
+            self._ast = self.parser.parse(
+                self.text, self.filename,
+                lambda msg, line, column: self._errors.append((msg, line, column)))
+        return self._ast, self._errors
+
+def _end_before(text, start, position):
+    """ Returns position moved back over the whitespace before it, but
+        not before start.
+    """
+    while position > start and text[position - 1].isspace():
+        position -= 1
+    return position
+
+def skim(text, filename='', parser=None):
+    """ Skim Franca IDL source and return a LazyDocument.
+
+        Skimming only looks at comments, strings, braces and identifiers,
+        so it does not detect syntax errors. They are reported when a
+        member (or the whole document) is parsed.
+    """
+    document = LazyDocument(filename, text, parser)
+    depth = 0
+    line, line_start, counted = 1, 0, 0
+    comment = None          # (start, end, line, column) of the last Franca comment
+    root = member = None
+    header = None           # identifiers of the current root or member header
+    name_index = None       # index of the name of the current member in header
+    expect = None           # 'package', 'namespace' or 'file' while reading those
+    namespace_start = namespace_end = 0
+    position = 0
+
+    while True:
+        match = (_token_re if depth < 2 else _body_token_re).search(text, position)
+        if match is None:
+            break
+        start, token = match.start(), match.group()
+        if token == '<**':
+            end = text.find('**>', start + 3)
+            position = end + 3 if end >= 0 else len(text)
+        elif token == '/*':
+            end = text.find('*/', start + 2)
+            position = end + 2 if end >= 0 else len(text)
+        elif token == '//':
+            end = text.find('\n', start)
+            position = end if end >= 0 else len(text)
+        elif token == '"':
+            position = _string_re.match(text, start).end()
+        else:
+            position = match.end()
+        if depth >= 2:
+            if token == '{':
+                depth += 1
+            elif token == '}':
+                depth -= 1
+                if depth == 1 and member is not None and member.kind in _BRACED_KINDS:
+                    member.end = position
+                    member = None
+            continue
+
+        # line and column of start, only computed outside of member bodies
+        newlines = text.count('\n', counted, start)
+        if newlines:
+            line += newlines
+            line_start = text.rfind('\n', counted, start) + 1
+        counted = start
+        column = start - line_start + 1
+
+        if member is not None and depth == 1 and (token in ('<**', '}') or token in MEMBER_KEYWORDS):
+            # a new member, a comment or the end of the root ends the
+            # (attribute, array, typedef or constant) member before
+            member.end = _end_before(text, member.start, start)
+            member = None
+
+        if token == '<**':
+            comment = (start, position, line, column)
+        elif token in ('/*', '//'):
+            pass
+        elif token == '"':
+            if expect == 'file':
+                namespace = re.sub(r'\s+', '', text[namespace_start:namespace_end])
+                document.imports.append((namespace, text[start + 1:position - 1]))
+                expect = None
+        elif token == '{':
+            depth += 1
+            if depth == 1 and root is not None:
+                comment = header = None
+        elif token == '}':
+            depth = max(depth - 1, 0)
+            if depth == 0:
+                root = comment = None
+        elif depth == 0:
+            if token == 'package':
+                expect = 'package'
+            elif expect == 'package':
+                document.package = token
+                expect = None
+            elif token == 'import':
+                expect, namespace_start = 'namespace', position
+            elif token == 'from' and expect == 'namespace':
+                expect, namespace_end = 'file', start
+            elif token in ROOT_KEYWORDS:
+                root = LazyRoot(ROOT_KEYWORDS[token], document)
+                if comment is not None:
+                    root.comment = franca_ast.FrancaComment(text, comment[0], comment[1])
+                document.roots.append(root)
+                comment, header = None, []
+            elif root is not None and header is not None:
+                if root.name is None:
+                    root.name, root.line, root.column = token, line, column
+                elif header[-1:] == ['extends']:
+                    root.base = token
+                header.append(token)
+        elif root is not None:
+            if token in MEMBER_KEYWORDS:
+                kind, name_index = MEMBER_KEYWORDS[token]
+                if comment is not None:
+                    member = LazyMember(kind, root, comment[0], comment[2], comment[3])
+                    member.comment = franca_ast.FrancaComment(text, comment[0], comment[1])
+                else:
+                    member = LazyMember(kind, root, start, line, column)
+                root.members.append(member)
+                comment, header = None, []
+            elif member is not None and header is not None:
+                if len(header) == name_index:
+                    member.name, member.line, member.column = token, line, column
+                header.append(token)
+
+    if member is not None:
+        member.end = _end_before(text, member.start, len(text))
+    return document
@@ -9,20 +9,31 @@
 # Copyright (C) 2016, Ingmar Lehmann
 # License: BSD
 #------------------------------------------------------------------------------
+import re
+
 from ply import lex
 from ply.lex import TOKEN
 
 class FrancaLexer(object):
-        def __init__(self, error_func):
+        def __init__(self, error_func, drop_comments=False):
             """ Create a new Lexer.
                 error_func:
                     An error function. Will be called with an error
                     message, line and column as arguments, in case of
                     an error during lexing.
+
+                drop_comments:
+                    If True, Franca comments (<** ... **>) are
+                    discarded like C comments instead of being
+                    passed on to the parser. Useful for tools that
+                    never look at documentation, e.g. code generators.
             """
             self.error_func = error_func
+            self.drop_comments = drop_comments
             self.last_token = None
             self.filename = ''
+            # StreamHandler of a FrancaParser.parse_stream() call
+            self.handler = None
 
         def build(self, **kwargs):
             """ Builds the lexer from the specification. Must be
@@ -33,6 +44,32 @@ class FrancaLexer(object):
             """
             self.lexer = lex.lex(object=self, **kwargs)
 
+        def clone(self, error_func=None):
+            """ Returns a new FrancaLexer sharing the compiled tables of
+                this (built) lexer, but with its own input, position
+                and line number. Clones can be used concurrently from
+                different threads.
+
+                error_func:
+                    Error function of the clone, defaults to the one
+                    of this lexer.
+            """
+            lexer = FrancaLexer(error_func or self.error_func, self.drop_comments)
+            lexer.lexer = self.lexer.clone()
+            # The rules (and the error function) have to be rebound to the
+            # clone, they would use the input and error function of this
+            # lexer otherwise. PLY's clone(object) does not rebind the
+            # current state and drops all but the last part of a master
+            # regex that had to be split (as on Python 2), so it is done
+            # here.
+            lexer.lexer.lexre = [
+                (regex, [(getattr(lexer, rule[0].__name__), rule[1]) if rule and rule[0] else rule
+                         for rule in rules])
+                for regex, rules in self.lexer.lexre]
+            lexer.lexer.lexerrorf = lexer.t_error
+            lexer.lexer.lineno = 1
+            return lexer
+
         def input(self, text):
             self.lexer.input(text)
 
@@ -40,6 +77,48 @@ class FrancaLexer(object):
             self.last_token = self.lexer.token()
             return self.last_token
 
+        def reset_lineno(self):
+            """ Resets the internal line number counter of the lexer.
+            """
+            self.lexer.lineno = 1
+
+        def find_column(self, lexpos):
+            """ Find the (1-based) column of the character at position
+                lexpos of the input.
+            """
+            last_cr = self.lexer.lexdata.rfind('\n', 0, lexpos)
+            return lexpos - last_cr
+
+        def _error(self, msg, token):
+            self.error_func(msg, token.lineno, self.find_column(token.lexpos))
+            self.lexer.skip(1)
+
+        def _comment_end(self, t, delimiter, msg):
+            """ Moves the lexer behind the end of the comment t is the
+                opening delimiter of, and returns that position. If the
+                comment is not closed, reports msg and returns None, the
+                lexer is then at the end of the input.
+
+                Finding the end with str.find() looks at every character
+                once. A regular expression for the whole comment would
+                backtrack over the star runs of long or unterminated ones.
+            """
+            data = t.lexer.lexdata
+            end = data.find(delimiter, t.lexer.lexpos)
+            if end >= 0:
+                end += len(delimiter)
+            else:
+                self._token_error(msg, t)
+            t.lexer.lineno += data.count('\n', t.lexpos, end if end >= 0 else len(data))
+            t.lexer.lexpos = end if end >= 0 else len(data)
+            return end if end >= 0 else None
+
+        def _token_error(self, msg, token):
+            """ Reports an error at the start of a token that has already
+                been consumed, e.g. an unterminated comment.
+            """
+            self.error_func(msg, token.lineno, self.find_column(token.lexpos))
+
 
         ##
         ## Reserved keywords
@@ -154,7 +233,7 @@ class FrancaLexer(object):
         # floating constants (K&R2: A.2.5.3)
         exponent_part = r"""([eE][-+]?[0-9]+)"""
         fractional_constant = r"""([0-9]*\.[0-9]+)|([0-9]+\.)"""
-        floating_constant = '(((('+fractional_constant+')'+exponent_part+'?)|([0-9]+'+exponent_part+'))[FfLl]?)'
+        floating_constant = '(((('+fractional_constant+')'+exponent_part+'?)|([0-9]+'+exponent_part+'))[FfLlDd]?)'
         binary_exponent_part = r'''([pP][+-]?[0-9]+)'''
         hex_fractional_constant = '((('+hex_digits+r""")?\."""+hex_digits+')|('+hex_digits+r"""\.))"""
         hex_floating_constant = '('+hex_prefix+'('+hex_digits+'|'+hex_fractional_constant+')'+binary_exponent_part+'[FfLl]?)'
@@ -166,29 +245,67 @@ class FrancaLexer(object):
         # parse all correct code, even if it means to sometimes parse incorrect
         # code.
         #
+        # An escape sequence is matched as the backslash and one character:
+        # the other digits of a decimal escape and the digits of a hex
+        # escape (x being a simple escape) are ordinary string characters.
+        # That accepts the same strings as (\d+) and (x[0-9a-fA-F]+) escapes
+        # would, but there is only one way to split a string into
+        # characters, so a failing match cannot backtrack.
+        #
         simple_escape = r"""([a-zA-Z._~!=&\^\-\\?'"])"""
-        decimal_escape = r"""(\d+)"""
-        hex_escape = r"""(x[0-9a-fA-F]+)"""
+        decimal_escape = r"""(\d)"""
         #bad_escape = r"""([\\][^a-zA-Z._~^!=&\^\-\\?'"x0-7])"""
 
-        escape_sequence = r"""(\\("""+simple_escape+'|'+decimal_escape+'|'+hex_escape+'))'
+        escape_sequence = r"""(\\("""+simple_escape+'|'+decimal_escape+'))'
 
         # string literals (K&R2: A.2.6)
-        string_char = r"""([^"\\\n]|"""+escape_sequence+')'
-        string_literal = '"'+string_char+'*"'
+        string_char = r"""[^"\\\n]"""
+        string_literal = '"'+string_char+'*('+escape_sequence+string_char+'*)*"'
         #bad_string_literal = '"'+string_char+'*'+bad_escape+string_char+'*"'
+        string_literal_re = re.compile(string_literal + r'\Z')
+
+        # Anything from a quote up to the closing quote, the end of the line
+        # or the end of the input, with any escapes. Always matches, so a
+        # bad string costs one pass over it and then an error, not a retry
+        # at every following quote.
+        string_scan = '"'+string_char+r'*(\\.?'+string_char+'*)*"?'
+
+        # Only the opening delimiters of block comments, the comment then
+        # runs up to the first closing delimiter, see _comment_end().
+        c_comment = r'(/\*)|(//.*)'
+        franca_comment = r'<\*\*'
 
         def t_WHITESPACE(self, t):
-            r'\s+'
+            r'[ \t\r\f\v]+'
             pass # skip space, \r, \t, etc
        
-        t_STRING_LITERAL = string_literal 
-      
-        def t_C_COMMENT(self, t):
-            r'(/\*([^*]|[\r\n]|(\*+([^*/]|[\r\n])))*\*+/)|(//.*)' # C and C++ style comments, single and multi line.
-            pass # discard c and c++ style comments
+        @TOKEN(string_scan)
+        def t_STRING_LITERAL(self, t):
+            if self.string_literal_re.match(t.value):
+                return t
+            body = t.value[1:]
+            escapes = len(body) - 1 - len(body[:-1].rstrip('\\'))
+            if body.endswith('"') and escapes % 2 == 0:
+                self._token_error('Invalid escape sequence in string %s' % t.value, t)
+            else:
+                self._token_error('Unterminated string', t)
 
-        t_FRANCA_COMMENT = r'\<\*{2,}([^*]|[\r\n]|(\*+([^*\>]|[\r\n])))*\*{2,}\>'
+        @TOKEN(c_comment)
+        def t_C_COMMENT(self, t):
+            # C and C++ style comments, single and multi line.
+            if t.value == '/*':
+                self._comment_end(t, '*/', 'Unterminated comment')
+            # discard c and c++ style comments
+
+        @TOKEN(franca_comment)
+        def t_FRANCA_COMMENT(self, t):
+            end = self._comment_end(t, '**>', 'Unterminated Franca comment')
+            if end is None or self.drop_comments:
+                return None
+            # Only keep the span of the comment, the text itself stays in
+            # the lexer input buffer until somebody asks for it.
+            t.value = (t.lexpos, end)
+            return t
         
         def t_NEWLINE(self,t):
             r'\n+'
@@ -284,5 +401,4 @@ class FrancaLexer(object):
 
         def t_error(self, t):
             msg = 'Illegal character %s' % repr(t.value[0])
-            print(msg)
-            self.lexer.skip(1)
+            self._error(msg, t)
@@ -0,0 +1,544 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_lint.py
+#
+# Linter class: Checks style and design rules on a ModelSet in a single
+#               traversal of every document.
+#
+# A rule is a Rule subclass registered with @register. Like a NodeVisitor,
+# it defines visit_XXX(node, context) methods for the node classes it is
+# interested in; the Linter walks the AST of each document once and calls
+# the methods of all rules for every node, so the lint time grows with the
+# size of the models and hardly with the number of rules. Rules that need
+# to know about the whole model set (e.g. which types are used anywhere)
+# compute it once in prepare(), before the documents are checked, from the
+# LintModel shared by all rules. Its DependencyGraph resolves the type
+# references once for all of them.
+#
+# Documents are checked in parallel: on a pool of forked processes, which
+# inherit the model set and the prepared rules, or on threads on
+# free-threaded builds.
+#
+# Example rule:
+#
+#   @register
+#   class NoFireAndForget(Rule):
+#       name = 'no-fire-and-forget'
+#
+#       def visit_Method(self, node, context):
+#           if node.is_fire_and_forget:
+#               context.report(self, node, 'fireAndForget methods are not allowed')
+#
+# Run 'python -m franca_parser.franca_lint --help' for the command line
+# interface, which prints the diagnostics as text or JSON and loads rules
+# from other modules with --plugin.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import importlib
+import json
+import os
+import re
+import sys
+
+from collections import OrderedDict
+
+from . import franca_ast
+from .franca_depgraph import DependencyGraph, user_of
+from .franca_model import (BASIC_TYPES, ROOT_KINDS, TYPE_KINDS, ModelSet, declaration_name,
+                           method_arguments, version_of)
+from .franca_parser import _cpu_count, gil_enabled
+
+ERROR = 'error'
+WARNING = 'warning'
+INFO = 'info'
+
+SEVERITIES = (ERROR, WARNING, INFO)
+
+# Rule name -> Rule subclass, in the order of registration.
+RULES = OrderedDict()
+
+def register(rule_class):
+    """ Class decorator adding a Rule subclass to RULES, so the Linter
+        runs it by default.
+    """
+    if not rule_class.name:
+        raise ValueError('%s has no name' % rule_class.__name__)
+    RULES[rule_class.name] = rule_class
+    return rule_class
+
+def node_coord(node):
+    """ Returns the Coord of a node: its own, the one of its name, or the
+        first one found among its children. None if there is none.
+    """
+    coord = getattr(node, 'coord', None)
+    if coord is not None:
+        return coord
+    name = declaration_name(node)
+    if name is not None:
+        return name.coord
+    for child_name, child in node.children():
+        coord = node_coord(child)
+        if coord is not None:
+            return coord
+    return None
+
+class Diagnostic(object):
+    """ A rule violation.
+
+        rule:
+            Name of the rule, 'syntax' for parse errors.
+
+        severity:
+            ERROR, WARNING or INFO.
+
+        filename, line, column:
+            Source position, line and column are 1-based and None if
+            unknown.
+
+        path:
+            Qualified name of the innermost declaration the violation
+            is in, None outside of declarations.
+    """
+    __slots__ = ('rule', 'severity', 'message', 'filename', 'line', 'column', 'path')
+
+    def __init__(self, rule, severity, message, filename, line=None, column=None, path=None):
+        self.rule = rule
+        self.severity = severity
+        self.message = message
+        self.filename = filename
+        self.line = line
+        self.column = column
+        self.path = path
+
+    def sort_key(self):
+        return (self.filename, self.line or 0, self.column or 0, self.rule, self.message)
+
+    def to_tuple(self):
+        return (self.rule, self.severity, self.message, self.filename, self.line, self.column, self.path)
+
+    def to_dict(self):
+        return {'rule': self.rule, 'severity': self.severity, 'message': self.message,
+                'filename': self.filename, 'line': self.line, 'column': self.column,
+                'path': self.path}
+
+    def __str__(self):
+        position = ':'.join(str(value) for value in (self.filename, self.line, self.column)
+                            if value is not None)
+        return '%s: %s: %s [%s]' % (position, self.severity, self.message, self.rule)
+
+class Rule(object):
+    """ Base class of lint rules. Subclasses set name (used to select and
+        report the rule) and define visit_XXX(node, context) methods,
+        where XXX is a franca_ast class name. One instance is shared by
+        all documents and workers, per-document state belongs in
+        context.state(self).
+
+        severity:
+            Severity of the diagnostics of the rule, unless given to
+            LintContext.report().
+    """
+    name = None
+    severity = WARNING
+    description = ''
+
+    def prepare(self, model):
+        """ Called once with the LintModel before any document is
+            checked.
+        """
+        pass
+
+    def begin_document(self, context):
+        pass
+
+    def end_document(self, context):
+        pass
+
+class LintModel(object):
+    """ The model set being checked, and what rules derive from it, built
+        on first use and shared by all rules.
+    """
+    def __init__(self, model_set):
+        self.model_set = model_set
+        self._graph = None
+
+    @property
+    def graph(self):
+        """ The DependencyGraph of the model set. """
+        if self._graph is None:
+            self._graph = DependencyGraph(self.model_set)
+        return self._graph
+
+class LintContext(object):
+    """ What rules know about the document being checked.
+
+        model, document:
+            The LintModel and the ModelDocument.
+
+        declaration:
+            The innermost Declaration containing the node being visited
+            (the node itself if it is a declaration), None outside of
+            declarations.
+    """
+    def __init__(self, model, document):
+        self.model = model
+        self.document = document
+        self.declaration = None
+        self.diagnostics = []
+        self._declarations = None
+        self._states = {}
+
+    def declaration_of(self, node):
+        """ Returns the Declaration of a declaration node, or None. """
+        if self._declarations is None:
+            self._declarations = dict((id(declaration.node), declaration)
+                                      for declaration in self.document.declarations)
+        return self._declarations.get(id(node))
+
+    def state(self, rule):
+        """ Returns a dictionary for the rule's own use, one per
+            document.
+        """
+        return self._states.setdefault(rule.name, {})
+
+    def report(self, rule, node, message, severity=None, declaration=None):
+        """ Records a diagnostic of rule at the position of node (a
+            franca_ast node or a Coord).
+        """
+        coord = node if isinstance(node, franca_ast.Coord) else node_coord(node)
+        declaration = declaration or self.declaration
+        self.diagnostics.append(Diagnostic(
+            rule.name, severity or rule.severity, message, self.document.filename,
+            coord.line if coord is not None else None,
+            coord.column if coord is not None else None,
+            declaration.qualified_name if declaration is not None else None))
+
+class Linter(object):
+    """ Runs a set of rules on the documents of a ModelSet.
+
+        rules:
+            Rule instances, by default one of each registered rule.
+    """
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = [rule_class() for rule_class in RULES.values()]
+        self.rules = list(rules)
+        # node class name -> visit methods of the rules, in rule order
+        self._dispatch = {}
+        for rule in self.rules:
+            for attribute in dir(rule):
+                if attribute.startswith('visit_'):
+                    self._dispatch.setdefault(attribute[len('visit_'):], []).append(
+                        getattr(rule, attribute))
+
+    def lint(self, model_set, jobs=1):
+        """ Checks all documents of model_set and returns the sorted list
+            of Diagnostics, including the parse errors of model_set.
+
+            jobs:
+                Number of documents checked in parallel, None for the
+                number of CPUs.
+        """
+        model = LintModel(model_set)
+        for rule in self.rules:
+            rule.prepare(model)
+        documents = list(model_set.documents.values())
+        if jobs is None:
+            jobs = _cpu_count()
+        jobs = min(jobs, len(documents))
+
+        diagnostics = [Diagnostic('syntax', ERROR, msg, filename, line, column)
+                       for filename, msg, line, column in model_set.errors]
+        if jobs <= 1:
+            for document in documents:
+                diagnostics.extend(self.lint_document(model, document))
+        elif gil_enabled() and hasattr(os, 'fork'):
+            diagnostics.extend(self._lint_forked(model, documents, jobs))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                for result in executor.map(lambda document: self.lint_document(model, document),
+                                           documents):
+                    diagnostics.extend(result)
+        diagnostics.sort(key=Diagnostic.sort_key)
+        return diagnostics
+
+    def lint_document(self, model, document):
+        """ Checks one ModelDocument, in one traversal of its AST.
+            prepare() of the rules must have been called with model.
+        """
+        context = LintContext(model, document)
+        for rule in self.rules:
+            rule.begin_document(context)
+        dispatch = self._dispatch
+        stack = [(document.ast, None)]
+        while stack:
+            node, declaration = stack.pop()
+            declaration = context.declaration_of(node) or declaration
+            context.declaration = declaration
+            for visit in dispatch.get(node.__class__.__name__, ()):
+                visit(node, context)
+            children = node.children()
+            for index in range(len(children) - 1, -1, -1):
+                stack.append((children[index][1], declaration))
+        context.declaration = None
+        for rule in self.rules:
+            rule.end_document(context)
+        return context.diagnostics
+
+    def _lint_forked(self, model, documents, jobs):
+        # The workers are forked after prepare(), so they share the model
+        # and the rules with this process instead of unpickling them.
+        global _forked
+        import multiprocessing
+        if hasattr(multiprocessing, 'get_context'):
+            multiprocessing = multiprocessing.get_context('fork')
+        _forked = (self, model, documents)
+        try:
+            pool = multiprocessing.Pool(jobs)
+            try:
+                results = pool.map(_lint_forked_document, range(len(documents)),
+                                   max(1, len(documents) // (jobs * 4)))
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _forked = None
+        return [Diagnostic(*values) for result in results for values in result]
+
+_forked = None
+
+def _lint_forked_document(index):
+    linter, model, documents = _forked
+    return [diagnostic.to_tuple() for diagnostic in linter.lint_document(model, documents[index])]
+
+#------------------------------------------------------------------------------
+# Rules
+#------------------------------------------------------------------------------
+_UPPER_CAMEL_CASE = r'^[A-Z][A-Za-z0-9]*$'
+
+@register
+class NamingRule(Rule):
+    """ Names must match the pattern of their declaration kind.
+
+        patterns:
+            Declaration kind -> regular expression. Kinds that are not
+            in it are not checked.
+    """
+    name = 'naming'
+    description = 'names follow the naming conventions of their kind'
+    patterns = {
+        'interface': _UPPER_CAMEL_CASE,
+        'typeCollection': _UPPER_CAMEL_CASE,
+        'struct': _UPPER_CAMEL_CASE,
+        'union': _UPPER_CAMEL_CASE,
+        'enumeration': _UPPER_CAMEL_CASE,
+        'map': _UPPER_CAMEL_CASE,
+        'typedef': _UPPER_CAMEL_CASE,
+        'array': _UPPER_CAMEL_CASE,
+        'method': _UPPER_CAMEL_CASE,
+        'broadcast': _UPPER_CAMEL_CASE,
+    }
+
+    def __init__(self, patterns=None):
+        if patterns is not None:
+            self.patterns = patterns
+        self._compiled = dict((kind, re.compile(pattern)) for kind, pattern in self.patterns.items())
+
+    def _check(self, node, context):
+        declaration = context.declaration_of(node)
+        if declaration is None:
+            # e.g. an implicit array
+            return
+        pattern = self._compiled.get(declaration.kind)
+        if pattern is not None and not pattern.match(declaration.name):
+            context.report(self, node, '%s name %r does not match %s' % (
+                declaration.kind, declaration.name, pattern.pattern))
+
+    visit_Interface = visit_TypeCollection = visit_Struct = visit_Union = _check
+    visit_Enum = visit_Enumerator = visit_Map = visit_Typedef = _check
+    visit_ArrayTypeDeclaration = visit_Method = visit_BroadcastMethod = _check
+    visit_Attribute = visit_Variable = visit_MethodArgument = visit_Constant = _check
+
+@register
+class MissingDescriptionRule(Rule):
+    """ Declarations of the given kinds must have a comment with a
+        non-empty @description tag.
+    """
+    name = 'missing-description'
+    description = 'interfaces, types, methods, broadcasts and attributes are described'
+    kinds = ROOT_KINDS | TYPE_KINDS | frozenset(('method', 'broadcast', 'attribute'))
+
+    def _check(self, node, context):
+        declaration = context.declaration_of(node)
+        if declaration is None or declaration.kind not in self.kinds:
+            return
+        comment = declaration.comment
+        if comment is None or not comment.tag('description'):
+            context.report(self, node, '%s %s has no @description' % (declaration.kind, declaration.name))
+
+    visit_Interface = visit_TypeCollection = visit_Struct = visit_Union = _check
+    visit_Enum = visit_Map = visit_Typedef = visit_ArrayTypeDeclaration = _check
+    visit_Method = visit_BroadcastMethod = visit_Attribute = _check
+
+@register
+class UnresolvedTypeRule(Rule):
+    """ Referenced types must be basic types or declared in the model
+        set.
+    """
+    name = 'unresolved-type'
+    severity = ERROR
+    description = 'referenced types are declared'
+
+    def prepare(self, model):
+        self.unresolved = model.graph.unresolved
+
+    def visit_Typename(self, node, context):
+        if isinstance(node.typename, franca_ast.Node) or node.typename in BASIC_TYPES:
+            return
+        if (context.declaration is not None and
+                node.typename in self.unresolved.get(user_of(context.declaration), ())):
+            context.report(self, node, 'unknown type %s' % node.typename)
+
+@register
+class UnusedTypeRule(Rule):
+    """ Types must be referenced by some declaration of the model set. """
+    name = 'unused-type'
+    description = 'declared types are used'
+
+    def prepare(self, model):
+        self.used = set(declaration for declaration, users in model.graph.users.items()
+                        if users - set([declaration]))
+
+    def _check(self, node, context):
+        declaration = context.declaration_of(node)
+        if declaration is not None and declaration.kind in TYPE_KINDS and declaration not in self.used:
+            context.report(self, node, '%s %s is not used' % (declaration.kind, declaration.name))
+
+    visit_Struct = visit_Union = visit_Enum = visit_Map = _check
+    visit_Typedef = visit_ArrayTypeDeclaration = _check
+
+@register
+class DuplicateMemberRule(Rule):
+    """ Members of a declaration must have different names. Methods and
+        broadcasts may be overloaded, the in and out arguments of a
+        method are separate.
+    """
+    name = 'duplicate-member'
+    severity = ERROR
+    description = 'members of a declaration have different names'
+
+    def _check(self, node, context):
+        self._report_duplicates(context, [member for member in context.declaration.members()
+                                          if member.kind not in ('method', 'broadcast', 'argument')])
+
+    visit_Interface = visit_TypeCollection = visit_Struct = visit_Union = visit_Enum = _check
+
+    def visit_Method(self, node, context):
+        for arguments in method_arguments(node):
+            self._report_duplicates(context, [context.declaration_of(argument) for argument in arguments])
+
+    visit_BroadcastMethod = visit_Method
+
+    def _report_duplicates(self, context, members):
+        seen = set()
+        for member in members:
+            if member.name in seen:
+                context.report(self, member.node, 'duplicate %s %s in %s' % (
+                    member.kind, member.name, context.declaration.name), declaration=member)
+            seen.add(member.name)
+
+@register
+class TooManyArgumentsRule(Rule):
+    """ Methods and broadcasts must have at most max_arguments in and at
+        most max_arguments out arguments.
+    """
+    name = 'too-many-arguments'
+    description = 'methods have few arguments'
+    max_arguments = 7
+
+    def __init__(self, max_arguments=None):
+        if max_arguments is not None:
+            self.max_arguments = max_arguments
+
+    def visit_Method(self, node, context):
+        for direction, arguments in zip(('in', 'out'), method_arguments(node)):
+            if len(arguments) > self.max_arguments:
+                context.report(self, node, '%s %s has %d %s arguments, more than %d' % (
+                    context.declaration.kind, context.declaration.name, len(arguments),
+                    direction, self.max_arguments))
+
+    visit_BroadcastMethod = visit_Method
+
+@register
+class MissingVersionRule(Rule):
+    """ Interfaces must have a version. """
+    name = 'missing-version'
+    description = 'interfaces have a version'
+
+    def visit_Interface(self, node, context):
+        if version_of(node) is None:
+            context.report(self, node, 'interface %s has no version' % context.declaration.name)
+
+def select_rules(select=None, ignore=None):
+    """ Returns instances of the registered rules named in select (all if
+        None) and not in ignore.
+    """
+    for name in list(select or ()) + list(ignore or ()):
+        if name not in RULES:
+            raise ValueError('unknown rule %r' % name)
+    return [rule_class() for name, rule_class in RULES.items()
+            if (select is None or name in select) and name not in (ignore or ())]
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Check style and design rules on Franca models.')
+    argparser.add_argument('paths', nargs='*', help='.fidl files or directories to search recursively')
+    argparser.add_argument('--format', choices=('text', 'json'), default='text')
+    argparser.add_argument('--select', action='append', metavar='RULE', help='run only this rule, may be given more than once')
+    argparser.add_argument('--ignore', action='append', default=[], metavar='RULE', help='do not run this rule, may be given more than once')
+    argparser.add_argument('--plugin', action='append', default=[], metavar='MODULE',
+                           help='import a module registering more rules, may be given more than once')
+    argparser.add_argument('-j', '--jobs', type=int, help='number of documents checked in parallel, the number of CPUs by default')
+    argparser.add_argument('--strict', action='store_true', help='fail on warnings as well')
+    argparser.add_argument('--list-rules', action='store_true', help='print the available rules and exit')
+    args = argparser.parse_args(argv)
+
+    for module in args.plugin:
+        importlib.import_module(module)
+    if args.list_rules:
+        for name, rule_class in RULES.items():
+            print('%-24s %-8s %s' % (name, rule_class.severity, rule_class.description))
+        return 0
+    if not args.paths:
+        argparser.error('no paths given')
+    try:
+        rules = select_rules(args.select, args.ignore)
+    except ValueError as e:
+        argparser.error(str(e))
+
+    diagnostics = Linter(rules).lint(ModelSet.load(args.paths), args.jobs)
+    counts = dict((severity, 0) for severity in SEVERITIES)
+    for diagnostic in diagnostics:
+        counts[diagnostic.severity] += 1
+    if args.format == 'json':
+        json.dump({'diagnostics': [diagnostic.to_dict() for diagnostic in diagnostics], 'counts': counts},
+                  sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        for diagnostic in diagnostics:
+            print(diagnostic)
+        print('%d errors, %d warnings, %d infos' % (counts[ERROR], counts[WARNING], counts[INFO]))
+
+    if counts[ERROR] or (args.strict and counts[WARNING]):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    # plugins register their rules with franca_parser.franca_lint, not with
+    # this __main__ module
+    from . import franca_lint
+    sys.exit(franca_lint.main())
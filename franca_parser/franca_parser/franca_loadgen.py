@@ -0,0 +1,1138 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_loadgen.py
+#
+# Load generation for Franca interfaces: generates an asyncio client and
+# server pair for an interface (from its methods, broadcasts and attributes,
+# including the inherited ones) and drives the client at a configurable
+# rate and concurrency, reporting throughput and latency percentiles.
+#
+# The generated classes talk over a stand-in for the CommonAPI transport:
+# either an in-process connection (asyncio queues, messages optionally
+# marshalled to JSON like on a socket) or a Unix socket with length prefixed
+# JSON messages. Arguments are generated per type from the descriptions of
+# the types used by the interface, which the generated module carries along,
+# so it runs without the models.
+#
+# Example:
+#
+#   source = generate_module(interface_declaration, model_set)
+#   module = load_module(source, module_name(interface_declaration))
+#
+#   async def measure():
+#       client = module.Client(await connect_local(module.Server())).start()
+#       driver = LoadDriver(client, ValueFactory(module.TYPES), rate=1000,
+#                           concurrency=8, duration=10)
+#       print(await driver.run())
+#
+# Run 'python -m franca_parser.franca_loadgen --help' for the command line
+# interface. Requires Python 3.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+import argparse
+import asyncio
+import base64
+import importlib
+import itertools
+import json
+import keyword
+import math
+import os
+import random
+import re
+import string
+import struct
+import sys
+import tempfile
+import time
+import types
+
+from collections import OrderedDict
+
+from . import franca_ast
+from .franca_constants import INTEGER_RANGES
+from .franca_generator import Generator
+from .franca_inheritance import DISPATCH_KINDS, InheritanceError, TypeHierarchy
+from .franca_model import (BASIC_TYPES, TYPE_KINDS, ConstantEvaluator, ModelSet, NameResolver,
+                           method_arguments, version_of)
+
+##
+## Wire format
+##
+
+# Message kinds. A message is a [kind, call id, member name, payload] list;
+# the call id is None for messages that get no reply.
+CALL = 'call'
+REPLY = 'reply'
+ERROR = 'error'
+GET = 'get'
+SET = 'set'
+SUBSCRIBE = 'subscribe'
+BROADCAST = 'broadcast'
+CHANGED = 'changed'
+
+_HEADER = struct.Struct('>I')
+
+def _encode_value(value):
+    if isinstance(value, bytes):
+        return {'$bytes': base64.b64encode(value).decode('ascii')}
+    raise TypeError('cannot marshal %r' % (value,))
+
+def _decode_object(obj):
+    if len(obj) == 1 and '$bytes' in obj:
+        return base64.b64decode(obj['$bytes'])
+    return obj
+
+def encode(message):
+    """ Marshals a message to bytes. ByteBuffers (bytes) are sent as
+        base64, everything else as plain JSON.
+    """
+    return json.dumps(message, separators=(',', ':'), default=_encode_value).encode('utf-8')
+
+def decode(data):
+    return json.loads(data.decode('utf-8'), object_hook=_decode_object)
+
+class QueueConnection(object):
+    """ One end of an in-process connection, see local_pair().
+
+        marshal:
+            If True, messages are encoded on send and decoded on
+            receive, so the cost (and the copying) is the same as on a
+            socket.
+    """
+    def __init__(self, incoming, outgoing, marshal=True):
+        self._incoming = incoming
+        self._outgoing = outgoing
+        self.marshal = marshal
+        self._closed = False
+
+    async def send(self, message):
+        if self._closed:
+            raise ConnectionError('connection closed')
+        self._outgoing.put_nowait(encode(message) if self.marshal else message)
+
+    async def receive(self):
+        """ Returns the next message, or None once the connection is
+            closed.
+        """
+        item = await self._incoming.get()
+        if item is None:
+            self._incoming.put_nowait(None)
+            return None
+        return decode(item) if self.marshal else item
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._outgoing.put_nowait(None)
+            self._incoming.put_nowait(None)
+
+class StreamConnection(object):
+    """ A connection over an asyncio stream, e.g. a Unix socket. Every
+        message is sent as its length (4 bytes, big endian) followed by
+        the encoded message.
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._drain_lock = asyncio.Lock()
+
+    async def send(self, message):
+        data = encode(message)
+        self.writer.write(_HEADER.pack(len(data)) + data)
+        async with self._drain_lock:
+            await self.writer.drain()
+
+    async def receive(self):
+        try:
+            header = await self.reader.readexactly(_HEADER.size)
+            return decode(await self.reader.readexactly(_HEADER.unpack(header)[0]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    def close(self):
+        self.writer.close()
+
+def local_pair(marshal=True):
+    """ Returns the two ends (client, server) of a new in-process
+        connection. Must be called from a running event loop.
+    """
+    to_server, to_client = asyncio.Queue(), asyncio.Queue()
+    return (QueueConnection(to_client, to_server, marshal),
+            QueueConnection(to_server, to_client, marshal))
+
+async def connect_local(server, marshal=True):
+    """ Starts serving server on a new in-process connection and returns
+        the client end.
+    """
+    client_end, server_end = local_pair(marshal)
+    asyncio.ensure_future(server.serve(server_end))
+    return client_end
+
+async def serve_unix(server, path):
+    """ Serves server on a Unix socket at path. Returns the asyncio
+        Server.
+    """
+    async def accept(reader, writer):
+        await server.serve(StreamConnection(reader, writer))
+    return await asyncio.start_unix_server(accept, path)
+
+async def connect_unix(path):
+    reader, writer = await asyncio.open_unix_connection(path)
+    return StreamConnection(reader, writer)
+
+##
+## Client and server runtime
+##
+
+class RemoteError(Exception):
+    """ An error the server replied with, e.g. raised by the
+        implementation of a method.
+    """
+    pass
+
+def _pack(values):
+    """ Returns the out values of a method as the client returns them:
+        None, the value or a tuple of them.
+    """
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return tuple(values)
+
+def _unpack(result, count):
+    if count == 0:
+        return []
+    if count == 1:
+        return [result]
+    return list(result)
+
+class _Endpoint(object):
+    """ Description of an interface, set by the generated subclasses.
+
+        interface, version:
+            The qualified name and (major, minor) version.
+
+        types:
+            The descriptions of the types used by the interface, see
+            ValueFactory.
+
+        methods:
+            name -> (Python name, in arguments, out arguments,
+            fireAndForget). The arguments are (name, type) tuples.
+
+        broadcasts:
+            name -> (Python name, out arguments)
+
+        attributes:
+            name -> (Python name, type)
+    """
+    interface = None
+    version = None
+    types = {}
+    methods = {}
+    broadcasts = {}
+    attributes = {}
+
+class ServerBase(_Endpoint):
+    """ Base class of the generated servers. The generated methods reply
+        with generated out values after service_time seconds; subclasses
+        override them to implement the service.
+
+        values:
+            The ValueFactory for the generated replies and the initial
+            attribute values.
+    """
+    def __init__(self, values=None, service_time=0.0):
+        self.values = values if values is not None else ValueFactory(self.types)
+        self.service_time = service_time
+        self.calls = 0
+        self._subscribers = {}
+        self._attribute_values = dict((name, self.values.value(spec[1]))
+                                      for name, spec in self.attributes.items())
+
+    async def serve(self, connection):
+        """ Handles the messages of a connection until it is closed.
+            Calls are handled concurrently.
+        """
+        pending = set()
+        try:
+            while True:
+                message = await connection.receive()
+                if message is None:
+                    break
+                task = asyncio.ensure_future(self._handle(connection, message))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            for subscribers in self._subscribers.values():
+                subscribers.discard(connection)
+            for task in pending:
+                task.cancel()
+            connection.close()
+
+    async def _handle(self, connection, message):
+        kind, call_id, name, payload = message
+        try:
+            if kind == CALL:
+                spec = self.methods.get(name)
+                if spec is None:
+                    raise RemoteError('unknown method %s' % name)
+                self.calls += 1
+                reply = _unpack(await getattr(self, spec[0])(*payload), len(spec[2]))
+            elif kind == GET:
+                reply = self._attribute(name)
+            elif kind == SET:
+                self._attribute(name)
+                await self.set_attribute(name, payload)
+                reply = None
+            elif kind == SUBSCRIBE:
+                self._subscribers.setdefault((payload, name), set()).add(connection)
+                return
+            else:
+                raise RemoteError('unknown message kind %s' % kind)
+        except Exception as e:
+            if call_id is not None:
+                await connection.send([ERROR, call_id, name, '%s: %s' % (e.__class__.__name__, e)])
+            return
+        if call_id is not None:
+            await connection.send([REPLY, call_id, name, reply])
+
+    def _attribute(self, name):
+        if name not in self._attribute_values:
+            raise RemoteError('unknown attribute %s' % name)
+        return self._attribute_values[name]
+
+    async def default_reply(self, name):
+        """ The reply of the generated implementation of method name. """
+        if self.service_time > 0:
+            await asyncio.sleep(self.service_time)
+        return _pack([self.values.value(type_name) for arg, type_name in self.methods[name][2]])
+
+    async def set_attribute(self, name, value):
+        """ Sets an attribute and notifies the subscribed clients. """
+        self._attribute_values[name] = value
+        await self._notify(CHANGED, name, value)
+
+    async def fire(self, name, *values):
+        """ Sends broadcast name to the subscribed clients. """
+        await self._notify(BROADCAST, name, list(values))
+
+    async def fire_generated(self, name):
+        """ Sends broadcast name with generated values. """
+        await self.fire(name, *[self.values.value(type_name) for arg, type_name in self.broadcasts[name][1]])
+
+    async def _notify(self, kind, name, payload):
+        for connection in list(self._subscribers.get((kind, name), ())):
+            try:
+                await connection.send([kind, None, name, payload])
+            except ConnectionError:
+                self._subscribers[(kind, name)].discard(connection)
+
+class ClientBase(_Endpoint):
+    """ Base class of the generated clients. start() must be called
+        (from the event loop) before the first call.
+
+        received:
+            The number of broadcasts and attribute notifications
+            received.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.received = 0
+        self._next_id = 0
+        self._pending = {}
+        self._handlers = {}
+        self._reader = None
+
+    def start(self):
+        if self._reader is None:
+            self._reader = asyncio.ensure_future(self._read())
+        return self
+
+    async def close(self):
+        self.connection.close()
+        if self._reader is not None:
+            await self._reader
+
+    async def _read(self):
+        try:
+            while True:
+                message = await self.connection.receive()
+                if message is None:
+                    break
+                kind, call_id, name, payload = message
+                if kind in (REPLY, ERROR):
+                    future = self._pending.pop(call_id, None)
+                    if future is None or future.done():
+                        continue
+                    if kind == REPLY:
+                        future.set_result(payload)
+                    else:
+                        future.set_exception(RemoteError(payload))
+                    continue
+                self.received += 1
+                for handler in self._handlers.get((kind, name), ()):
+                    if kind == BROADCAST:
+                        handler(*payload)
+                    else:
+                        handler(payload)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('connection closed'))
+            self._pending.clear()
+
+    async def _request(self, kind, name, payload):
+        self._next_id += 1
+        call_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = future
+        try:
+            await self.connection.send([kind, call_id, name, payload])
+        except Exception:
+            self._pending.pop(call_id, None)
+            raise
+        return await future
+
+    async def call(self, name, *args):
+        """ Calls method name. Returns None, the out value or a tuple of
+            the out values; None right away for fireAndForget methods.
+        """
+        if self.methods[name][3]:
+            await self.connection.send([CALL, None, name, list(args)])
+            return None
+        return _pack(await self._request(CALL, name, list(args)))
+
+    async def get(self, name):
+        return await self._request(GET, name, None)
+
+    async def set(self, name, value):
+        await self._request(SET, name, value)
+
+    async def subscribe(self, kind, name, handler):
+        """ Calls handler with the values of every BROADCAST name, or
+            with the new value of attribute name on every CHANGED
+            notification.
+        """
+        handlers = self._handlers.setdefault((kind, name), [])
+        if not handlers:
+            await self.connection.send([SUBSCRIBE, None, name, kind])
+        handlers.append(handler)
+
+##
+## Argument values
+##
+
+_LETTERS = string.ascii_letters + string.digits
+
+class ValueFactory(object):
+    """ Generates random values of Franca types, e.g. for the arguments
+        of calls. Types are given as in the TYPES table of a generated
+        module: a basic type name (e.g. 'UInt32'), the qualified name of
+        an entry of the table, or a description:
+
+            ('array', element type)
+            ('map', key type, value type)      a list of [key, value]
+            ('struct', ((field, type), ...))   a dict, inherited fields included
+            ('union', ((member, type), ...))   a dict with one of the members
+            ('enumeration', (value, ...))      one of the values
+
+        A typedef is the name of the type it stands for.
+
+        types:
+            The TYPES table.
+
+        seed:
+            Seed of the random generator, for reproducible runs.
+
+        array_length, string_length:
+            (minimum, maximum) lengths of arrays, maps and ByteBuffers,
+            and of Strings.
+
+        generators:
+            type name (basic or qualified) -> callable taking the
+            random.Random and returning a value, to override the
+            generated values of a type.
+
+        max_depth:
+            Nesting depth from which arrays and maps are empty, so
+            recursive types stay finite.
+
+        The generator of each type is built once and cached.
+    """
+    def __init__(self, types, seed=None, array_length=(0, 8), string_length=(0, 16),
+                 generators=None, max_depth=4):
+        self.types = types
+        self.random = random.Random(seed)
+        self.array_length = array_length
+        self.string_length = string_length
+        self.overrides = dict(generators or {})
+        self.max_depth = max_depth
+        self._generators = {}
+
+    def value(self, type_name):
+        return self.generator(type_name)()
+
+    def generator(self, type_name, depth=0):
+        """ Returns a function without arguments returning random values
+            of type_name.
+        """
+        key = (type_name, depth)
+        generator = self._generators.get(key)
+        if generator is None:
+            generator = self._generators[key] = self._build(type_name, depth)
+        return generator
+
+    def _build(self, description, depth):
+        rng = self.random
+        if depth > 2 * self.max_depth:
+            return lambda: None
+        if isinstance(description, str):
+            override = self.overrides.get(description)
+            if override is not None:
+                return lambda: override(rng)
+            if description in INTEGER_RANGES:
+                low, high = INTEGER_RANGES[description]
+                if low is None:
+                    low, high = INTEGER_RANGES['Int32']
+                return lambda: rng.randint(low, high)
+            if description == 'Boolean':
+                return lambda: rng.random() < 0.5
+            if description in ('Float', 'Double'):
+                return lambda: rng.uniform(-1e6, 1e6)
+            if description == 'String':
+                low, high = self.string_length
+                return lambda: ''.join(rng.choice(_LETTERS) for i in range(rng.randint(low, high)))
+            if description == 'ByteBuffer':
+                low, high = self.array_length if depth <= self.max_depth else (0, 0)
+                return lambda: bytes(rng.getrandbits(8) for i in range(rng.randint(low, high)))
+            if self.types.get(description) is not None:
+                return self.generator(self.types[description], depth)
+            # unknown type
+            return lambda: None
+
+        kind = description[0]
+        if kind in ('array', 'map'):
+            if depth >= self.max_depth:
+                return list
+            low, high = self.array_length
+            if kind == 'array':
+                element = self.generator(description[1], depth + 1)
+                return lambda: [element() for i in range(rng.randint(low, high))]
+            key = self.generator(description[1], depth + 1)
+            value = self.generator(description[2], depth + 1)
+            return lambda: [[key(), value()] for i in range(rng.randint(low, high))]
+        if kind == 'struct':
+            fields = [(name, self.generator(type_name, depth + 1)) for name, type_name in description[1]]
+            return lambda: dict((name, generator()) for name, generator in fields)
+        if kind == 'union':
+            members = [(name, self.generator(type_name, depth + 1)) for name, type_name in description[1]]
+            if not members:
+                return lambda: None
+            def union():
+                name, generator = rng.choice(members)
+                return {name: generator()}
+            return union
+        if kind == 'enumeration':
+            values = list(description[1]) or [0]
+            return lambda: rng.choice(values)
+        return lambda: None
+
+##
+## Load driver
+##
+
+def percentile(values, p):
+    """ Returns the p-th percentile (nearest rank) of a sorted list. """
+    if not values:
+        return None
+    rank = int(math.ceil(p / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+class LoadReport(object):
+    """ Result of LoadDriver.run().
+
+        latencies:
+            operation -> list of latencies of the successful calls, in
+            seconds. Operations are method names, 'get NAME' and
+            'set NAME' for attributes.
+
+        errors:
+            operation -> number of failed calls.
+
+        elapsed:
+            Duration of the run, in seconds.
+
+        received:
+            The number of broadcasts and attribute notifications the
+            client received during the run.
+    """
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    def __init__(self, interface):
+        self.interface = interface
+        self.latencies = OrderedDict()
+        self.errors = OrderedDict()
+        self.elapsed = 0.0
+        self.received = 0
+
+    def calls(self):
+        return sum(len(latencies) for latencies in self.latencies.values()) + sum(self.errors.values())
+
+    def throughput(self):
+        return self.calls() / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self, operation=None):
+        """ Returns {'calls', 'mean', 'max', 'p50', ...} of one operation,
+            or of all of them, latencies in milliseconds.
+        """
+        if operation is None:
+            latencies = sorted(itertools.chain(*self.latencies.values()))
+        else:
+            latencies = sorted(self.latencies.get(operation, ()))
+        result = OrderedDict([('calls', len(latencies))])
+        if latencies:
+            result['mean'] = sum(latencies) / len(latencies) * 1000.0
+            for p in self.PERCENTILES:
+                result['p%g' % p] = percentile(latencies, p) * 1000.0
+            result['max'] = latencies[-1] * 1000.0
+        return result
+
+    def to_dict(self):
+        return OrderedDict([
+            ('interface', self.interface),
+            ('calls', self.calls()),
+            ('errors', sum(self.errors.values())),
+            ('elapsed', self.elapsed),
+            ('throughput', self.throughput()),
+            ('received', self.received),
+            ('latency_ms', self.summary()),
+            ('operations', OrderedDict((operation, dict(self.summary(operation), errors=self.errors.get(operation, 0)))
+                                       for operation in self.latencies)),
+        ])
+
+    def __str__(self):
+        def latencies(summary):
+            if summary['calls'] == 0:
+                return 'no replies'
+            return '  '.join('%s %.3f' % (key, value) for key, value in summary.items() if key != 'calls')
+        lines = ['%s: %d calls in %.2f s, %.1f calls/s, %d errors, %d notifications received' % (
+                     self.interface, self.calls(), self.elapsed, self.throughput(),
+                     sum(self.errors.values()), self.received),
+                 'latency ms: %s' % latencies(self.summary())]
+        for operation in self.latencies:
+            summary = self.summary(operation)
+            lines.append('  %-24s %7d calls %5d errors  %s' % (
+                operation, summary['calls'], self.errors.get(operation, 0), latencies(summary)))
+        return '\n'.join(lines)
+
+def default_operations(client):
+    """ All methods and attribute reads of a client's interface. """
+    return ([(CALL, name) for name in sorted(client.methods)] +
+            [(GET, name) for name in sorted(client.attributes)])
+
+class LoadDriver(object):
+    """ Calls the methods and attributes of a client.
+
+        values:
+            The ValueFactory for the arguments.
+
+        operations:
+            List of (CALL, method name), (GET, attribute name) or
+            (SET, attribute name) tuples, used round robin. By default
+            all methods and attribute reads.
+
+        rate:
+            Calls per second. The calls are scheduled at fixed intervals
+            and their latency is measured from the scheduled time, so
+            calls delayed because all workers were busy count as slow
+            (open loop). If None, every worker calls as fast as it can
+            (closed loop).
+
+        concurrency:
+            The number of calls in flight at most.
+
+        duration, calls:
+            The run ends after duration seconds or the given number of
+            calls, whatever comes first. At least one must be given.
+    """
+    def __init__(self, client, values, operations=None, rate=None, concurrency=1, duration=None, calls=None):
+        if duration is None and calls is None:
+            raise ValueError('a duration or a number of calls is required')
+        self.client = client
+        self.values = values
+        self.operations = list(operations or default_operations(client))
+        if not self.operations:
+            raise ValueError('interface %s has no methods or attributes' % client.interface)
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.calls = calls
+
+    def _prepare(self, operation):
+        """ Returns a coroutine function doing one call of operation,
+            with generated arguments.
+        """
+        kind, name = operation
+        client = self.client
+        if kind == CALL:
+            args = [self.values.value(type_name) for arg, type_name in client.methods[name][1]]
+            return lambda: client.call(name, *args)
+        if kind == SET:
+            value = self.values.value(client.attributes[name][1])
+            return lambda: client.set(name, value)
+        return lambda: client.get(name)
+
+    async def run(self):
+        """ Returns the LoadReport of the run. """
+        report = LoadReport(self.client.interface)
+        labels = [name if kind == CALL else '%s %s' % (kind, name) for kind, name in self.operations]
+        for label in labels:
+            report.latencies.setdefault(label, [])
+        received = self.client.received
+        clock = time.perf_counter
+        counter = itertools.count()
+        start = clock()
+        deadline = start + self.duration if self.duration is not None else None
+
+        async def worker():
+            while True:
+                index = next(counter)
+                if self.calls is not None and index >= self.calls:
+                    return
+                operation = index % len(self.operations)
+                call = self._prepare(self.operations[operation])
+                if self.rate:
+                    scheduled = start + index / float(self.rate)
+                    if deadline is not None and scheduled >= deadline:
+                        return
+                    delay = scheduled - clock()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    scheduled = clock()
+                    if deadline is not None and scheduled >= deadline:
+                        return
+                try:
+                    await call()
+                except Exception:
+                    label = labels[operation]
+                    report.errors[label] = report.errors.get(label, 0) + 1
+                else:
+                    report.latencies[labels[operation]].append(clock() - scheduled)
+
+        await asyncio.gather(*[worker() for i in range(self.concurrency)])
+        report.elapsed = clock() - start
+        report.received = self.client.received - received
+        return report
+
+##
+## Code generation
+##
+
+class TypeDescriber(object):
+    """ Builds the descriptions of the types used by an interface (the
+        TYPES table of a generated module, see ValueFactory). Names are
+        resolved with a NameResolver, inherited fields are flattened
+        with a TypeHierarchy and enumerator values computed with a
+        ConstantEvaluator.
+    """
+    def __init__(self, model_set):
+        self.resolver = NameResolver(model_set, TYPE_KINDS)
+        self.hierarchy = TypeHierarchy(model_set)
+        self.constants = ConstantEvaluator(model_set)
+        self.types = OrderedDict()
+
+    def describe(self, typename, declaration):
+        """ Returns the description of the Typename node typename used by
+            declaration, and adds the types it refers to to types.
+        """
+        if isinstance(typename.typename, franca_ast.ArrayTypeDeclaration):
+            # implicit array, e.g. UInt8[]
+            return ('array', self.describe(typename.typename.type, declaration))
+        name = typename.typename
+        if name in BASIC_TYPES:
+            return name
+        target = self.resolver.resolve(declaration, name)
+        if target is None:
+            return name
+        self._add(target)
+        return target.qualified_name
+
+    def _add(self, declaration):
+        key = declaration.qualified_name
+        if key in self.types:
+            return
+        # reserve the entry first, types may refer to themselves
+        self.types[key] = None
+        node = declaration.node
+        kind = declaration.kind
+        if kind in ('struct', 'union'):
+            try:
+                fields = self.hierarchy.layout(declaration).members
+            except InheritanceError:
+                fields = declaration.members()
+            description = (kind, tuple((field.name, self.describe(field.node.typename, field))
+                                       for field in fields))
+        elif kind == 'enumeration':
+            description = ('enumeration', tuple(self.constants.enumeration(declaration).values))
+        elif kind == 'map':
+            description = ('map', self.describe(node.key_type, declaration),
+                           self.describe(node.value_type, declaration))
+        elif kind == 'typedef':
+            description = self.describe(node.existing_type, declaration)
+        else:
+            description = ('array', self.describe(node.type, declaration))
+        self.types[key] = description
+
+def module_name(root):
+    """ Returns the name of the module generated for an interface. """
+    return _identifier(root.qualified_name.replace('.', '_')) + '_loadgen'
+
+def _identifier(name):
+    return re.sub(r'[^0-9a-zA-Z_]', '_', name)
+
+def _python_name(name, taken):
+    """ Returns a Python identifier for a Franca name that is not a
+        keyword and not in taken, and adds it to taken.
+    """
+    result = _identifier(name)
+    while keyword.iskeyword(result) or result in taken:
+        result += '_'
+    taken.add(result)
+    return result
+
+# Names the generated members must not hide.
+_RESERVED = frozenset(name for name in dir(ServerBase) + dir(ClientBase) + ['handler', 'value'])
+
+def interface_members(root, hierarchy):
+    """ Returns the {kind: [Declaration]} of the methods, broadcasts and
+        attributes of an interface, the inherited ones included.
+    """
+    try:
+        layout = hierarchy.layout(root)
+        return dict((kind, list(layout.table(kind).members)) for kind in DISPATCH_KINDS)
+    except InheritanceError:
+        members = root.members()
+        return dict((kind, [member for member in members if member.kind == kind]) for kind in DISPATCH_KINDS)
+
+def _arguments(describer, declaration, arguments):
+    taken = set(['self'])
+    return [(argument.name.id, describer.describe(argument.type, declaration), _python_name(argument.name.id, taken))
+            for argument in arguments]
+
+def generate_module(root, model_set):
+    """ Returns the source of the load generation module of an interface
+        Declaration: its TYPES, METHODS, BROADCASTS and ATTRIBUTES
+        tables and the Server and Client classes.
+    """
+    describer = TypeDescriber(model_set)
+    members = interface_members(root, describer.hierarchy)
+    taken = set(_RESERVED)
+
+    methods = []
+    for method in members['method']:
+        in_args, out_args = method_arguments(method.node)
+        methods.append((method.name, _python_name(method.name, taken),
+                        _arguments(describer, method, in_args), _arguments(describer, method, out_args),
+                        method.node.is_fire_and_forget))
+    broadcasts = []
+    for broadcast in members['broadcast']:
+        in_args, out_args = method_arguments(broadcast.node)
+        broadcasts.append((broadcast.name, _python_name('fire_' + broadcast.name, taken),
+                           _python_name('on_' + broadcast.name, taken),
+                           _arguments(describer, broadcast, out_args)))
+    attributes = []
+    for attribute in members['attribute']:
+        attributes.append((attribute.name, describer.describe(attribute.node.typename, attribute),
+                           _python_name('get_' + attribute.name, taken),
+                           _python_name('set_' + attribute.name, taken),
+                           _python_name('on_%s_changed' % attribute.name, taken)))
+
+    def specs(arguments):
+        return tuple((name, type_name) for name, type_name, python_name in arguments)
+
+    out = []
+    write = out.append
+    write('#' + '-' * 78)
+    write('# %s.py' % module_name(root))
+    write('#')
+    write('# Load generation client and server of interface %s, generated by' % root.qualified_name)
+    write('# franca_parser.franca_loadgen from %s. Do not edit.' % os.path.basename(root.document.filename))
+    write('#' + '-' * 78)
+    write('from franca_parser.franca_loadgen import BROADCAST, CHANGED, ClientBase, ServerBase')
+    write('')
+    write('INTERFACE = %r' % root.qualified_name)
+    write('VERSION = %r' % (version_of(root.node),))
+    write('')
+    write('TYPES = {')
+    for name, description in describer.types.items():
+        write('    %r: %r,' % (name, description))
+    write('}')
+    write('')
+    write('METHODS = {')
+    for name, python_name, in_args, out_args, fire_and_forget in methods:
+        write('    %r: (%r, %r, %r, %r),' % (name, python_name, specs(in_args), specs(out_args), fire_and_forget))
+    write('}')
+    write('')
+    write('BROADCASTS = {')
+    for name, fire_name, on_name, out_args in broadcasts:
+        write('    %r: (%r, %r),' % (name, fire_name, specs(out_args)))
+    write('}')
+    write('')
+    write('ATTRIBUTES = {')
+    for name, type_name, get_name, set_name, on_name in attributes:
+        write('    %r: (%r, %r),' % (name, get_name, type_name))
+    write('}')
+    write('')
+
+    class_name = _identifier(root.name)
+    for role, base in (('Server', 'ServerBase'), ('Client', 'ClientBase')):
+        write('class %s%s(%s):' % (class_name, role, base))
+        write('    interface = INTERFACE')
+        write('    version = VERSION')
+        write('    types = TYPES')
+        write('    methods = METHODS')
+        write('    broadcasts = BROADCASTS')
+        write('    attributes = ATTRIBUTES')
+        for name, python_name, in_args, out_args, fire_and_forget in methods:
+            parameters = ''.join(', ' + arg[2] for arg in in_args)
+            write('')
+            write('    async def %s(self%s):' % (python_name, parameters))
+            if role == 'Server':
+                write('        return await self.default_reply(%r)' % name)
+            else:
+                write('        return await self.call(%r%s)' % (name, parameters))
+        for name, fire_name, on_name, out_args in broadcasts:
+            write('')
+            if role == 'Server':
+                parameters = ''.join(', ' + arg[2] for arg in out_args)
+                write('    async def %s(self%s):' % (fire_name, parameters))
+                write('        await self.fire(%r%s)' % (name, parameters))
+            else:
+                write('    async def %s(self, handler):' % on_name)
+                write('        await self.subscribe(BROADCAST, %r, handler)' % name)
+        if role == 'Client':
+            for name, type_name, get_name, set_name, on_name in attributes:
+                write('')
+                write('    async def %s(self):' % get_name)
+                write('        return await self.get(%r)' % name)
+                write('')
+                write('    async def %s(self, value):' % set_name)
+                write('        await self.set(%r, value)' % name)
+                write('')
+                write('    async def %s(self, handler):' % on_name)
+                write('        await self.subscribe(CHANGED, %r, handler)' % name)
+        write('')
+    write('Server = %sServer' % class_name)
+    write('Client = %sClient' % class_name)
+    return '\n'.join(out) + '\n'
+
+def load_module(source, name):
+    """ Returns the module of a generated source, without writing it. """
+    module = types.ModuleType(name)
+    exec(compile(source, name + '.py', 'exec'), module.__dict__)
+    return module
+
+class LoadGenGenerator(Generator):
+    """ Writes the load generation module of every interface into
+        output_dir, e.g. for the watch mode.
+    """
+    name = 'loadgen'
+    root_kinds = ('interface',)
+
+    def __init__(self, output_dir='loadgen'):
+        self.output_dir = output_dir
+
+    def outputs(self, root):
+        return [os.path.join(self.output_dir, module_name(root) + '.py')]
+
+    def generate(self, root, model_set):
+        self.write(self.outputs(root)[0], generate_module(root, model_set))
+
+##
+## Command line
+##
+
+def find_interface(model_set, name):
+    """ Returns the interface Declaration with the (qualified or
+        unqualified) name, or None.
+    """
+    for declaration in model_set.declarations():
+        if declaration.kind == 'interface' and name in (declaration.name, declaration.qualified_name):
+            return declaration
+    return None
+
+def _load_interface(args):
+    model_set = ModelSet.load(args.paths)
+    for filename, msg, line, column in model_set.errors:
+        print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+    root = find_interface(model_set, args.interface)
+    if root is None:
+        raise SystemExit('interface %s not found' % args.interface)
+    return load_module(generate_module(root, model_set), module_name(root))
+
+def _value_factory(args, types, seed):
+    generators = {}
+    for spec in args.generator:
+        type_name, _, function = spec.partition('=')
+        module_name, _, attribute = function.partition(':')
+        if not attribute:
+            raise SystemExit("generators must be given as TYPE=MODULE:NAME, got %r" % spec)
+        generators[type_name] = getattr(importlib.import_module(module_name), attribute)
+    return ValueFactory(types, seed, (0, args.array_length), (0, args.string_length), generators)
+
+def _operations(args, module):
+    if not args.member:
+        return None
+    operations = []
+    for member in args.member:
+        kind, _, name = member.rpartition(':')
+        kind = kind or (CALL if name in module.METHODS else GET)
+        if kind not in (CALL, GET, SET) or name not in (module.METHODS if kind == CALL else module.ATTRIBUTES):
+            raise SystemExit('unknown member %s' % member)
+        operations.append((kind, name))
+    return operations
+
+async def _broadcast(server, rate):
+    names = sorted(server.broadcasts)
+    if not names or not rate:
+        return
+    for name in itertools.cycle(names):
+        await asyncio.sleep(1.0 / rate)
+        await server.fire_generated(name)
+
+async def _start_server(args, module):
+    server = module.Server(_value_factory(args, module.TYPES, None if args.seed is None else args.seed + 1),
+                           args.service_time / 1000.0)
+    broadcaster = asyncio.ensure_future(_broadcast(server, args.broadcast_rate))
+    return server, broadcaster
+
+async def _run(args, module):
+    broadcaster = unix_server = socket_path = client = None
+    try:
+        if args.connect:
+            connection = await connect_unix(args.connect)
+        else:
+            server, broadcaster = await _start_server(args, module)
+            if args.transport == 'unix':
+                socket_path = args.socket or os.path.join(tempfile.mkdtemp(), 'loadgen.sock')
+                unix_server = await serve_unix(server, socket_path)
+                connection = await connect_unix(socket_path)
+            else:
+                connection = await connect_local(server, marshal=not args.no_marshal)
+        client = module.Client(connection).start()
+        for name in sorted(module.BROADCASTS):
+            await client.subscribe(BROADCAST, name, lambda *values: None)
+        driver = LoadDriver(client, _value_factory(args, module.TYPES, args.seed), _operations(args, module),
+                            args.rate, args.concurrency, args.duration, args.calls)
+        return await driver.run()
+    finally:
+        if broadcaster is not None:
+            broadcaster.cancel()
+        if client is not None:
+            await client.close()
+        if unix_server is not None:
+            unix_server.close()
+            await unix_server.wait_closed()
+            if not args.socket:
+                os.remove(socket_path)
+                os.rmdir(os.path.dirname(socket_path))
+
+async def _serve(args, module):
+    server, broadcaster = await _start_server(args, module)
+    unix_server = await serve_unix(server, args.socket)
+    print('serving %s on %s' % (module.INTERFACE, args.socket), file=sys.stderr)
+    async with unix_server:
+        await unix_server.serve_forever()
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Generate asyncio clients and servers for Franca interfaces and drive them with load.')
+    commands = argparser.add_subparsers(dest='command')
+
+    generate = commands.add_parser('generate', help='write the load generation modules of interfaces')
+    generate.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+    generate.add_argument('-o', '--output', default='loadgen', help='output directory')
+    generate.add_argument('--interface', action='append',
+                          help='(qualified) interface name, may be given more than once; all by default')
+
+    def add_server_options(parser):
+        parser.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+        parser.add_argument('--interface', required=True, help='(qualified) interface name')
+        parser.add_argument('--service-time', type=float, default=0.0, metavar='MS',
+                            help='time the server takes per call, in milliseconds')
+        parser.add_argument('--broadcast-rate', type=float, default=0.0, metavar='N',
+                            help='broadcasts the server sends per second')
+        parser.add_argument('--seed', type=int, default=None, help='seed of the value generators')
+        parser.add_argument('--array-length', type=int, default=8, metavar='N',
+                            help='maximum length of generated arrays, maps and ByteBuffers')
+        parser.add_argument('--string-length', type=int, default=16, metavar='N',
+                            help='maximum length of generated strings')
+        parser.add_argument('--generator', action='append', default=[], metavar='TYPE=MODULE:NAME',
+                            help='function called with a random.Random to generate the values of TYPE')
+
+    run = commands.add_parser('run', help='drive an interface with load and report throughput and latency')
+    add_server_options(run)
+    run.add_argument('--transport', choices=('inproc', 'unix'), default='inproc')
+    run.add_argument('--no-marshal', action='store_true',
+                     help='pass messages in-process without encoding them')
+    run.add_argument('--socket', help='Unix socket path of the unix transport')
+    run.add_argument('--connect', metavar='SOCKET', help='drive a server started with "serve" instead')
+    run.add_argument('--rate', type=float, default=None, help='calls per second; as fast as possible by default')
+    run.add_argument('--concurrency', type=int, default=1, help='calls in flight at most')
+    run.add_argument('--duration', type=float, default=None, help='seconds to run')
+    run.add_argument('--calls', type=int, default=None, help='number of calls to make')
+    run.add_argument('--member', action='append', metavar='[call|get|set:]NAME',
+                     help='method or attribute to call, may be given more than once; all by default')
+    run.add_argument('--format', choices=('text', 'json'), default='text')
+
+    serve = commands.add_parser('serve', help='serve an interface on a Unix socket')
+    add_server_options(serve)
+    serve.add_argument('--socket', required=True, help='Unix socket path')
+
+    args = argparser.parse_args(argv)
+    if args.command is None:
+        argparser.error('a command is required')
+
+    if args.command == 'generate':
+        model_set = ModelSet.load(args.paths)
+        for filename, msg, line, column in model_set.errors:
+            print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+        generator = LoadGenGenerator(args.output)
+        for declaration in model_set.declarations():
+            if declaration.kind != 'interface':
+                continue
+            if args.interface and not set(args.interface) & set((declaration.name, declaration.qualified_name)):
+                continue
+            generator.generate(declaration, model_set)
+            print(generator.outputs(declaration)[0])
+        return 0
+
+    module = _load_interface(args)
+    if args.command == 'serve':
+        try:
+            asyncio.run(_serve(args, module))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.duration is None and args.calls is None:
+        args.duration = 10.0
+    try:
+        report = asyncio.run(_run(args, module))
+    except ValueError as e:
+        # e.g. an interface without methods and attributes to call
+        argparser.error(str(e))
+    if args.format == 'json':
+        json.dump(report.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        print(report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
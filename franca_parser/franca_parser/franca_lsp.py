@@ -0,0 +1,661 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_lsp.py
+#
+# FrancaLanguageServer class: Language Server Protocol (LSP) server for
+#                             Franca IDL (*.fidl), speaking JSON-RPC over
+#                             stdin/stdout.
+#
+# All requests (completion, hover, go-to-definition) are answered from an
+# in-memory index of the workspace. Documents are reparsed in a worker
+# thread, debounced while the user is typing, and the index of a document is
+# only swapped in once its reparse succeeded. A closed document goes back to
+# the contents of its file, unsaved changes are dropped from the index.
+#
+# The documents of the workspace that are not open in the editor are only
+# skimmed (see franca_lazy): the index gets their interfaces, type
+# collections and members right away, and the declarations inside a member
+# (fields, enumerators, arguments) when they are first asked for.
+#
+# Run with 'python -m franca_parser.franca_lsp'. Requires Python 3.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+from urllib.request import pathname2url
+
+from . import franca_ast
+from .franca_cache import ParseCache
+from .franca_lazy import skim
+from .franca_lexer import FrancaLexer
+from .franca_model import BASIC_TYPES, DECLARATIONS, TYPE_KINDS, declaration_name
+from .franca_parser import FrancaParser, gil_enabled
+
+log = logging.getLogger('franca_lsp')
+
+KEYWORDS = tuple(sorted(keyword for keyword in FrancaLexer.keyword_map
+                        if keyword not in BASIC_TYPES))
+
+# LSP CompletionItemKind / SymbolKind values
+_COMPLETION_KINDS = {
+    'interface': 8, 'typeCollection': 9, 'struct': 22, 'union': 22,
+    'enumeration': 13, 'enumerator': 20, 'map': 7, 'typedef': 25,
+    'array': 7, 'method': 2, 'broadcast': 23, 'attribute': 10,
+    'field': 5, 'argument': 6, 'constant': 21, 'keyword': 14, 'basic': 25,
+}
+
+_word_re = re.compile(r'[a-zA-Z_$][0-9a-zA-Z_$]*(\.[a-zA-Z_$][0-9a-zA-Z_$]*)*')
+
+def uri_to_path(uri):
+    return unquote(urlparse(uri).path)
+
+def path_to_uri(path):
+    return 'file://' + pathname2url(os.path.abspath(path))
+
+class Symbol(object):
+    """ A declaration found in a Franca document.
+
+        line and column are 0-based, as used by LSP.
+
+        lazy:
+            The LazyMember of a skimmed document whose inner declarations
+            are not indexed yet, or None.
+    """
+    __slots__ = ('name', 'kind', 'uri', 'line', 'column', 'comment', 'container', 'lazy')
+
+    def __init__(self, name, kind, uri, line, column, comment, container, lazy=None):
+        self.name = name
+        self.kind = kind
+        self.uri = uri
+        self.line = line
+        self.column = column
+        self.comment = comment
+        self.container = container
+        self.lazy = lazy
+
+    def location(self):
+        start = {'line': self.line, 'character': self.column}
+        end = {'line': self.line, 'character': self.column + len(self.name)}
+        return {'uri': self.uri, 'range': {'start': start, 'end': end}}
+
+class SymbolCollector(franca_ast.NodeVisitor):
+    """ Collects all declarations of a FrancaDocument into a list of
+        Symbols. The container of a symbol is the name of the enclosing
+        declaration (interface, struct, enumeration, ...).
+
+        container:
+            Name of the declaration enclosing the visited nodes, when
+            visiting a part of a document.
+    """
+    def __init__(self, uri, container=None):
+        self.uri = uri
+        self.symbols = []
+        self._containers = [container] if container is not None else []
+
+    def generic_visit(self, node):
+        name = declaration_name(node)
+        if name is None:
+            # Not a declaration, or an implicit (anonymous) array type
+            return franca_ast.NodeVisitor.generic_visit(self, node)
+
+        coord = name.coord
+        kind = DECLARATIONS[node.__class__.__name__][1]
+        container = self._containers[-1] if self._containers else None
+        self.symbols.append(Symbol(name.id, kind, self.uri,
+                                   coord.line - 1, coord.column - 1,
+                                   getattr(node, 'comment', None), container))
+        self._containers.append(name.id)
+        franca_ast.NodeVisitor.generic_visit(self, node)
+        self._containers.pop()
+
+def skimmed_symbols(uri, document):
+    """ Returns the Symbols of the interfaces, type collections and
+        their members of a LazyDocument.
+    """
+    symbols = []
+    for root in document.roots:
+        if root.name is None:
+            continue
+        symbols.append(Symbol(root.name, root.kind, uri, root.line - 1, root.column - 1,
+                              root.comment, None))
+        for member in root.members:
+            if member.name is not None:
+                symbols.append(Symbol(member.name, member.kind, uri, member.line - 1,
+                                      member.column - 1, member.comment, root.name, member))
+    return symbols
+
+class FrancaDocumentState(object):
+    """ A document known to the workspace: its current text and the
+        symbols of the last successful parse.
+    """
+    def __init__(self, uri, text, version=None, is_open=False):
+        self.uri = uri
+        self.path = uri_to_path(uri)
+        self.text = text
+        self.version = version
+        self.is_open = is_open
+        self.ast = None
+        self.symbols = []
+        self.reparse_task = None
+        self._lines = None
+
+    def set_text(self, text, version):
+        self.text = text
+        self.version = version
+        self._lines = None
+
+    def line(self, line):
+        if self._lines is None:
+            self._lines = self.text.split('\n')
+        if 0 <= line < len(self._lines):
+            return self._lines[line]
+        return ''
+
+class FrancaWorkspace(object):
+    """ In-memory index of all Franca documents of a workspace.
+
+        The index maps declared names to their Symbols and container
+        names to their members. It is updated per document, so the
+        cost of an update is proportional to the size of the changed
+        document, not the workspace. The same holds for the completion
+        items of the declared types.
+    """
+    def __init__(self):
+        self.documents = {}
+        self.definitions = {}
+        self.members = {}
+        # type name -> completion item, of the first declaration of the name
+        self._type_items = {}
+        self._type_completions = None
+
+    def get(self, uri):
+        return self.documents.get(uri)
+
+    def add(self, uri, text, version=None, is_open=False):
+        document = FrancaDocumentState(uri, text, version, is_open)
+        self.documents[uri] = document
+        return document
+
+    def update(self, document, ast, symbols):
+        """ Replace the index entries of a document with new symbols.
+        """
+        self._unindex(document)
+        document.ast = ast
+        document.symbols = []
+        self._index(document, symbols)
+
+    def _index(self, document, symbols):
+        document.symbols.extend(symbols)
+        for symbol in symbols:
+            self.definitions.setdefault(symbol.name, []).append(symbol)
+            if symbol.container is not None:
+                self.members.setdefault(symbol.container, []).append(symbol)
+        self._update_type_items(symbols)
+
+    def expand(self, name):
+        """ Index the declarations inside the skimmed members called
+            name, e.g. the enumerators of an enumeration, parsing the
+            members on first use.
+        """
+        for symbol in list(self.definitions.get(name, ())):
+            member, symbol.lazy = symbol.lazy, None
+            document = self.documents.get(symbol.uri)
+            if member is None or document is None or member.node is None:
+                continue
+            collector = SymbolCollector(symbol.uri, symbol.name)
+            for child_name, child in member.node.children():
+                collector.visit(child)
+            self._index(document, collector.symbols)
+
+    def remove(self, uri):
+        document = self.documents.pop(uri, None)
+        if document is not None:
+            self._unindex(document)
+
+    def _unindex(self, document):
+        for symbol in document.symbols:
+            for table, key in ((self.definitions, symbol.name), (self.members, symbol.container)):
+                entries = table.get(key)
+                if entries is None:
+                    continue
+                entries[:] = [entry for entry in entries if entry.uri != document.uri]
+                if not entries:
+                    del table[key]
+        self._update_type_items(document.symbols)
+
+    def _update_type_items(self, symbols):
+        # Recompute the completion items of the names of symbols only
+        for name in set(symbol.name for symbol in symbols):
+            definitions = self.definitions.get(name)
+            symbol = definitions[0] if definitions else None
+            if symbol is not None and (symbol.kind in TYPE_KINDS or symbol.kind in ('interface', 'typeCollection')):
+                self._type_items[name] = _completion_item(symbol)
+            else:
+                self._type_items.pop(name, None)
+        self._type_completions = None
+
+    def lookup(self, name, uri=None):
+        """ Find the declarations of a name. Qualified names
+            (Container.Name) are matched against the container as
+            well. Declarations from document uri are returned first.
+        """
+        container = None
+        if '.' in name:
+            container, name = name.rsplit('.', 1)
+            container = container.rsplit('.', 1)[-1]
+            self.expand(container)
+        symbols = self.definitions.get(name, [])
+        if container is not None:
+            qualified = [symbol for symbol in symbols if symbol.container == container]
+            symbols = qualified or symbols
+        return sorted(symbols, key=lambda symbol: symbol.uri != uri)
+
+    def type_completions(self):
+        """ Completion items for all keywords, basic types and declared
+            types. Cached until the index changes.
+        """
+        if self._type_completions is None:
+            self._type_completions = _KEYWORD_ITEMS + list(self._type_items.values())
+        return self._type_completions
+
+    def member_completions(self, container):
+        self.expand(container)
+        return [_completion_item(symbol) for symbol in self.members.get(container, [])]
+
+_KEYWORD_ITEMS = ([{'label': keyword, 'kind': _COMPLETION_KINDS['keyword']} for keyword in KEYWORDS] +
+                  [{'label': basic, 'kind': _COMPLETION_KINDS['basic']} for basic in BASIC_TYPES])
+
+def _completion_item(symbol):
+    item = {'label': symbol.name, 'kind': _COMPLETION_KINDS[symbol.kind], 'detail': symbol.kind}
+    if symbol.comment is not None:
+        item['documentation'] = symbol.comment.tag('description', symbol.comment.text)
+    return item
+
+def _hover_markdown(symbol):
+    lines = ['**%s** `%s`' % (symbol.kind, symbol.name)]
+    if symbol.container is not None:
+        lines[0] += ' in `%s`' % symbol.container
+    comment = symbol.comment
+    if comment is not None:
+        tags = comment.tags
+        lines.append('')
+        if not tags:
+            lines.append(comment.text)
+        if 'description' in tags:
+            lines.append(tags['description'])
+        for tag in sorted(tags):
+            if tag != 'description':
+                lines.append('')
+                lines.append('*@%s* %s' % (tag, tags[tag]))
+    return '\n'.join(lines)
+
+def word_at(line, character):
+    """ Returns the (possibly qualified) identifier in line that touches
+        the given character offset, or None.
+    """
+    for match in _word_re.finditer(line):
+        if match.start() <= character <= match.end():
+            return match.group()
+    return None
+
+class FrancaLanguageServer(object):
+    """ The language server. Reads LSP messages from reader and writes
+        responses and notifications to writer (a binary file object).
+
+        debounce:
+            Seconds to wait after the last change of a document before
+            it is reparsed.
+
+        full_scan:
+            If True, the documents of the workspace that are not open are
+            fully parsed instead of skimmed, which is slower but reports
+            their syntax errors.
+    """
+    def __init__(self, reader, writer, debounce=0.25, full_scan=False):
+        self.reader = reader
+        self.writer = writer
+        self.debounce = debounce
+        self.full_scan = full_scan
+        self.workspace = FrancaWorkspace()
+        self.root_path = None
+        self.shutdown_requested = False
+        self.running = True
+        # The parser is reentrant and outdated reparse results are dropped
+        # (see _reparse), so free-threaded builds can reparse in parallel.
+        # With the GIL, more workers would only compete for it.
+        workers = 1 if gil_enabled() else (os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._parser = FrancaParser()
+        # Reopened files, saves and undos bring back contents parsed before
+        self._cache = ParseCache(max_bytes=64 * 1024 * 1024, parser=self._parser)
+        self._handlers = {
+            'initialize': self.on_initialize,
+            'initialized': self.on_initialized,
+            'shutdown': self.on_shutdown,
+            'exit': self.on_exit,
+            'textDocument/didOpen': self.on_did_open,
+            'textDocument/didChange': self.on_did_change,
+            'textDocument/didClose': self.on_did_close,
+            'textDocument/didSave': self.on_did_save,
+            'textDocument/completion': self.on_completion,
+            'textDocument/hover': self.on_hover,
+            'textDocument/definition': self.on_definition,
+        }
+
+    ##
+    ## JSON-RPC transport
+    ##
+    async def serve(self):
+        while self.running:
+            message = await self._read_message()
+            if message is None:
+                break
+            self._dispatch(message)
+        self._executor.shutdown(wait=False)
+
+    async def _read_message(self):
+        length = None
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                if length is None:
+                    continue
+                break
+            name, _, value = line.decode('ascii').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        body = await self.reader.readexactly(length)
+        return json.loads(body.decode('utf-8'))
+
+    def _send(self, message):
+        body = json.dumps(message).encode('utf-8')
+        self.writer.write(b'Content-Length: ' + str(len(body)).encode('ascii') + b'\r\n\r\n' + body)
+        self.writer.flush()
+
+    def notify(self, method, params):
+        self._send({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def _dispatch(self, message):
+        method = message.get('method')
+        handler = self._handlers.get(method)
+        is_request = 'id' in message
+        start = time.time()
+        if handler is None:
+            if is_request:
+                self._send({'jsonrpc': '2.0', 'id': message['id'],
+                            'error': {'code': -32601, 'message': 'Method not found: %s' % method}})
+            return
+        try:
+            result = handler(message.get('params') or {})
+        except Exception as e:
+            log.exception('Error handling %s', method)
+            if is_request:
+                self._send({'jsonrpc': '2.0', 'id': message['id'],
+                            'error': {'code': -32603, 'message': str(e)}})
+            return
+        if is_request:
+            self._send({'jsonrpc': '2.0', 'id': message['id'], 'result': result})
+        log.debug('%s handled in %.2f ms', method, (time.time() - start) * 1000.0)
+
+    ##
+    ## Parsing, runs in the worker thread
+    ##
+    def _parse(self, uri, text):
+        errors = []
+        ast = self._cache.parse(text, uri_to_path(uri),
+                                lambda msg, line, column: errors.append((msg, line, column)))
+        symbols = None
+        if ast is not None:
+            collector = SymbolCollector(uri)
+            collector.visit(ast)
+            symbols = collector.symbols
+        return ast, symbols, errors
+
+    def _read_and_parse(self, path):
+        with open(path) as f:
+            text = f.read()
+        return (text,) + self._parse(path_to_uri(path), text)
+
+    def _read_and_skim(self, path):
+        with open(path) as f:
+            text = f.read()
+        uri = path_to_uri(path)
+        return text, None, skimmed_symbols(uri, skim(text, path, self._parser)), []
+
+    ##
+    ## Reparsing, runs on the event loop
+    ##
+    def schedule_reparse(self, document, delay):
+        if document.reparse_task is not None:
+            document.reparse_task.cancel()
+        document.reparse_task = asyncio.ensure_future(self._reparse(document, document.version, delay))
+
+    async def _reparse(self, document, version, delay):
+        if delay:
+            await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        text = document.text
+        ast, symbols, errors = await loop.run_in_executor(self._executor, self._parse, document.uri, text)
+        if document.version != version or self.workspace.get(document.uri) is not document:
+            return # outdated, a newer reparse is on its way
+        if symbols is not None:
+            # On syntax errors the symbols of the last good parse are kept.
+            self.workspace.update(document, ast, symbols)
+        self.publish_diagnostics(document, errors)
+
+    async def _reload(self, document):
+        """ Replace the index of a closed document with the contents of
+            its file, or drop it if the file was deleted or is outside the
+            workspace.
+        """
+        loop = asyncio.get_running_loop()
+        scan = self._read_and_parse if self.full_scan else self._read_and_skim
+        result = None
+        if self._in_workspace(document.path):
+            try:
+                result = await loop.run_in_executor(self._executor, scan, document.path)
+            except (IOError, OSError, UnicodeDecodeError) as e:
+                log.debug('Could not read %s: %s', document.path, e)
+        if document.is_open or self.workspace.get(document.uri) is not document:
+            return # reopened while we were reading it
+        if result is None:
+            self.workspace.remove(document.uri)
+            self.publish_diagnostics(document, [])
+            return
+        text, ast, symbols, errors = result
+        document.set_text(text, None)
+        if symbols is not None:
+            self.workspace.update(document, ast, symbols)
+        self.publish_diagnostics(document, errors)
+
+    def _in_workspace(self, path):
+        if not self.root_path:
+            return False
+        root = os.path.join(os.path.abspath(self.root_path), '')
+        return os.path.abspath(path).startswith(root)
+
+    async def _scan_workspace(self):
+        """ Skim (or parse, see full_scan) all .fidl files below the
+            workspace root that are not open in the editor, one at a time.
+        """
+        loop = asyncio.get_running_loop()
+        scan = self._read_and_parse if self.full_scan else self._read_and_skim
+        start = time.time()
+        count = 0
+        for dirpath, dirnames, filenames in os.walk(self.root_path):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if not filename.endswith('.fidl'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                uri = path_to_uri(path)
+                if self.workspace.get(uri) is not None:
+                    continue
+                try:
+                    text, ast, symbols, errors = await loop.run_in_executor(
+                        self._executor, scan, path)
+                except (IOError, OSError, UnicodeDecodeError) as e:
+                    log.warning('Could not read %s: %s', path, e)
+                    continue
+                if self.workspace.get(uri) is not None:
+                    continue # opened while we were parsing it
+                document = self.workspace.add(uri, text)
+                if symbols is not None:
+                    self.workspace.update(document, ast, symbols)
+                if errors:
+                    self.publish_diagnostics(document, errors)
+                count += 1
+        log.info('Indexed %d documents in %.1f s', count, time.time() - start)
+
+    def publish_diagnostics(self, document, errors):
+        diagnostics = []
+        for msg, line, column in errors:
+            if line is None:
+                # unexpected end of input
+                line = document.text.count('\n')
+                column = len(document.line(line))
+            else:
+                line, column = line - 1, column - 1
+            diagnostics.append({
+                'range': {'start': {'line': line, 'character': column},
+                          'end': {'line': line, 'character': column + 1}},
+                'severity': 1,
+                'source': 'franca',
+                'message': msg,
+            })
+        self.notify('textDocument/publishDiagnostics',
+                    {'uri': document.uri, 'diagnostics': diagnostics})
+
+    ##
+    ## Request and notification handlers
+    ##
+    def on_initialize(self, params):
+        root_uri = params.get('rootUri')
+        if root_uri:
+            self.root_path = uri_to_path(root_uri)
+        elif params.get('rootPath'):
+            self.root_path = params['rootPath']
+        return {
+            'capabilities': {
+                'textDocumentSync': {'openClose': True, 'change': 1, 'save': True},
+                'completionProvider': {'triggerCharacters': ['.']},
+                'hoverProvider': True,
+                'definitionProvider': True,
+            },
+            'serverInfo': {'name': 'franca-lsp'},
+        }
+
+    def on_initialized(self, params):
+        if self.root_path:
+            asyncio.ensure_future(self._scan_workspace())
+
+    def on_shutdown(self, params):
+        self.shutdown_requested = True
+        log.debug('parse cache: %s', self._cache.stats())
+        return None
+
+    def on_exit(self, params):
+        self.running = False
+
+    def on_did_open(self, params):
+        item = params['textDocument']
+        document = self.workspace.get(item['uri'])
+        if document is None:
+            document = self.workspace.add(item['uri'], item['text'], item.get('version'), True)
+        else:
+            document.set_text(item['text'], item.get('version'))
+            document.is_open = True
+        self.schedule_reparse(document, 0)
+
+    def on_did_change(self, params):
+        document = self.workspace.get(params['textDocument']['uri'])
+        changes = params['contentChanges']
+        if document is None or not changes:
+            return
+        # Full document sync, the last change holds the complete text
+        document.set_text(changes[-1]['text'], params['textDocument'].get('version'))
+        self.schedule_reparse(document, self.debounce)
+
+    def on_did_save(self, params):
+        document = self.workspace.get(params['textDocument']['uri'])
+        if document is not None:
+            self.schedule_reparse(document, 0)
+
+    def on_did_close(self, params):
+        document = self.workspace.get(params['textDocument']['uri'])
+        if document is not None:
+            document.is_open = False
+            if document.reparse_task is not None:
+                document.reparse_task.cancel()
+            # The unsaved changes are gone, the index has to follow the file
+            document.reparse_task = asyncio.ensure_future(self._reload(document))
+
+    def _word(self, params):
+        document = self.workspace.get(params['textDocument']['uri'])
+        if document is None:
+            return None, None
+        position = params['position']
+        return document, word_at(document.line(position['line']), position['character'])
+
+    def on_completion(self, params):
+        document = self.workspace.get(params['textDocument']['uri'])
+        if document is None:
+            return []
+        position = params['position']
+        prefix = document.line(position['line'])[:position['character']]
+        match = re.search(r'([a-zA-Z_$][0-9a-zA-Z_$]*)\.[0-9a-zA-Z_$]*$', prefix)
+        if match:
+            return {'isIncomplete': False, 'items': self.workspace.member_completions(match.group(1))}
+        return {'isIncomplete': False, 'items': self.workspace.type_completions()}
+
+    def on_hover(self, params):
+        document, word = self._word(params)
+        if not word:
+            return None
+        symbols = self.workspace.lookup(word, document.uri)
+        if not symbols:
+            return None
+        return {'contents': {'kind': 'markdown', 'value': _hover_markdown(symbols[0])}}
+
+    def on_definition(self, params):
+        document, word = self._word(params)
+        if not word:
+            return None
+        return [symbol.location() for symbol in self.workspace.lookup(word, document.uri)]
+
+async def _stdio_server(debounce, full_scan):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    server = FrancaLanguageServer(reader, sys.stdout.buffer, debounce, full_scan)
+    await server.serve()
+    return 0 if server.shutdown_requested else 1
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Franca IDL language server (stdio)')
+    argparser.add_argument('--debounce', type=float, default=0.25,
+                           help='seconds to wait after an edit before reparsing (default: 0.25)')
+    argparser.add_argument('--full-scan', action='store_true',
+                           help='parse all workspace files at startup and report their errors, '
+                                'instead of skimming the files that are not open')
+    argparser.add_argument('--log-level', default='WARNING',
+                           help='log level of the messages written to stderr (default: WARNING)')
+    args = argparser.parse_args(argv)
+    logging.basicConfig(stream=sys.stderr, level=args.log_level.upper())
+    return asyncio.run(_stdio_server(args.debounce, args.full_scan))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,705 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_model.py
+#
+# ModelSet class: A set of parsed Franca documents (a model tree), and a flat
+#                 list of the declarations found in them.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+import os
+
+from collections import OrderedDict
+
+from . import franca_ast
+from . import franca_constants
+from .franca_constants import ConstantError, convert, fold_binary, fold_unary, is_integer
+from .franca_parser import FrancaParser, ParseResult
+
+FIDL_EXTENSION = '.fidl'
+
+# Node class name -> (attribute holding the name ID, declaration kind)
+DECLARATIONS = {
+    'Interface': ('name', 'interface'),
+    'TypeCollection': ('name', 'typeCollection'),
+    'Struct': ('name', 'struct'),
+    'Union': ('name', 'union'),
+    'Enum': ('name', 'enumeration'),
+    'Enumerator': ('name', 'enumerator'),
+    'Map': ('name', 'map'),
+    'Typedef': ('new_type', 'typedef'),
+    'ArrayTypeDeclaration': ('typename', 'array'),
+    'Method': ('name', 'method'),
+    'BroadcastMethod': ('name', 'broadcast'),
+    'Attribute': ('name', 'attribute'),
+    'Variable': ('name', 'field'),
+    'MethodArgument': ('name', 'argument'),
+    'Constant': ('name', 'constant'),
+}
+
+BASIC_TYPES = ('Int64', 'Int32', 'Int16', 'Int8', 'Integer',
+               'UInt64', 'UInt32', 'UInt16', 'UInt8',
+               'Boolean', 'String', 'Float', 'Double', 'ByteBuffer')
+
+# Declaration kinds that define a type.
+TYPE_KINDS = frozenset(('struct', 'union', 'enumeration', 'map', 'typedef', 'array'))
+
+# Declaration kinds that may appear at the root of a document.
+ROOT_KINDS = frozenset(('interface', 'typeCollection'))
+
+# Declaration kinds a Typename may refer to: the types, and interfaces as
+# the base of another interface.
+REFERENCE_KINDS = TYPE_KINDS | frozenset(('interface',))
+
+def declaration_name(node):
+    """ Returns the name ID of a declaration node, or None if node is not
+        a (named) declaration.
+    """
+    declaration = DECLARATIONS.get(node.__class__.__name__)
+    if declaration is None:
+        return None
+    name = getattr(node, declaration[0], None)
+    return name if isinstance(name, franca_ast.ID) else None
+
+def typename_text(typename):
+    """ Returns the Franca source text of a Typename node, e.g. 'UInt8[]'.
+    """
+    if isinstance(typename.typename, franca_ast.ArrayTypeDeclaration):
+        return typename_text(typename.typename.type) + '[]'
+    return typename.typename
+
+def expression_text(node):
+    """ Returns the Franca source text of a constant expression, e.g. the
+        value of a Constant or an Enumerator.
+    """
+    if isinstance(node, franca_ast.BinaryOp):
+        return '(%s %s %s)' % (expression_text(node.left), node.op, expression_text(node.right))
+    if isinstance(node, franca_ast.UnaryOp):
+        return '%s%s' % (node.op, expression_text(node.expr))
+    if isinstance(node, franca_ast.String):
+        return node.string
+    if isinstance(node, franca_ast.Reference):
+        return node.name
+    return str(node.value)
+
+def integer_value(constant):
+    """ Returns the int value of an IntegerConstant node (decimal, hex,
+        binary or octal, with an optional C style suffix).
+    """
+    if constant.folded is not None:
+        return constant.folded
+    return franca_constants.integer_value(constant.value)
+
+def method_arguments(node):
+    """ Returns the (in arguments, out arguments) of a Method or
+        BroadcastMethod node, as two lists of MethodArgument nodes.
+    """
+    in_args, out_args = [], []
+    if isinstance(node, franca_ast.Method):
+        body = node.body
+    else:
+        body = node.out_args
+    parts = [body]
+    if isinstance(body, franca_ast.MethodBody):
+        parts = [body.in_args, body.out_args]
+    for part in parts:
+        if part is None:
+            continue
+        target = in_args if isinstance(part, franca_ast.MethodInArguments) else out_args
+        target.extend(part.args.args)
+    return in_args, out_args
+
+def version_of(node):
+    """ Returns the (major, minor) version of an Interface or
+        TypeCollection node, or None if it has no version.
+    """
+    for member in node.members.members:
+        if isinstance(member, franca_ast.Version):
+            return integer_value(member.major), integer_value(member.minor)
+    return None
+
+def find_fidl_files(paths):
+    """ Returns the sorted list of .fidl files in paths. Directories are
+        searched recursively, files are taken as they are.
+    """
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for filename in filenames:
+                    if filename.endswith(FIDL_EXTENSION):
+                        found.add(os.path.join(dirpath, filename))
+        else:
+            found.add(path)
+    return sorted(found)
+
+class Declaration(object):
+    """ A named declaration of a Franca document, e.g. an interface, a
+        struct or a method argument.
+
+        kind:
+            One of the kinds in DECLARATIONS, e.g. 'struct'.
+
+        name:
+            The (unqualified) name.
+
+        node:
+            The franca_ast node of the declaration.
+
+        parent:
+            The enclosing Declaration, or None for interfaces and type
+            collections.
+
+        document:
+            The ModelDocument the declaration belongs to.
+
+        type_refs:
+            Names of the types referenced directly by this declaration,
+            e.g. the type of an argument or the key and value types of
+            a map.
+
+        value_refs:
+            Names of the constants and enumerators referenced by the
+            value expression of a constant or enumerator, e.g.
+            'Limits.MAX'.
+    """
+    __slots__ = ('kind', 'name', 'node', 'parent', 'document', 'type_refs', 'value_refs')
+
+    def __init__(self, kind, name, node, parent, document):
+        self.kind = kind
+        self.name = name
+        self.node = node
+        self.parent = parent
+        self.document = document
+        self.type_refs = []
+        self.value_refs = []
+
+    @property
+    def package(self):
+        return self.document.package
+
+    @property
+    def qualified_name(self):
+        names = []
+        declaration = self
+        while declaration is not None:
+            names.append(declaration.name)
+            declaration = declaration.parent
+        if self.document.package:
+            names.append(self.document.package)
+        return '.'.join(reversed(names))
+
+    @property
+    def coord(self):
+        return declaration_name(self.node).coord
+
+    @property
+    def comment(self):
+        comment = getattr(self.node, 'comment', None)
+        return comment if isinstance(comment, franca_ast.FrancaComment) else None
+
+    def root(self):
+        """ Returns the interface or type collection this declaration
+            belongs to.
+        """
+        declaration = self
+        while declaration.parent is not None:
+            declaration = declaration.parent
+        return declaration
+
+    def members(self):
+        """ Returns the list of declarations directly inside this one,
+            e.g. the fields of a struct, in source order.
+        """
+        return self.document.members_of(self)
+
+    def ancestors(self):
+        declaration = self.parent
+        while declaration is not None:
+            yield declaration
+            declaration = declaration.parent
+
+    def __repr__(self):
+        return '<%s %s>' % (self.kind, self.qualified_name)
+
+class DeclarationCollector(franca_ast.NodeVisitor):
+    """ Builds the list of Declarations of a document, in source order
+        of the AST traversal, and records the type and value references
+        of each declaration.
+    """
+    def __init__(self, document):
+        self.document = document
+        self.declarations = []
+        self._parents = []
+
+    def visit_Typename(self, node):
+        if isinstance(node.typename, franca_ast.Node):
+            # implicit array, e.g. UInt8[]
+            return self.generic_visit(node)
+        if self._parents:
+            self._parents[-1].type_refs.append(node.typename)
+
+    def visit_Reference(self, node):
+        if self._parents:
+            self._parents[-1].value_refs.append(node.name)
+
+    def generic_visit(self, node):
+        name = declaration_name(node)
+        if name is None:
+            return franca_ast.NodeVisitor.generic_visit(self, node)
+
+        parent = self._parents[-1] if self._parents else None
+        kind = DECLARATIONS[node.__class__.__name__][1]
+        declaration = Declaration(kind, name.id, node, parent, self.document)
+        self.declarations.append(declaration)
+        self._parents.append(declaration)
+        franca_ast.NodeVisitor.generic_visit(self, node)
+        self._parents.pop()
+
+class ModelDocument(object):
+    """ A parsed .fidl file of a ModelSet.
+
+        filename:
+            Path of the file.
+
+        ast:
+            The FrancaDocument.
+
+        package:
+            The package name, e.g. 'org.example'.
+
+        imports:
+            List of (imported namespace, imported file) tuples, e.g.
+            ('org.example.Types.*', 'types.fidl').
+
+        declarations:
+            List of all Declarations of the document.
+    """
+    def __init__(self, filename, ast):
+        self.filename = filename
+        self.ast = ast
+        self.package = ''
+        self.imports = []
+        package_statement = ast.package_identifier
+        if package_statement is not None:
+            self.package = package_statement.package_identifier.package_identifier
+        if ast.imports is not None:
+            for import_statement in ast.imports.members:
+                self.imports.append((import_statement.import_identifier.import_identifier,
+                                     import_statement.filename.string.strip('"')))
+        collector = DeclarationCollector(self)
+        collector.visit(ast)
+        self.declarations = collector.declarations
+        self._members = None
+
+    def members_of(self, declaration):
+        """ Returns the declarations whose parent is declaration (None
+            for the interfaces and type collections of the document).
+        """
+        if self._members is None:
+            members = {}
+            for member in self.declarations:
+                members.setdefault(member.parent, []).append(member)
+            self._members = members
+        return self._members.get(declaration, [])
+
+    def resolve_import(self, imported_file):
+        """ Returns the path of an imported file, relative to this
+            document.
+        """
+        return os.path.normpath(os.path.join(os.path.dirname(self.filename), imported_file))
+
+class NameResolver(object):
+    """ Resolves names referenced from a declaration, e.g. the type of a
+        field or the base of a struct, to declarations of the given kinds
+        in a ModelSet.
+
+        Candidates are preferred in this order: declared in the same
+        declaration as the referencing one (e.g. a sibling enumerator),
+        in the same interface or type collection, in the same file, in
+        an imported file and in the same package. Qualified names, e.g.
+        'Common.Point', must match the end of the qualified name.
+    """
+    def __init__(self, model_set, kinds):
+        self.by_name = {}
+        # (interface or type collection, name) -> declarations, so the
+        # candidates in the same one are found without going through all
+        # declarations of that name in the model set
+        self._by_root = {}
+        self._imports = {}
+        for declaration in model_set.declarations():
+            if declaration.kind in kinds:
+                self.by_name.setdefault(declaration.name, []).append(declaration)
+                self._by_root.setdefault((declaration.root(), declaration.name), []).append(declaration)
+
+    def candidates(self, declaration, name):
+        """ Returns the list of most preferred declarations name may
+            refer to from declaration, empty if there is none.
+        """
+        short_name = name.rsplit('.', 1)[-1]
+        candidates = self.by_name.get(short_name, [])
+        if '.' in name:
+            candidates = self._matching(candidates, name)
+        if len(candidates) <= 1:
+            return candidates
+        local = self._by_root.get((declaration.root(), short_name), [])
+        if '.' in name:
+            local = self._matching(local, name)
+        if local:
+            siblings = [candidate for candidate in local
+                        if candidate.parent is not None and candidate.parent is declaration.parent]
+            return siblings or local
+        document = declaration.document
+        preferences = (
+            lambda candidate: candidate.document is document,
+            lambda candidate: candidate.document.filename in self._imported_files(document),
+            lambda candidate: candidate.package == document.package,
+        )
+        for preferred in preferences:
+            matching = [candidate for candidate in candidates if preferred(candidate)]
+            if matching:
+                return matching
+        return candidates
+
+    def resolve(self, declaration, name):
+        """ Returns the declaration name refers to from declaration, the
+            first one if it is ambiguous, or None.
+        """
+        candidates = self.candidates(declaration, name)
+        return candidates[0] if candidates else None
+
+    def _matching(self, candidates, name):
+        return [candidate for candidate in candidates
+                if candidate.qualified_name.endswith('.' + name) or candidate.qualified_name == name]
+
+    def _imported_files(self, document):
+        imported = self._imports.get(document)
+        if imported is None:
+            imported = self._imports[document] = frozenset(
+                document.resolve_import(imported_file)
+                for namespace, imported_file in document.imports)
+        return imported
+
+class EnumerationTable(object):
+    """ The resolved values of an enumeration, with constant time lookup
+        in both directions.
+
+        names, values:
+            The enumerators with a value and their values, in
+            declaration order.
+
+        by_name:
+            name -> value
+
+        by_value:
+            value -> name. If several enumerators share a value, the
+            first one declared.
+
+        duplicates:
+            value -> list of all names, for values shared by several
+            enumerators.
+
+        errors:
+            name -> ConstantError, for enumerators whose value could not
+            be computed.
+
+        offset, dense:
+            If all values are integers and fill at least half of the
+            range between the smallest and the largest, dense is the
+            list of names indexed by value - offset (None in the gaps),
+            e.g. for decoders indexing a table. Otherwise dense is None.
+    """
+    # Minimum share of the value range used for a dense table.
+    DENSITY = 0.5
+
+    def __init__(self, declaration, values, errors=()):
+        self.declaration = declaration
+        self.names = [name for name, value in values]
+        self.values = [value for name, value in values]
+        self.by_name = dict(values)
+        self.by_value = {}
+        self.duplicates = OrderedDict()
+        self.errors = dict(errors)
+        for name, value in values:
+            first = self.by_value.setdefault(value, name)
+            if first != name:
+                self.duplicates.setdefault(value, [first]).append(name)
+
+        self.offset = 0
+        self.dense = None
+        if values and all(is_integer(value) for value in self.values):
+            low, high = min(self.values), max(self.values)
+            if len(self.by_value) >= (high - low + 1) * self.DENSITY:
+                self.offset = low
+                self.dense = [None] * (high - low + 1)
+                for value, name in self.by_value.items():
+                    self.dense[value - low] = name
+
+    def value_of(self, name, default=None):
+        return self.by_name.get(name, default)
+
+    def name_of(self, value, default=None):
+        if self.dense is not None and is_integer(value):
+            index = value - self.offset
+            if 0 <= index < len(self.dense):
+                name = self.dense[index]
+                return default if name is None else name
+            return default
+        return self.by_value.get(value, default)
+
+    def __len__(self):
+        return len(self.names)
+
+class ConstantEvaluator(object):
+    """ Evaluates the constants and enumerators of a ModelSet, including
+        expressions that reference other constants or enumerators, which
+        the parser cannot fold. Every value is computed once; expressions
+        the parser already folded are not evaluated again. The same holds
+        for the EnumerationTables returned by enumeration().
+
+        References are resolved with a NameResolver, e.g. 'Limits.MAX'
+        or 'Color.kRed'.
+    """
+    def __init__(self, model_set):
+        self.model_set = model_set
+        self.resolver = NameResolver(model_set, ('constant', 'enumerator'))
+        self._values = {}
+        self._evaluating = set()
+        self._positions = {}
+        self._tables = {}
+        self._hierarchy = None
+
+    def value(self, declaration):
+        """ Returns the value of a constant or enumerator Declaration: an
+            int, float, bool or str. Enumerators without a value are
+            numbered on from the previous one, starting at 0. Raises
+            ConstantError if the value cannot be computed.
+        """
+        result = self._values.get(declaration)
+        if result is None:
+            if declaration in self._evaluating:
+                raise ConstantError('%s is defined in terms of itself' % declaration.qualified_name)
+            self._evaluating.add(declaration)
+            try:
+                result = self._compute(declaration)
+            except ConstantError as e:
+                result = e
+            finally:
+                self._evaluating.discard(declaration)
+            self._values[declaration] = result
+        if isinstance(result, ConstantError):
+            raise result
+        return result
+
+    def values(self):
+        """ Evaluates all constants and enumerators. Returns the list of
+            (Declaration, value) tuples and the list of (Declaration,
+            ConstantError) tuples of those that failed.
+        """
+        values, errors = [], []
+        # in declaration order, so implicit enumerator values are
+        # numbered on from the already known previous value
+        for declaration in self.model_set.declarations():
+            if declaration.kind not in ('constant', 'enumerator'):
+                continue
+            try:
+                values.append((declaration, self.value(declaration)))
+            except ConstantError as e:
+                errors.append((declaration, e))
+        return values, errors
+
+    def _compute(self, declaration):
+        node = declaration.node
+        if declaration.kind == 'constant':
+            value = self.evaluate(node.value, declaration)
+            if isinstance(node.typename.typename, franca_ast.Node):
+                return value
+            return convert(node.typename.typename, value)
+        if node.value is not None:
+            return self.evaluate(node.value, declaration)
+        siblings, index = self._position(declaration)
+        if index == 0:
+            return 0
+        start = index - 1
+        if siblings[start] not in self._values:
+            # evaluated out of order: number on from the closest
+            # enumerator with a value
+            while start > 0 and siblings[start].node.value is None:
+                start -= 1
+            if siblings[start].node.value is None:
+                return index
+        previous = self.value(siblings[start])
+        if not is_integer(previous):
+            raise ConstantError('%s cannot be numbered after the non integer value of %s' % (
+                declaration.name, siblings[start].name))
+        return previous + index - start
+
+    def _position(self, enumerator):
+        """ Returns the enumerators of the enumeration of enumerator and
+            the index of enumerator in them.
+        """
+        positions = self._positions.get(enumerator.parent)
+        if positions is None:
+            siblings = self._enumerators(enumerator.parent)
+            positions = self._positions[enumerator.parent] = (
+                siblings, dict((sibling, index) for index, sibling in enumerate(siblings)))
+        return positions[0], positions[1][enumerator]
+
+    def _enumerators(self, declaration):
+        """ The enumerators of an enumeration, those of its bases first,
+            so that its own enumerators are numbered on from the last
+            inherited one.
+        """
+        # imported here, franca_inheritance builds on this module
+        from .franca_inheritance import InheritanceError, TypeHierarchy
+        if self._hierarchy is None:
+            self._hierarchy = TypeHierarchy(self.model_set)
+        try:
+            return self._hierarchy.layout(declaration).members
+        except InheritanceError:
+            return declaration.members()
+
+    def enumeration(self, declaration):
+        """ Returns the EnumerationTable of an enumeration Declaration,
+            including the enumerators it inherits, computed on first use.
+        """
+        table = self._tables.get(declaration)
+        if table is None:
+            values, errors = [], []
+            for enumerator in self._enumerators(declaration):
+                try:
+                    values.append((enumerator.name, self.value(enumerator)))
+                except ConstantError as e:
+                    errors.append((enumerator.name, e))
+            table = self._tables[declaration] = EnumerationTable(declaration, values, errors)
+        return table
+
+    def evaluate(self, node, declaration):
+        """ Returns the value of the expression node, which belongs to
+            declaration (used to resolve references).
+        """
+        if node.folded is not None:
+            return node.folded
+        if isinstance(node, franca_ast.Reference):
+            target = self.resolver.resolve(declaration, node.name)
+            if target is None:
+                raise ConstantError('unknown constant %s' % node.name)
+            return self.value(target)
+        if isinstance(node, franca_ast.UnaryOp):
+            return fold_unary(node.op, self.evaluate(node.expr, declaration))
+        if isinstance(node, franca_ast.BinaryOp):
+            return fold_binary(node.op, self.evaluate(node.left, declaration),
+                               self.evaluate(node.right, declaration))
+        if isinstance(node, franca_ast.IntegerConstant):
+            return franca_constants.integer_value(node.value)
+        if isinstance(node, franca_ast.FloatConstant):
+            return franca_constants.float_value(node.value)
+        if isinstance(node, franca_ast.String):
+            return franca_constants.string_value(node.string)
+        if isinstance(node, franca_ast.BooleanConstant):
+            return node.value == 'true'
+        raise ConstantError('cannot evaluate %s' % node.__class__.__name__)
+
+class ModelSet(object):
+    """ A set of parsed Franca documents, keyed by filename.
+
+        Files that fail to parse are left out; their errors are
+        collected in 'errors' as (filename, msg, line, column) tuples.
+        Only the errors of the last parse of every file are kept, they
+        are replaced when the file is parsed again and dropped when it
+        is removed.
+
+        revision:
+            Incremented whenever a document is added, replaced or
+            removed, so caches of derived data (e.g. flattened type
+            layouts) can tell that they may be outdated.
+    """
+    def __init__(self, parser=None):
+        self.parser = parser
+        self.documents = OrderedDict()
+        # filename -> [(msg, line, column)]
+        self._errors = OrderedDict()
+        self.revision = 0
+
+    @property
+    def errors(self):
+        return [(filename, msg, line, column)
+                for filename, errors in self._errors.items()
+                for msg, line, column in errors]
+
+    @classmethod
+    def load(cls, paths, parser=None, max_workers=None):
+        """ Parse all .fidl files in paths (files or directories) into
+            a new ModelSet. max_workers is passed on to
+            FrancaParser.parse_many().
+        """
+        model_set = cls(parser)
+        sources = []
+        for filename in find_fidl_files(paths):
+            with open(filename) as f:
+                sources.append((filename, f.read()))
+        for result in model_set._get_parser().parse_many(sources, max_workers):
+            model_set._add_result(result)
+        return model_set
+
+    def _get_parser(self):
+        if self.parser is None:
+            self.parser = FrancaParser()
+        return self.parser
+
+    def parse_file(self, filename):
+        with open(filename) as f:
+            text = f.read()
+        return self.parse(filename, text)
+
+    def parse(self, filename, text):
+        """ Parse text as the contents of filename and add it to the set,
+            replacing a previous version of the file. Returns the new
+            ModelDocument, or None if the text could not be parsed.
+        """
+        errors = []
+        ast = self._get_parser().parse(
+            text, filename, lambda msg, line, column: errors.append((msg, line, column)))
+        return self._add_result(ParseResult(filename, ast, errors))
+
+    def set_errors(self, filename, errors):
+        """ Replace the errors of filename by a list of (msg, line,
+            column) tuples, e.g. when the file cannot be read.
+        """
+        self._errors.pop(filename, None)
+        if errors:
+            self._errors[filename] = list(errors)
+
+    def _add_result(self, result):
+        self.remove(result.filename)
+        self.set_errors(result.filename, result.errors)
+        if result.document is None:
+            return None
+        return self.add(result.filename, result.document)
+
+    def add(self, filename, ast):
+        return self.restore(ModelDocument(filename, ast))
+
+    def restore(self, document):
+        """ Put a ModelDocument, e.g. the last good revision of a file
+            that no longer parses, (back) into the set.
+        """
+        self.documents[document.filename] = document
+        self.revision += 1
+        return document
+
+    def remove(self, filename):
+        """ Remove filename and its errors from the set. Returns the
+            removed ModelDocument, or None.
+        """
+        self._errors.pop(filename, None)
+        document = self.documents.pop(filename, None)
+        if document is not None:
+            self.revision += 1
+        return document
+
+    def declarations(self):
+        for document in self.documents.values():
+            for declaration in document.declarations:
+                yield declaration
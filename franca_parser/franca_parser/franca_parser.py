@@ -10,25 +10,218 @@
 # Copyright (C) 2016, Ingmar Lehmann
 # License: BSD
 #------------------------------------------------------------------------------
+from __future__ import print_function
+
 import sys
-import argparse
-import franca_ast
+
+from collections import namedtuple
 
 from ply import yacc
-from franca_lexer import FrancaLexer
+
+from . import franca_ast
+from .franca_constants import (ConstantError, convert, float_value, fold_binary,
+                               fold_unary, integer_value, string_value)
+from .franca_lexer import FrancaLexer
+
+# Result of FrancaParser.parse_many() for one source. errors is the list
+# of (msg, line, column) tuples reported while parsing it.
+ParseResult = namedtuple('ParseResult', 'filename document errors')
+
+def gil_enabled():
+    """ Returns False on free-threaded CPython builds running with the
+        GIL disabled, where parse_many() parses in parallel.
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
+class StreamHandler(object):
+    """ Receives the parts of a document from FrancaParser.parse_stream()
+        as soon as they are parsed. Subclasses override the callbacks
+        they need; the default ones do nothing.
+
+        The nodes are fully built when a callback gets them, except for
+        the interfaces and type collections: their members are passed
+        to declaration() one by one instead, between start_root() and
+        end_root(), and the members attribute of the node is empty (or
+        None in start_root()).
+    """
+    def package(self, node):
+        """ Called with the PackageStatement.
+        """
+        pass
+
+    def import_statement(self, node):
+        pass
+
+    def start_root(self, node):
+        """ Called with an Interface or TypeCollection node when its
+            header, up to the opening brace, is parsed.
+        """
+        pass
+
+    def declaration(self, node):
+        """ Called with every member of the current interface or type
+            collection, e.g. a Struct, Method or Constant node.
+        """
+        pass
+
+    def end_root(self, node):
+        pass
+
+class _LRTables(object):
+    """ The parsing tables of a yacc LRParser, in the form LRParser()
+        takes them. They are never modified after yacc() built them.
+    """
+    def __init__(self, parser):
+        self.lr_productions = parser.productions
+        self.lr_action = parser.action
+        self.lr_goto = parser.goto
 
 class FrancaParser(object):
-    def __init__(self):
-        self.lexer = FrancaLexer(self.on_lexer_error)
+    def __init__(self, drop_comments=False, error_func=None):
+        """ Create a new FrancaParser.
+
+            drop_comments:
+                If True, Franca comments (<** ... **>) are skipped by
+                the lexer and no FrancaComment nodes end up in the AST.
+                This speeds up parsing and reduces memory usage for
+                tools that never read the documentation.
+
+            error_func:
+                Called with an error message, line and column for
+                every lexer and syntax error. Line and column are
+                None for an unexpected end of input. By default the
+                error is printed.
+
+            The parser is reentrant: the lexer and parsing tables are
+            built once and only read afterwards, while every call of
+            parse() lexes and parses with its own state. One parser
+            can therefore be shared by many threads.
+        """
+        self.error_func = error_func or self._print_error
+        self.lexer = FrancaLexer(self.on_lexer_error, drop_comments)
         self.lexer.build()
         self.tokens = self.lexer.tokens
         self.parser = yacc.yacc(module=self)
+        self._tables = _LRTables(self.parser)
 
-    def on_lexer_error(self, error):
-        print error
-
-    def parse(self, text):
-        return self.parser.parse(input=text,lexer=self.lexer)
+    @staticmethod
+    def _print_error(msg, line, column):
+        if line is None:
+            print(msg)
+        else:
+            print('%s:%s: %s' % (line, column, msg))
+
+    def on_lexer_error(self, msg, line, column):
+        self.error_func(msg, line, column)
+
+    def parse(self, text, filename='', error_func=None):
+        """ Parse Franca IDL source and return a FrancaDocument, or
+            None if the text could not be parsed.
+
+            text:
+                Franca IDL source text.
+
+            filename:
+                Name of the file being parsed, used in the coordinates
+                of the AST nodes.
+
+            error_func:
+                Error function for this call only, replacing the one
+                the parser was created with. Lets concurrent callers
+                collect their errors separately.
+        """
+        return self._parse(text, filename, error_func)
+
+    def parse_stream(self, text, handler, filename='', error_func=None):
+        """ Parse Franca IDL source and pass its package, imports,
+            interfaces, type collections and their members to the
+            callbacks of handler, a StreamHandler, as they are parsed.
+
+            The parser does not keep a member once handler got it, so the
+            memory used for the AST is bounded by the largest single
+            declaration instead of the size of the document. Only the
+            source text itself is held in full.
+
+            Returns the FrancaDocument without the members of its
+            interfaces and type collections, or None if the text could
+            not be parsed. Callbacks already made for a document with
+            syntax errors are not taken back.
+
+            filename and error_func are the same as for parse().
+        """
+        return self._parse(text, filename, error_func, handler=handler)
+
+    def parse_declaration(self, text, filename='', line=1, column=1, error_func=None):
+        """ Parse the source of a single member of an interface or type
+            collection, e.g. a struct or a method with its comment, and
+            return its node, or None if the text could not be parsed or
+            holds more or less than one declaration.
+
+            line, column:
+                Where text starts in the file, so the coordinates of the
+                nodes are those of the whole file (see franca_lazy).
+
+            filename and error_func are the same as for parse().
+        """
+        # The member is parsed as the only one of a dummy type collection,
+        # whose header takes the line before it.
+        wrapped = 'package x typeCollection x {\n' + ' ' * (column - 1) + text + '\n}'
+        document = self._parse(wrapped, filename, error_func, lineno=line - 1)
+        if document is None:
+            return None
+        members = document.child_objects.members[0].members.members
+        return members[0] if len(members) == 1 else None
+
+    def _parse(self, text, filename, error_func, handler=None, lineno=1):
+        lexer = self.lexer.clone(error_func or self.on_lexer_error)
+        lexer.filename = filename
+        lexer.handler = handler
+        lexer.lexer.lineno = lineno
+        parser = yacc.LRParser(self._tables,
+                               lambda token: self._syntax_error(lexer, token))
+        return parser.parse(input=text, lexer=lexer)
+
+    def parse_many(self, sources, max_workers=None):
+        """ Parse several sources, concurrently on a thread pool, and
+            return the list of their ParseResults in the order of
+            sources.
+
+            sources:
+                Iterable of (filename, text) tuples.
+
+            max_workers:
+                Number of threads. By default the number of CPUs on
+                free-threaded builds, and 1 (parse in the calling
+                thread) when the GIL is enabled, as parsing is CPU
+                bound and threads would only add overhead there.
+        """
+        sources = list(sources)
+        if max_workers is None:
+            max_workers = 1 if gil_enabled() else _cpu_count()
+        if max_workers <= 1 or len(sources) <= 1:
+            return [self._parse_source(source) for source in sources]
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+        except ImportError:
+            return [self._parse_source(source) for source in sources]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._parse_source, sources))
+
+    def _parse_source(self, source):
+        filename, text = source
+        errors = []
+        document = self.parse(text, filename,
+                              lambda msg, line, column: errors.append((msg, line, column)))
+        return ParseResult(filename, document, errors)
+
+    def _token_coord(self, p, token_idx):
+        """ Returns the coordinates of the token at index token_idx
+            of the production p.
+        """
+        return franca_ast.Coord(p.lexer.filename,
+                                p.lineno(token_idx),
+                                p.lexer.find_column(p.lexpos(token_idx)))
 
     def p_franca_document(self, p):
         '''franca_document : package_statement import_statement_list root_level_object_list
@@ -38,16 +231,14 @@ class FrancaParser(object):
         else:
             p[0] = franca_ast.FrancaDocument(p[1], None, p[2])
 
-        p[0].show()
-
     def p_document_root_level_object_list(self, p):
         '''root_level_object_list : root_level_object 
-                                | root_level_object root_level_object_list'''
+                                | root_level_object_list root_level_object'''
         if len(p) == 2:
             p[0] = franca_ast.RootLevelObjectList([p[1]])
         else:
-            p[2].members.append(p[1])
-            p[0] = p[2]
+            p[1].members.append(p[2])
+            p[0] = p[1]
 
     def p_root_level_object(self, p):
         '''root_level_object : interface
@@ -56,43 +247,68 @@ class FrancaParser(object):
    
     def p_import_statement_list(self, p):
         '''import_statement_list : import_statement
-                                | import_statement import_statement_list'''
+                                | import_statement_list import_statement'''
         if len(p) == 2:
             p[0] = franca_ast.ImportStatementList([p[1]])
         else:
-            p[2].members.append(p[1])
-            p[0] = p[2]
+            p[1].members.append(p[2])
+            p[0] = p[1]
 
     def p_import_statement(self, p):
         '''import_statement : IMPORT import_identifier FROM string'''
         p[0] = franca_ast.ImportStatement(p[2], p[4])
+        if p.lexer.handler is not None:
+            p.lexer.handler.import_statement(p[0])
+
+    # The header of an interface or type collection is a rule of its own,
+    # so a StreamHandler gets it before the members.
 
     def p_interface(self, p):
-        '''interface : INTERFACE identifier LBRACE complex_type_declaration_list RBRACE
-                        | franca_comment INTERFACE identifier LBRACE complex_type_declaration_list RBRACE'''
-        if len(p) == 6:
-            p[0] = franca_ast.Interface(p[2], p[4], None)
+        '''interface : interface_head LBRACE complex_type_declaration_list RBRACE'''
+        p[1].members = p[3]
+        p[0] = p[1]
+        if p.lexer.handler is not None:
+            p.lexer.handler.end_root(p[0])
+
+    def p_interface_head(self, p):
+        '''interface_head : INTERFACE identifier type_base
+                        | franca_comment INTERFACE identifier type_base'''
+        if len(p) == 4:
+            p[0] = franca_ast.Interface(p[2], None, None, p[3])
         else:
-            p[0] = franca_ast.Interface(p[3], p[5], p[1])
+            p[0] = franca_ast.Interface(p[3], None, p[1], p[4])
+        if p.lexer.handler is not None:
+            p.lexer.handler.start_root(p[0])
 
     def p_type_collection(self, p):
-        '''type_collection : TYPECOLLECTION identifier LBRACE complex_type_declaration_list RBRACE
-                        | franca_comment TYPECOLLECTION identifier LBRACE complex_type_declaration_list RBRACE'''
-        if len(p) == 6:
-            p[0] = franca_ast.TypeCollection(p[2], p[4], None)
+        '''type_collection : type_collection_head LBRACE complex_type_declaration_list RBRACE'''
+        p[1].members = p[3]
+        p[0] = p[1]
+        if p.lexer.handler is not None:
+            p.lexer.handler.end_root(p[0])
+
+    def p_type_collection_head(self, p):
+        '''type_collection_head : TYPECOLLECTION identifier
+                        | franca_comment TYPECOLLECTION identifier'''
+        if len(p) == 3:
+            p[0] = franca_ast.TypeCollection(p[2], None, None)
         else:
-            p[0] = franca_ast.TypeCollection(p[3], p[5], p[1])
+            p[0] = franca_ast.TypeCollection(p[3], None, p[1])
+        if p.lexer.handler is not None:
+            p.lexer.handler.start_root(p[0])
 
-        p[0].show()
-    
     def p_complex_type_declaration_list(self, p):
         '''complex_type_declaration_list : complex_type_declaration
-                                        | complex_type_declaration complex_type_declaration_list'''
+                                        | complex_type_declaration_list complex_type_declaration'''
         if len(p) == 2:
-            p[0] = franca_ast.ComplexTypeDeclarationList([p[1]])
+            p[0] = franca_ast.ComplexTypeDeclarationList([])
+        else:
+            p[0] = p[1]
+        if p.lexer.handler is None:
+            p[0].members.append(p[len(p) - 1])
         else:
-            p[2].members.append(p[1])
-            p[0] = p[2]
+            # streaming: hand the declaration over instead of keeping it
+            p.lexer.handler.declaration(p[len(p) - 1])
 
     def p_complex_type_declaration(self, p):
         '''complex_type_declaration : enumeration_declaration 
@@ -103,6 +319,7 @@ class FrancaParser(object):
                                     | attribute_declaration
                                     | version_declaration
                                     | explicit_array_type_declaration
+                                    | constant_declaration
                                     | typedef'''
         p[0] = p[1]
 
@@ -126,30 +343,52 @@ class FrancaParser(object):
         else:
             p[0] = franca_ast.Map(p[3], p[5], p[7], p[1])
 
-    def p_union_declaration(self, p): # TODO: union inheritance
-        '''union_declaration : UNION identifier LBRACE variable_declaration_list RBRACE
-                | franca_comment UNION identifier LBRACE variable_declaration_list RBRACE'''
-        if len(p) == 6:
-            p[0] = franca_ast.Union(p[2], p[4], None)
-        else: 
-            p[0] = franca_ast.Union(p[3], p[5], p[1])
+    def p_union_declaration(self, p):
+        '''union_declaration : UNION identifier type_base LBRACE variable_declaration_list_opt RBRACE
+                | franca_comment UNION identifier type_base LBRACE variable_declaration_list_opt RBRACE'''
+        if len(p) == 7:
+            p[0] = franca_ast.Union(p[2], p[5], None, p[3])
+        else:
+            p[0] = franca_ast.Union(p[3], p[6], p[1], p[4])
 
-    def p_struct_declaration(self, p): # TODO: polymorphic structs, struct inheritance
-        '''struct_declaration : STRUCT identifier LBRACE variable_declaration_list RBRACE
-                    | franca_comment STRUCT identifier LBRACE variable_declaration_list RBRACE'''
-        if len(p) == 6:
-            p[0] = franca_ast.Struct(p[2], p[4], None)
-        elif len(p) == 7:
-            p[0] = franca_ast.Struct(p[3], p[5], p[1])
+    def p_struct_declaration(self, p):
+        '''struct_declaration : STRUCT identifier struct_base LBRACE variable_declaration_list_opt RBRACE
+                    | franca_comment STRUCT identifier struct_base LBRACE variable_declaration_list_opt RBRACE'''
+        if len(p) == 7:
+            comment, name, (base, is_polymorphic), members = None, p[2], p[3], p[5]
+        else:
+            comment, name, (base, is_polymorphic), members = p[1], p[3], p[4], p[6]
+        p[0] = franca_ast.Struct(name, members, comment, base, is_polymorphic)
+
+    def p_struct_base(self, p):
+        '''struct_base : type_base
+                    | POLYMORPHIC
+                    | EXTENDS typename POLYMORPHIC'''
+        if len(p) == 2 and p[1] == 'polymorphic':
+            p[0] = (None, True)
+        elif len(p) == 2:
+            p[0] = (p[1], False)
+        else:
+            p[0] = (p[2], True)
+
+    def p_type_base(self, p):
+        '''type_base : EXTENDS typename
+                    | empty'''
+        p[0] = p[2] if len(p) == 3 else None
+
+    def p_variable_declaration_list_opt(self, p):
+        '''variable_declaration_list_opt : variable_declaration_list
+                                        | empty'''
+        p[0] = p[1] if p[1] is not None else franca_ast.VariableList([])
 
     def p_variable_declaration_list(self, p):
         '''variable_declaration_list : variable_declaration
-                                    | variable_declaration variable_declaration_list'''
+                                    | variable_declaration_list variable_declaration'''
         if len(p) == 2:
             p[0] = franca_ast.VariableList([p[1]])
         else:
-            p[2].members.append(p[1])
-            p[0] = p[2]
+            p[1].members.append(p[2])
+            p[0] = p[1]
 
     def p_variable_declaration(self, p): 
         '''variable_declaration : typename identifier
@@ -159,29 +398,31 @@ class FrancaParser(object):
         else:
             p[0] = franca_ast.Variable(p[2], p[3], p[1])
     
-    def p_enumeration_declaration(self, p): # TODO: enumeration inheritance
-        '''enumeration_declaration : ENUMERATION identifier LBRACE enumeration_member_declaration_list RBRACE
-                        | franca_comment ENUMERATION identifier LBRACE enumeration_member_declaration_list RBRACE'''
-        if len(p) == 6:
-            p[0] = franca_ast.Enum(p[2], p[4], None)
-        elif len(p) == 7:
-            p[0] = franca_ast.Enum(p[3], p[5], p[1])
+    def p_enumeration_declaration(self, p):
+        '''enumeration_declaration : ENUMERATION identifier type_base LBRACE enumeration_member_declaration_list_opt RBRACE
+                        | franca_comment ENUMERATION identifier type_base LBRACE enumeration_member_declaration_list_opt RBRACE'''
+        if len(p) == 7:
+            p[0] = franca_ast.Enum(p[2], p[5], None, p[3])
+        else:
+            p[0] = franca_ast.Enum(p[3], p[6], p[1], p[4])
+
+    def p_enumeration_member_declaration_list_opt(self, p):
+        '''enumeration_member_declaration_list_opt : enumeration_member_declaration_list
+                                                    | empty'''
+        p[0] = p[1] if p[1] is not None else franca_ast.EnumeratorList([])
 
     def p_enumeration_value_list(self, p):
         '''enumeration_member_declaration_list : enumeration_member_declaration
-                                                | enumeration_member_declaration enumeration_member_declaration_list'''
+                                                | enumeration_member_declaration_list enumeration_member_declaration'''
         if len(p) == 2:
             p[0] = franca_ast.EnumeratorList([p[1]])
         elif len(p) == 3:
-            p[2].enumerators.append(p[1])
-            p[0] = p[2]
+            p[1].enumerators.append(p[2])
+            p[0] = p[1]
 
-    # TODO: Handle expressions in assignment of enum value
     def p_enumeration_member_declaration(self, p):
-        '''enumeration_member_declaration : identifier EQUALS const_int
-                            | identifier EQUALS string
-                            | franca_comment identifier EQUALS const_int
-                            | franca_comment identifier EQUALS string
+        '''enumeration_member_declaration : identifier EQUALS expression
+                            | franca_comment identifier EQUALS expression
                             | identifier
                             | franca_comment identifier'''
         if len(p) == 2:
@@ -195,7 +436,8 @@ class FrancaParser(object):
 
     def p_franca_comment(self, p):
         '''franca_comment : FRANCA_COMMENT'''
-        p[0] = franca_ast.FrancaComment(p[1])
+        start, end = p[1]
+        p[0] = franca_ast.FrancaComment(p.lexer.lexer.lexdata, start, end)
 
     def p_method_declaration(self, p): # TODO: error{} declarations, error inheritance
         '''method_declaration : METHOD identifier LBRACE method_body RBRACE
@@ -275,8 +517,17 @@ class FrancaParser(object):
         p[0] = franca_ast.Typedef(p[4], p[2])
 
     def p_typename_1(self, p):
-        '''typename : ID'''
-        p[0] = franca_ast.Typename(p[1])
+        '''typename : qualified_typename'''
+        p[0] = p[1]
+
+    def p_qualified_typename(self, p):
+        '''qualified_typename : ID
+                            | qualified_typename PERIOD ID'''
+        if len(p) == 2:
+            p[0] = franca_ast.Typename(p[1], self._token_coord(p, 1))
+        else:
+            p[1].typename += '.' + p[3]
+            p[0] = p[1]
 
     def p_typename_2(self, p):
         '''typename : INT64
@@ -294,25 +545,125 @@ class FrancaParser(object):
                     | DOUBLE
                     | BYTEBUFFER
         '''
-        p[0] = franca_ast.Typename(p[1])
+        p[0] = franca_ast.Typename(p[1], self._token_coord(p, 1))
     
     def p_typename_3(self, p):
         '''typename : implicit_array_type_declaration'''
-        p[0] = franca_ast.Typename(p[1])
+        p[0] = franca_ast.Typename(p[1], p[1].type.coord)
    
-    # def p_constant_declarator(self, p):
-        # '''constant_declarator : CONST typename EQUALS expression'''
-        # p[0] = franca_ast.Constant(p[4])
+    def p_constant_declaration(self, p):
+        '''constant_declaration : CONST typename identifier EQUALS expression
+                                | franca_comment CONST typename identifier EQUALS expression'''
+        if len(p) == 6:
+            p[0] = franca_ast.Constant(p[2], p[3], p[5], None)
+        else:
+            p[0] = franca_ast.Constant(p[3], p[4], p[6], p[1])
+        constant = p[0]
+        if constant.value.folded is not None and not isinstance(constant.typename.typename, franca_ast.Node):
+            try:
+                convert(constant.typename.typename, constant.value.folded)
+            except ConstantError as e:
+                self._constant_error(p, e, constant.name.coord)
+
+    # Binary operators in order of increasing precedence, as in C
+    precedence = (
+        ('left', 'LOR'),
+        ('left', 'LAND'),
+        ('left', 'OR'),
+        ('left', 'XOR'),
+        ('left', 'AND'),
+        ('left', 'EQ', 'NE'),
+        ('left', 'GT', 'GE', 'LT', 'LE'),
+        ('left', 'RSHIFT', 'LSHIFT'),
+        ('left', 'PLUS', 'MINUS'),
+        ('left', 'TIMES', 'DIVIDE', 'MOD'),
+    )
+
+    def p_expression(self, p):
+        '''expression : binary_expression'''
+        p[0] = p[1]
 
-    # def p_unary_expression(self, p):
-        # '''unary_expression : typename PLUS typename
-                            # | typename MINUS typename
-                            # | typename TIMES typename
-                            # | typename DIVIDED typename'''
+    def p_binary_expression(self, p):
+        '''binary_expression : unary_expression
+                            | binary_expression TIMES binary_expression
+                            | binary_expression DIVIDE binary_expression
+                            | binary_expression MOD binary_expression
+                            | binary_expression PLUS binary_expression
+                            | binary_expression MINUS binary_expression
+                            | binary_expression RSHIFT binary_expression
+                            | binary_expression LSHIFT binary_expression
+                            | binary_expression LT binary_expression
+                            | binary_expression LE binary_expression
+                            | binary_expression GE binary_expression
+                            | binary_expression GT binary_expression
+                            | binary_expression EQ binary_expression
+                            | binary_expression NE binary_expression
+                            | binary_expression AND binary_expression
+                            | binary_expression OR binary_expression
+                            | binary_expression XOR binary_expression
+                            | binary_expression LAND binary_expression
+                            | binary_expression LOR binary_expression'''
+        if len(p) == 2:
+            p[0] = p[1]
+        else:
+            coord = self._token_coord(p, 2)
+            folded = self._fold(p, coord, fold_binary, p[2], p[1].folded, p[3].folded)
+            p[0] = franca_ast.BinaryOp(p[2], p[1], p[3], folded, coord)
+
+    def p_unary_expression(self, p):
+        '''unary_expression : primary_expression
+                            | MINUS unary_expression
+                            | PLUS unary_expression
+                            | NOT unary_expression
+                            | LNOT unary_expression'''
+        if len(p) == 2:
+            p[0] = p[1]
+        else:
+            coord = self._token_coord(p, 1)
+            folded = self._fold(p, coord, fold_unary, p[1], p[2].folded)
+            p[0] = franca_ast.UnaryOp(p[1], p[2], folded, coord)
+
+    def p_primary_expression_1(self, p):
+        '''primary_expression : const_int
+                              | const_float
+                              | const_bool
+                              | string
+                              | reference'''
+        p[0] = p[1]
+
+    def p_primary_expression_2(self, p):
+        '''primary_expression : LPAREN expression RPAREN'''
+        p[0] = p[2]
+
+    def p_reference(self, p):
+        '''reference : ID
+                    | reference PERIOD ID'''
+        if len(p) == 2:
+            p[0] = franca_ast.Reference(p[1], self._token_coord(p, 1))
+        else:
+            p[1].name += '.' + p[3]
+            p[0] = p[1]
+
+    def _fold(self, p, coord, fold, op, *operands):
+        """ Returns fold(op, *operands), or None if an operand is not
+            known at parse time or the operator is not applicable, which
+            is reported as an error.
+        """
+        if any(operand is None for operand in operands):
+            return None
+        try:
+            return fold(op, *operands)
+        except ConstantError as e:
+            self._constant_error(p, e, coord)
+            return None
+
+    def _constant_error(self, p, error, coord):
+        p.lexer.error_func("Invalid constant expression: {}".format(error),
+                           coord.line, coord.column)
 
     def p_identifier(self, p):
         '''identifier : ID'''
-        p[0] = franca_ast.ID(p[1])
+        p[0] = franca_ast.ID(p[1], self._token_coord(p, 1))
 
     def p_import_identifier_1(self, p):
         '''import_identifier : TIMES'''
@@ -332,6 +683,8 @@ class FrancaParser(object):
     def p_package_statement(self, p):
         '''package_statement : PACKAGE package_identifier'''
         p[0] = franca_ast.PackageStatement(p[2])
+        if p.lexer.handler is not None:
+            p.lexer.handler.package(p[0])
     
     def p_package_identifier(self, p):
         '''package_identifier : ID 
@@ -349,31 +702,58 @@ class FrancaParser(object):
 
     def p_string(self, p):
         '''string : STRING_LITERAL'''
-        p[0] = franca_ast.String(p[1])
+        p[0] = franca_ast.String(p[1], string_value(p[1]))
 
     def p_integer_constant(self, p):
         '''const_int : INT_CONST_DEC 
                     | INT_CONST_OCT 
                     | INT_CONST_HEX 
                     | INT_CONST_BIN'''
-        p[0] = franca_ast.IntegerConstant(p[1])
+        p[0] = franca_ast.IntegerConstant(p[1], integer_value(p[1]))
+
+    def p_float_constant(self, p):
+        '''const_float : FLOAT_CONST
+                    | HEX_FLOAT_CONST'''
+        p[0] = franca_ast.FloatConstant(p[1], float_value(p[1]))
 
-    # def p_empty(self, p):
-        # '''empty : '''
+    def p_boolean_constant(self, p):
+        '''const_bool : TRUE
+                    | FALSE'''
+        p[0] = franca_ast.BooleanConstant(p[1], p[1] == 'true')
+
+    def p_empty(self, p):
+        '''empty : '''
+        p[0] = None
 
     def p_error(self, p):
+        self._syntax_error(self.lexer, p)
+
+    def _syntax_error(self, lexer, p):
         if p is None:
-            print "Syntax error: unexpected EOF"
-    	else:
-            print "Syntax error at line {}: unexpected token {}".format(p.lineno, p.value)
+            lexer.error_func("Syntax error: unexpected EOF", None, None)
+        else:
+            # Franca comment tokens only carry their span, not the text
+            value = p.type if p.type == 'FRANCA_COMMENT' else p.value
+            lexer.error_func("Syntax error: unexpected token {}".format(value),
+                             p.lineno, lexer.find_column(p.lexpos))
+
+def _cpu_count():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
 
 ## Debug code used during development ##
-## Test by doing 'cat my_interface.fidl | python franca_parser.py'
-franca_parser = FrancaParser()
+## Test by doing 'cat my_interface.fidl | python -m franca_parser.franca_parser'
+if __name__ == '__main__':
+    franca_parser = FrancaParser()
 
-input_text = '' 
-for line in sys.stdin: 
-    input_text += line 
+    input_text = ''
+    for line in sys.stdin:
+        input_text += line
 
-franca_parser.parse(input_text)
+    document = franca_parser.parse(input_text)
+    if document is not None:
+        document.show()
 ## Debug code used during development ##
@@ -0,0 +1,322 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_query.py
+#
+# ModelIndex and Query classes: Declarative queries over the declarations of
+#                               a ModelSet, backed by secondary indexes.
+#
+# Example:
+#
+#   index = ModelIndex(ModelSet.load(['models/']))
+#   for declaration in index.query().kind('broadcast').package('a.b.*'):
+#       print(declaration.qualified_name)
+#
+# Run 'python -m franca_parser.franca_query --help' for the command line
+# interface.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+from fnmatch import fnmatchcase
+
+from .franca_model import DECLARATIONS, TYPE_KINDS, ModelSet
+
+KINDS = tuple(sorted(set(kind for name, kind in DECLARATIONS.values())))
+
+def _is_pattern(pattern):
+    return any(c in pattern for c in '*?[')
+
+class ModelIndex(object):
+    """ Secondary indexes over all declarations of a ModelSet. Built once,
+        then used by any number of queries.
+
+        by_kind:
+            kind -> [Declaration]
+
+        by_name:
+            unqualified name -> [Declaration]
+
+        by_package:
+            package name -> [Declaration]
+
+        by_type:
+            unqualified type name -> [Declaration] directly referencing
+            that type, e.g. with 'Point' or 'Common.Point'
+
+        by_tag:
+            comment tag -> [Declaration] whose comment has that tag
+    """
+    def __init__(self, model_set):
+        self.model_set = model_set
+        self.declarations = []
+        self.by_kind = {}
+        self.by_name = {}
+        self.by_package = {}
+        self.by_type = {}
+        self.by_tag = {}
+        for declaration in model_set.declarations():
+            self._add(declaration)
+
+    def _add(self, declaration):
+        self.declarations.append(declaration)
+        self.by_kind.setdefault(declaration.kind, []).append(declaration)
+        self.by_name.setdefault(declaration.name, []).append(declaration)
+        self.by_package.setdefault(declaration.package, []).append(declaration)
+        for type_name in set(type_name.rsplit('.', 1)[-1] for type_name in declaration.type_refs):
+            self.by_type.setdefault(type_name, []).append(declaration)
+        comment = declaration.comment
+        if comment is not None:
+            for tag in comment.tags:
+                self.by_tag.setdefault(tag, []).append(declaration)
+
+    def query(self):
+        return Query(self)
+
+    def referencing_types(self, type_name):
+        """ Returns the names of all types that use type_name, directly
+            or through other types (e.g. a map of a struct containing
+            type_name), including type_name itself.
+        """
+        found = set([type_name])
+        pending = [type_name]
+        while pending:
+            for declaration in self.by_type.get(pending.pop(), ()):
+                owner = declaration
+                while owner is not None and owner.kind not in TYPE_KINDS:
+                    owner = owner.parent
+                if owner is not None and owner.name not in found:
+                    found.add(owner.name)
+                    pending.append(owner.name)
+        return found
+
+class _Selector(object):
+    """ Base class of the query selectors.
+
+        candidates() returns the declarations that can possibly match,
+        taken from an index, or None if the selector cannot use an
+        index. matches() checks a single declaration.
+    """
+    def candidates(self, index):
+        return None
+
+    def matches(self, index, declaration):
+        raise NotImplementedError
+
+class KindSelector(_Selector):
+    def __init__(self, kinds):
+        self.kinds = frozenset(kinds)
+
+    def candidates(self, index):
+        result = []
+        for kind in self.kinds:
+            result.extend(index.by_kind.get(kind, ()))
+        return result
+
+    def matches(self, index, declaration):
+        return declaration.kind in self.kinds
+
+class NameSelector(_Selector):
+    """ Matches the name against a glob pattern. Patterns containing a
+        '.' are matched against the qualified name.
+    """
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.qualified = '.' in pattern
+
+    def candidates(self, index):
+        if self.qualified or _is_pattern(self.pattern):
+            return None
+        return index.by_name.get(self.pattern, [])
+
+    def matches(self, index, declaration):
+        if self.qualified:
+            return fnmatchcase(declaration.qualified_name, self.pattern)
+        return fnmatchcase(declaration.name, self.pattern)
+
+class PackageSelector(_Selector):
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def candidates(self, index):
+        result = []
+        for package, declarations in index.by_package.items():
+            if fnmatchcase(package, self.pattern):
+                result.extend(declarations)
+        return result
+
+    def matches(self, index, declaration):
+        return fnmatchcase(declaration.package, self.pattern)
+
+class UsesTypeSelector(_Selector):
+    """ Matches declarations that reference a type, either directly or
+        through one of their members (e.g. a method whose argument has
+        the type). With indirect=True, types that are only used through
+        other types (maps, arrays, typedefs, struct members, ...) count
+        as well.
+
+        Types are matched by their unqualified name, so 'Point' and
+        'Common.Point' both match references written as 'Point' or as
+        'Common.Point'.
+    """
+    def __init__(self, type_name, indirect=False):
+        self.type_name = type_name.rsplit('.', 1)[-1]
+        self.indirect = indirect
+        self._matching = None
+
+    def _compute(self, index):
+        if self._matching is None:
+            if self.indirect:
+                type_names = index.referencing_types(self.type_name)
+            else:
+                type_names = [self.type_name]
+            matching = []
+            seen = set()
+            for type_name in type_names:
+                for declaration in index.by_type.get(type_name, ()):
+                    while declaration is not None and declaration not in seen:
+                        seen.add(declaration)
+                        matching.append(declaration)
+                        declaration = declaration.parent
+            self._matching = (matching, seen)
+        return self._matching
+
+    def candidates(self, index):
+        return self._compute(index)[0]
+
+    def matches(self, index, declaration):
+        return declaration in self._compute(index)[1]
+
+class TagSelector(_Selector):
+    """ Matches declarations whose comment has a tag, optionally with a
+        value matching a glob pattern.
+    """
+    def __init__(self, tag, pattern=None):
+        self.tag = tag
+        self.pattern = pattern
+
+    def candidates(self, index):
+        return index.by_tag.get(self.tag, [])
+
+    def matches(self, index, declaration):
+        comment = declaration.comment
+        if comment is None or self.tag not in comment.tags:
+            return False
+        return self.pattern is None or fnmatchcase(comment.tags[self.tag], self.pattern)
+
+class Query(object):
+    """ A conjunction of selectors. The selectors are added with the
+        chainable methods below and evaluated when the query is
+        iterated.
+
+        Evaluation starts from the smallest candidate list any indexed
+        selector provides and filters it with the other selectors, so
+        the cost is proportional to that list, not to the model size.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.selectors = []
+
+    def where(self, selector):
+        self.selectors.append(selector)
+        return self
+
+    def kind(self, *kinds):
+        return self.where(KindSelector(kinds))
+
+    def name(self, pattern):
+        return self.where(NameSelector(pattern))
+
+    def package(self, pattern):
+        return self.where(PackageSelector(pattern))
+
+    def uses_type(self, type_name, indirect=False):
+        return self.where(UsesTypeSelector(type_name, indirect))
+
+    def tag(self, tag, pattern=None):
+        return self.where(TagSelector(tag, pattern))
+
+    def __iter__(self):
+        return iter(self.run())
+
+    def run(self):
+        """ Returns the list of matching declarations.
+        """
+        best = None
+        for selector in self.selectors:
+            candidates = selector.candidates(self.index)
+            if candidates is not None and (best is None or len(candidates) < len(best[1])):
+                best = (selector, candidates)
+        if best is None:
+            candidates, others = self.index.declarations, self.selectors
+        else:
+            candidates = best[1]
+            others = [selector for selector in self.selectors if selector is not best[0]]
+
+        result = []
+        for declaration in candidates:
+            if all(selector.matches(self.index, declaration) for selector in others):
+                result.append(declaration)
+        return result
+
+def declaration_to_dict(declaration):
+    coord = declaration.coord
+    return {
+        'kind': declaration.kind,
+        'name': declaration.name,
+        'qualified_name': declaration.qualified_name,
+        'package': declaration.package,
+        'file': declaration.document.filename,
+        'line': coord.line,
+        'column': coord.column,
+    }
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Query the declarations of a set of Franca models. All given selectors must match.')
+    argparser.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+    argparser.add_argument('--kind', action='append', choices=KINDS,
+                           help='declaration kind, may be given more than once')
+    argparser.add_argument('--name', help='glob pattern for the name, or the qualified name if it contains a "."')
+    argparser.add_argument('--package', help='glob pattern for the package, e.g. "a.b.*"')
+    argparser.add_argument('--uses-type', metavar='TYPE',
+                           help='declarations that use TYPE, themselves or through their members')
+    argparser.add_argument('--indirect', action='store_true',
+                           help='with --uses-type, also follow uses through other types')
+    argparser.add_argument('--tag', metavar='TAG[=PATTERN]',
+                           help='comment tag, optionally with a glob pattern for its value')
+    argparser.add_argument('--format', choices=('text', 'json'), default='text')
+    args = argparser.parse_args(argv)
+
+    model_set = ModelSet.load(args.paths)
+    for filename, msg, line, column in model_set.errors:
+        print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+
+    query = ModelIndex(model_set).query()
+    if args.kind:
+        query.kind(*args.kind)
+    if args.name:
+        query.name(args.name)
+    if args.package:
+        query.package(args.package)
+    if args.uses_type:
+        query.uses_type(args.uses_type, args.indirect)
+    if args.tag:
+        tag, _, pattern = args.tag.partition('=')
+        query.tag(tag, pattern or None)
+
+    result = query.run()
+    if args.format == 'json':
+        json.dump([declaration_to_dict(declaration) for declaration in result], sys.stdout, indent=2)
+        print()
+    else:
+        for declaration in result:
+            print('%-14s %s  (%s)' % (declaration.kind, declaration.qualified_name, declaration.coord))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
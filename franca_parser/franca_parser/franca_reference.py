@@ -0,0 +1,673 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_reference.py
+#
+# ReferenceGenerator class: Renders a standalone API reference of a ModelSet,
+#                           as HTML or Markdown pages.
+#
+# Every interface and type collection gets a page documenting its members
+# with their Franca comments (<** @description: ... **>). Type names link
+# to the declaration they resolve to, on its page. index.html (index.md)
+# lists the pages by package, and search-index.json lists every declaration
+# for the search box of the HTML pages. The index is sorted by lower case
+# name, so the search finds the declarations starting with a prefix by
+# binary search, even with tens of thousands of declarations.
+#
+# The site is built incrementally. A manifest in the output directory keeps
+# the input hash of every page: the structural hash of its interface or type
+# collection, comments included (see franca_compat), and the declarations
+# its type names link to. Only pages whose hash changed are rendered again,
+# in parallel on forked processes, which inherit the model set, or on
+# threads on free-threaded builds. Pages do not link to each other except
+# through type names and the index, so adding a page does not change the
+# others. Pages of removed interfaces and type collections are deleted.
+#
+# Run 'python -m franca_parser.franca_reference --help' for the command line
+# interface. ReferenceGenerator can also be run by franca_generator and the
+# watch mode, which render the pages of the affected roots only, then the
+# index, the search index and the assets (see Generator.finish()). Pages of
+# removed roots are only deleted by build().
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from collections import OrderedDict
+
+from . import franca_ast
+from .franca_compat import StructuralHasher
+from .franca_depgraph import DependencyGraph
+from .franca_generator import Generator
+from .franca_model import (BASIC_TYPES, ROOT_KINDS, ModelSet, expression_text, method_arguments,
+                           typename_text, version_of)
+from .franca_parser import _cpu_count, gil_enabled
+
+# Part of every page hash. Increase it when the pages change, so they are
+# all rendered again.
+GENERATOR_VERSION = 1
+
+MANIFEST = '.franca-reference.json'
+SEARCH_INDEX = 'search-index.json'
+
+# Declaration kinds left out of the search index. Method arguments would
+# make up a large part of it and are found through their methods.
+UNSEARCHED_KINDS = frozenset(('argument',))
+
+# Sections of a page: title, member kinds. Members are listed in source
+# order within their section.
+SECTIONS = (
+    ('Attributes', ('attribute',)),
+    ('Methods', ('method',)),
+    ('Broadcasts', ('broadcast',)),
+    ('Constants', ('constant',)),
+    ('Types', ('struct', 'union', 'enumeration', 'map', 'typedef', 'array')),
+)
+
+SUMMARY_LENGTH = 120
+
+def doc_text(comment):
+    """ Returns the description of a FrancaComment (the whole text if it
+        has no tags), with leading '*' removed from its lines. Empty for
+        None.
+    """
+    if comment is None:
+        return ''
+    tags = comment.tags
+    text = tags.get('description', '') if tags else comment.text
+    return '\n'.join(line.strip().lstrip('*').strip() for line in text.splitlines()).strip()
+
+def summary(comment):
+    """ Returns the first sentence of the description of a FrancaComment,
+        at most SUMMARY_LENGTH characters long.
+    """
+    text = ' '.join(doc_text(comment).split())
+    end = text.find('. ')
+    if end >= 0:
+        text = text[:end + 1]
+    if len(text) > SUMMARY_LENGTH:
+        text = text[:SUMMARY_LENGTH - 3].rstrip() + '...'
+    return text
+
+def _paragraphs(text):
+    paragraphs, lines = [], []
+    for line in text.splitlines() + ['']:
+        if line:
+            lines.append(line)
+        elif lines:
+            paragraphs.append(lines)
+            lines = []
+    return paragraphs
+
+class HtmlWriter(object):
+    """ Formats the parts of a page as HTML. Text arguments are plain
+        text, fragment arguments are the results of other methods.
+    """
+    format = 'html'
+    extension = '.html'
+
+    STYLESHEET = 'style.css'
+    SEARCH_SCRIPT = 'search.js'
+
+    def escape(self, text):
+        return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                .replace('"', '&quot;'))
+
+    def code(self, text, href=None):
+        fragment = '<code>%s</code>' % self.escape(text)
+        if href is not None:
+            fragment = '<a href="%s">%s</a>' % (self.escape(href), fragment)
+        return fragment
+
+    def link(self, text, href):
+        return '<a href="%s">%s</a>' % (self.escape(href), self.escape(text))
+
+    def heading(self, level, text, anchor=None):
+        attributes = ' id="%s"' % self.escape(anchor) if anchor is not None else ''
+        return '<h%d%s>%s</h%d>' % (level, attributes, self.escape(text), level)
+
+    def doc(self, text):
+        return '\n'.join('<p>%s</p>' % '<br>\n'.join(self.escape(line) for line in lines)
+                         for lines in _paragraphs(text))
+
+    def facts(self, items):
+        """ items: (label text, fragment) """
+        if not items:
+            return ''
+        return '<dl class="facts">%s</dl>' % ''.join(
+            '<dt>%s</dt><dd>%s</dd>' % (self.escape(label), fragment) for label, fragment in items)
+
+    def table(self, headers, rows, anchors=None):
+        """ rows: lists of fragments, anchors: the anchor of every row """
+        lines = ['<table>', '<tr>%s</tr>' % ''.join('<th>%s</th>' % self.escape(header) for header in headers)]
+        for index, row in enumerate(rows):
+            attributes = ''
+            if anchors is not None:
+                attributes = ' id="%s"' % self.escape(anchors[index])
+            lines.append('<tr%s>%s</tr>' % (attributes, ''.join('<td>%s</td>' % cell for cell in row)))
+        lines.append('</table>')
+        return '\n'.join(lines)
+
+    def cell(self, text):
+        return '<br>'.join(self.escape(line) for line in text.splitlines())
+
+    def page(self, title, body):
+        return ''.join([
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n',
+            '<title>%s</title>\n' % self.escape(title),
+            '<link rel="stylesheet" href="%s">\n</head>\n<body>\n' % self.STYLESHEET,
+            '<nav><a href="index.html">Index</a>\n',
+            '<input id="search" type="search" placeholder="Search" autocomplete="off">\n',
+            '<ul id="search-results"></ul></nav>\n<main>\n',
+            '\n'.join(part for part in body if part),
+            '\n</main>\n<script src="%s"></script>\n</body>\n</html>\n' % self.SEARCH_SCRIPT,
+        ])
+
+    def assets(self):
+        """ Returns the (filename, content) of the static files the pages
+            use.
+        """
+        return [(self.STYLESHEET, _STYLESHEET), (self.SEARCH_SCRIPT, _SEARCH_SCRIPT)]
+
+class MarkdownWriter(object):
+    """ Formats the parts of a page as (GitHub flavored) Markdown, see
+        HtmlWriter. Anchors are HTML <a id> tags, as Markdown has none.
+    """
+    format = 'markdown'
+    extension = '.md'
+
+    _special = '\\`*_[]<>|'
+
+    def escape(self, text):
+        return ''.join('\\' + c if c in self._special else c for c in text)
+
+    def code(self, text, href=None):
+        fragment = '`%s`' % text
+        if href is not None:
+            fragment = '[%s](%s)' % (fragment, href)
+        return fragment
+
+    def link(self, text, href):
+        return '[%s](%s)' % (self.escape(text), href)
+
+    def _anchor(self, anchor):
+        return '<a id="%s"></a>' % anchor.replace('"', '&quot;')
+
+    def heading(self, level, text, anchor=None):
+        line = '#' * level + ' ' + self.escape(text)
+        if anchor is not None:
+            line = self._anchor(anchor) + '\n\n' + line
+        return line
+
+    def doc(self, text):
+        # descriptions may be written in Markdown already
+        return '\n\n'.join('\n'.join(lines) for lines in _paragraphs(text))
+
+    def facts(self, items):
+        if not items:
+            return ''
+        return '\n'.join('- **%s:** %s' % (self.escape(label), fragment) for label, fragment in items)
+
+    def table(self, headers, rows, anchors=None):
+        lines = ['| %s |' % ' | '.join(self.escape(header) for header in headers),
+                 '|' + ' --- |' * len(headers)]
+        for index, row in enumerate(rows):
+            row = list(row)
+            if anchors is not None:
+                row[0] = self._anchor(anchors[index]) + row[0]
+            lines.append('| %s |' % ' | '.join(row))
+        return '\n'.join(lines)
+
+    def cell(self, text):
+        return '<br>'.join(line.replace('|', '\\|') for line in text.splitlines())
+
+    def page(self, title, body):
+        return '\n\n'.join(['[Index](index.md)'] + [part for part in body if part]) + '\n'
+
+    def assets(self):
+        return []
+
+WRITERS = OrderedDict((writer.format, writer) for writer in (HtmlWriter, MarkdownWriter))
+
+class PageRenderer(object):
+    """ Renders the page of an interface or type collection with a writer
+        (HtmlWriter or MarkdownWriter). Type names are resolved with
+        graph, a DependencyGraph.
+    """
+    def __init__(self, writer, graph):
+        self.writer = writer
+        self.graph = graph
+
+    def page_name(self, root):
+        return root.qualified_name + self.writer.extension
+
+    def href(self, declaration):
+        """ Returns the link to a declaration, on the page of its root.
+        """
+        return '%s#%s' % (self.page_name(declaration.root()), declaration.qualified_name)
+
+    def link_targets(self, declaration, type_name):
+        """ Returns the link of type_name referenced from declaration, or
+            None if it is a basic type, unresolved or ambiguous.
+        """
+        if type_name in BASIC_TYPES:
+            return None
+        targets = self.graph.resolve(declaration, type_name)
+        return self.href(targets[0]) if len(targets) == 1 else None
+
+    def render(self, root):
+        w = self.writer
+        facts = [('Package', w.code(root.package or '-')),
+                 ('Defined in', w.code(root.document.filename))]
+        version = version_of(root.node)
+        if version is not None:
+            facts.append(('Version', w.code('%d.%d' % version)))
+        base = getattr(root.node, 'base', None)
+        if base is not None:
+            facts.append(('Extends', self._type(root, base)))
+        body = [w.heading(1, '%s %s' % (root.kind, root.name), root.qualified_name)]
+        body.extend(self._doc(root))
+        body.append(w.facts(facts))
+        members = root.members()
+        for title, kinds in SECTIONS:
+            section = [member for member in members if member.kind in kinds]
+            if section:
+                body.append(w.heading(2, title))
+                for member in section:
+                    body.extend(self._member(member))
+        return w.page(root.qualified_name, body)
+
+    def _doc(self, declaration):
+        """ The parts documenting declaration: the description and the
+            other tags of its comment.
+        """
+        w = self.writer
+        comment = declaration.comment
+        if comment is None:
+            return []
+        tags = [(tag, w.escape(value)) for tag, value in sorted(comment.tags.items()) if tag != 'description']
+        return [w.doc(doc_text(comment)), w.facts(tags)]
+
+    def _type(self, declaration, typename):
+        element = typename
+        while isinstance(element.typename, franca_ast.ArrayTypeDeclaration):
+            element = element.typename.type
+        return self.writer.code(typename_text(typename), self.link_targets(declaration, element.typename))
+
+    def _member(self, member):
+        w = self.writer
+        node = member.node
+        facts = []
+        tables = []
+        if member.kind == 'attribute':
+            facts.append(('Type', self._type(member, node.typename)))
+        elif member.kind == 'constant':
+            facts.append(('Type', self._type(member, node.typename)))
+            facts.append(('Value', w.code(expression_text(node.value))))
+        elif member.kind in ('method', 'broadcast'):
+            if getattr(node, 'is_fire_and_forget', False):
+                facts.append(('Call', w.escape('fireAndForget, there is no reply')))
+            if getattr(node, 'is_selective', False):
+                facts.append(('Broadcast', w.escape('selective')))
+            arguments = dict((argument.node, argument) for argument in member.members())
+            for title, nodes in zip(('In', 'Out'), method_arguments(node)):
+                if nodes:
+                    tables.append(w.heading(4, title))
+                    tables.append(self._table(['Name', 'Type', 'Description'],
+                                              [arguments[argument] for argument in nodes], anchors=False))
+        elif member.kind in ('struct', 'union'):
+            if node.base is not None:
+                facts.append(('Extends', self._type(member, node.base)))
+            if getattr(node, 'is_polymorphic', False):
+                facts.append(('Polymorphic', w.escape('yes')))
+            tables.append(self._table(['Name', 'Type', 'Description'], member.members()))
+        elif member.kind == 'enumeration':
+            if node.base is not None:
+                facts.append(('Extends', self._type(member, node.base)))
+            tables.append(self._table(['Name', 'Value', 'Description'], member.members()))
+        elif member.kind == 'map':
+            facts.append(('Key', self._type(member, node.key_type)))
+            facts.append(('Value', self._type(member, node.value_type)))
+        elif member.kind == 'typedef':
+            facts.append(('Type', self._type(member, node.existing_type)))
+        elif member.kind == 'array':
+            facts.append(('Element type', self._type(member, node.type)))
+        return ([w.heading(3, '%s %s' % (member.kind, member.name), member.qualified_name)] +
+                self._doc(member) + [w.facts(facts)] + tables)
+
+    def _table(self, headers, declarations, anchors=True):
+        """ A table of fields, enumerators or arguments: name, type or
+            value, description.
+        """
+        w = self.writer
+        rows = []
+        for declaration in declarations:
+            node = declaration.node
+            if declaration.kind == 'enumerator':
+                second = w.code(expression_text(node.value)) if node.value is not None else ''
+            else:
+                second = self._type(declaration, node.typename if declaration.kind == 'field' else node.type)
+            rows.append([w.code(declaration.name), second, w.cell(doc_text(declaration.comment))])
+        if not rows:
+            return ''
+        return w.table(headers, rows, [declaration.qualified_name for declaration in declarations]
+                                      if anchors else None)
+
+    def render_index(self, roots):
+        """ The index page, listing roots by package.
+        """
+        w = self.writer
+        body = [w.heading(1, 'API reference')]
+        packages = OrderedDict()
+        for root in sorted(roots, key=lambda root: (root.package, root.name)):
+            packages.setdefault(root.package, []).append(root)
+        for package, members in packages.items():
+            body.append(w.heading(2, package or '(no package)'))
+            body.append(w.table(['Name', 'Kind', 'Description'], [
+                [w.link(root.name, self.page_name(root)), w.escape(root.kind), w.cell(summary(root.comment))]
+                for root in members]))
+        return w.page('API reference', body)
+
+def search_index(renderer, model_set):
+    """ Returns the search index of model_set as a JSON serializable
+        dictionary:
+
+            pages:   page filenames
+            kinds:   declaration kinds
+            entries: [name, qualified name, kind index, page index, summary]
+                     per declaration, sorted by lower case name
+
+        The link of an entry is pages[page index] + '#' + qualified name.
+    """
+    pages, kinds, entries = {}, {}, []
+    for declaration in model_set.declarations():
+        if declaration.kind in UNSEARCHED_KINDS:
+            continue
+        page = pages.setdefault(renderer.page_name(declaration.root()), len(pages))
+        kind = kinds.setdefault(declaration.kind, len(kinds))
+        entries.append([declaration.name, declaration.qualified_name, kind, page,
+                        summary(declaration.comment)])
+    entries.sort(key=lambda entry: (entry[0].lower(), entry[1]))
+    return {
+        'version': GENERATOR_VERSION,
+        'pages': sorted(pages, key=pages.get),
+        'kinds': sorted(kinds, key=kinds.get),
+        'entries': entries,
+    }
+
+class BuildResult(object):
+    """ The outcome of a ReferenceGenerator.build(): the rendered and
+        the unchanged pages and the removed files, as lists of filenames.
+    """
+    def __init__(self, rendered, unchanged, removed):
+        self.rendered = rendered
+        self.unchanged = unchanged
+        self.removed = removed
+
+class ReferenceGenerator(Generator):
+    """ Generates the reference pages of interfaces and type collections
+        in directory. generate() renders one page and finish() the index,
+        the search index and the assets, build() the whole site
+        incrementally.
+
+        format:
+            'html' or 'markdown'.
+    """
+    name = 'reference'
+    uses_comments = True
+
+    def __init__(self, directory='reference', format='html'):
+        if format not in WRITERS:
+            raise ValueError('unknown format %r' % format)
+        self.directory = directory
+        self.format = format
+        self.writer = WRITERS[format]()
+        self._graph = None
+
+    def renderer(self, model_set):
+        """ Returns a PageRenderer for model_set. Its DependencyGraph is
+            kept until model_set changes.
+        """
+        graph = self._graph
+        if graph is None or graph[0] is not model_set or graph[1] != model_set.revision:
+            graph = self._graph = (model_set, model_set.revision, DependencyGraph(model_set))
+        return PageRenderer(self.writer, graph[2])
+
+    def outputs(self, root):
+        return [os.path.join(self.directory, root.qualified_name + self.writer.extension)]
+
+    def generate(self, root, model_set):
+        self._write_page(self.renderer(model_set), root)
+
+    def finish(self, model_set):
+        renderer = self.renderer(model_set)
+        return [os.path.join(self.directory, filename)
+                for filename, content in self._write_site_files(renderer, model_set, self._roots(renderer, model_set))]
+
+    def _roots(self, renderer, model_set):
+        roots = OrderedDict()
+        for declaration in model_set.declarations():
+            if declaration.kind in ROOT_KINDS:
+                # if two files declare the same root, the last one wins
+                roots[renderer.page_name(declaration)] = declaration
+        return roots
+
+    def _write_site_files(self, renderer, model_set, roots):
+        # The files covering all pages: the index, the search index and
+        # the assets of the format. Returns them as (filename, content).
+        files = [('index' + self.writer.extension, renderer.render_index(list(roots.values()))),
+                 (SEARCH_INDEX, json.dumps(search_index(renderer, model_set), separators=(',', ':')))]
+        files.extend(self.writer.assets())
+        for filename, content in files:
+            self.write(os.path.join(self.directory, filename), content)
+        return files
+
+    def _write_page(self, renderer, root):
+        return self.write(os.path.join(self.directory, renderer.page_name(root)), renderer.render(root))
+
+    def page_hash(self, renderer, root, hasher):
+        """ Returns the input hash of the page of root: everything the
+            page is rendered from. hasher is a StructuralHasher including
+            comments.
+        """
+        h = hashlib.sha1(('%d\0%s\0%s\0%s\0%s' % (
+            GENERATOR_VERSION, self.format, root.qualified_name, root.document.filename,
+            hasher.hash(root.node))).encode('utf-8'))
+        pending = [root]
+        while pending:
+            declaration = pending.pop()
+            for type_name in declaration.type_refs:
+                h.update(('\0%s=%s' % (type_name, renderer.link_targets(declaration, type_name))).encode('utf-8'))
+            pending.extend(declaration.members())
+        return h.hexdigest()
+
+    def build(self, model_set, jobs=1, force=False):
+        """ Renders the pages of model_set whose input hash changed since
+            the last build, the index and the search index, and deletes
+            the files of the last build that are no longer generated,
+            e.g. the pages of removed roots. Returns a BuildResult.
+
+            jobs:
+                Number of pages rendered in parallel, None for the number
+                of CPUs.
+
+            force:
+                Render all pages.
+        """
+        renderer = self.renderer(model_set)
+        manifest_file = os.path.join(self.directory, MANIFEST)
+        old_hashes, old_files = {}, []
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+            old_files = list(manifest['pages']) + manifest['files']
+            if manifest['format'] == self.format:
+                old_hashes = manifest['pages']
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        roots = self._roots(renderer, model_set)
+        hasher = StructuralHasher(include_comments=True)
+        hashes = OrderedDict((page, self.page_hash(renderer, root, hasher)) for page, root in roots.items())
+        stale = [page for page, digest in hashes.items()
+                 if force or old_hashes.get(page) != digest or
+                    not os.path.exists(os.path.join(self.directory, page))]
+
+        if jobs is None:
+            jobs = _cpu_count()
+        jobs = min(jobs, len(stale))
+        if jobs <= 1:
+            for page in stale:
+                self._write_page(renderer, roots[page])
+        elif gil_enabled() and hasattr(os, 'fork'):
+            self._build_forked(renderer, [roots[page] for page in stale], jobs)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(lambda page: self._write_page(renderer, roots[page]), stale))
+
+        files = self._write_site_files(renderer, model_set, roots)
+
+        # e.g. the pages of removed roots, or all of them if the format
+        # changed
+        generated = set(hashes).union(filename for filename, content in files)
+        removed = sorted(set(filename for filename in old_files if filename not in generated))
+        for filename in removed:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                pass
+        self.write(manifest_file, json.dumps(
+            {'version': GENERATOR_VERSION, 'format': self.format, 'pages': hashes,
+             'files': [filename for filename, content in files]}, indent=1, sort_keys=True))
+        stale = set(stale)
+        return BuildResult(sorted(stale), sorted(page for page in hashes if page not in stale), removed)
+
+    def _build_forked(self, renderer, roots, jobs):
+        # The workers are forked after the hashes are computed, so they
+        # share the model set and its DependencyGraph with this process.
+        # They write the pages themselves.
+        global _forked
+        import multiprocessing
+        if hasattr(multiprocessing, 'get_context'):
+            multiprocessing = multiprocessing.get_context('fork')
+        _forked = (self, renderer, roots)
+        try:
+            pool = multiprocessing.Pool(jobs)
+            try:
+                pool.map(_write_forked_page, range(len(roots)), max(1, len(roots) // (jobs * 4)))
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _forked = None
+
+_forked = None
+
+def _write_forked_page(index):
+    generator, renderer, roots = _forked
+    return generator._write_page(renderer, roots[index])
+
+_STYLESHEET = """\
+body { font-family: sans-serif; margin: 0; display: flex; }
+nav { width: 18em; padding: 1em; border-right: 1px solid #ddd; position: sticky; top: 0; height: 100vh; overflow: auto; box-sizing: border-box; }
+nav input { width: 100%; margin-top: 1em; }
+nav ul { list-style: none; padding: 0; font-size: small; }
+nav li { margin: .3em 0; }
+main { padding: 1em 2em; max-width: 60em; }
+h3 { border-top: 1px solid #eee; padding-top: 1em; }
+dl.facts { display: grid; grid-template-columns: max-content auto; gap: .2em 1em; }
+dl.facts dt { font-weight: bold; }
+dl.facts dd { margin: 0; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ddd; padding: .3em .6em; text-align: left; vertical-align: top; }
+:target { background: #ffd; }
+"""
+
+# Loads search-index.json on the first input. Entries starting with the
+# query are found by binary search, then entries whose qualified name
+# contains it are added, up to MAX_RESULTS.
+_SEARCH_SCRIPT = """\
+(function () {
+  var MAX_RESULTS = 50;
+  var input = document.getElementById('search');
+  var results = document.getElementById('search-results');
+  var index = null, keys = null;
+
+  function load(callback) {
+    if (index) { callback(); return; }
+    var request = new XMLHttpRequest();
+    request.open('GET', 'search-index.json');
+    request.onload = function () {
+      index = JSON.parse(request.responseText);
+      keys = index.entries.map(function (entry) { return entry[0].toLowerCase(); });
+      callback();
+    };
+    request.send();
+  }
+
+  function search(query) {
+    var low = 0, high = keys.length, found = [], i;
+    while (low < high) {
+      var middle = (low + high) >> 1;
+      if (keys[middle] < query) { low = middle + 1; } else { high = middle; }
+    }
+    for (i = low; i < keys.length && found.length < MAX_RESULTS && keys[i].lastIndexOf(query, 0) === 0; i++) {
+      found.push(index.entries[i]);
+    }
+    for (i = 0; i < keys.length && found.length < MAX_RESULTS; i++) {
+      if (keys[i].lastIndexOf(query, 0) !== 0 && index.entries[i][1].toLowerCase().indexOf(query) >= 0) {
+        found.push(index.entries[i]);
+      }
+    }
+    return found;
+  }
+
+  input.addEventListener('input', function () {
+    var query = input.value.trim().toLowerCase();
+    results.innerHTML = '';
+    if (!query) { return; }
+    load(function () {
+      if (input.value.trim().toLowerCase() !== query) { return; }
+      search(query).forEach(function (entry) {
+        var item = document.createElement('li');
+        var link = document.createElement('a');
+        link.href = index.pages[entry[3]] + '#' + entry[1];
+        link.textContent = entry[1];
+        item.appendChild(link);
+        item.appendChild(document.createTextNode(' ' + index.kinds[entry[2]] + (entry[4] ? ': ' + entry[4] : '')));
+        results.appendChild(item);
+      });
+    });
+  });
+})();
+"""
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Generate an HTML or Markdown API reference of Franca models.')
+    argparser.add_argument('paths', nargs='+', help='.fidl files or directories to search recursively')
+    argparser.add_argument('-o', '--output', default='reference', metavar='DIRECTORY',
+                           help="output directory, 'reference' by default")
+    argparser.add_argument('--format', choices=list(WRITERS), default='html')
+    argparser.add_argument('-j', '--jobs', type=int, help='number of pages rendered in parallel, the number of CPUs by default')
+    argparser.add_argument('--force', action='store_true', help='render all pages, not only the changed ones')
+    args = argparser.parse_args(argv)
+
+    model_set = ModelSet.load(args.paths)
+    for filename, msg, line, column in model_set.errors:
+        print('%s:%s:%s: %s' % (filename, line, column, msg), file=sys.stderr)
+
+    # files that do not parse are left out, the others are documented
+    result = ReferenceGenerator(args.output, args.format).build(model_set, args.jobs, args.force)
+    print('%d pages rendered, %d unchanged, %d files removed' % (
+        len(result.rendered), len(result.unchanged), len(result.removed)))
+    return 1 if model_set.errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
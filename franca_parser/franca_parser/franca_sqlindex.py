@@ -0,0 +1,653 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_sqlindex.py
+#
+# SqliteIndex class: A persistent index of the declarations of a tree of
+#                    Franca models in an SQLite database, for answering
+#                    questions like "where is type X defined and used" over
+#                    large model repositories without parsing them or
+#                    keeping their ASTs in memory.
+#
+# The index holds the files with their package and imports, the
+# declarations (interfaces, types, members, arguments, ...) with their
+# position, base and Franca comment, the comment tags, the type references
+# and the parse errors. update() only parses files whose content hash
+# changed since they were indexed, in batches, and drops the ASTs again.
+# Files are stored by their normalized path relative to the directory of the
+# database, so it does not matter how the paths given to update() (or to the
+# queries) are spelled.
+#
+# Example:
+#
+#   with SqliteIndex('models.db') as index:
+#       index.update(['models/'])
+#       for declaration in index.definitions('Point'):
+#           print(declaration.qualified_name, declaration.file)
+#       for reference in index.uses('Point'):
+#           print(reference.declaration.qualified_name, reference.line)
+#
+# Run 'python -m franca_parser.franca_sqlindex --help' for the command line
+# interface.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+from collections import namedtuple
+
+from . import franca_ast
+from .franca_inheritance import base_name
+from .franca_model import REFERENCE_KINDS, ModelDocument, find_fidl_files
+from .franca_parser import FrancaParser
+from .franca_query import KINDS, _is_pattern
+
+# Bumped whenever the tables change. An index written with another version
+# is rebuilt from scratch.
+SCHEMA_VERSION = 2
+
+SCHEMA = '''
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL,
+    package TEXT NOT NULL
+);
+CREATE TABLE imports (
+    file_id INTEGER NOT NULL,
+    namespace TEXT NOT NULL,
+    imported_file TEXT NOT NULL,
+    imported_path TEXT NOT NULL
+);
+CREATE TABLE declarations (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    qualified_name TEXT NOT NULL,
+    line INTEGER,
+    column INTEGER,
+    base TEXT
+);
+CREATE TABLE comments (
+    declaration_id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE tags (
+    declaration_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE type_refs (
+    declaration_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    type_name TEXT NOT NULL,
+    simple_name TEXT NOT NULL,
+    line INTEGER,
+    column INTEGER
+);
+CREATE TABLE errors (
+    file_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    line INTEGER,
+    column INTEGER
+);
+CREATE INDEX imports_file ON imports (file_id);
+CREATE INDEX imports_path ON imports (imported_path);
+CREATE INDEX declarations_file ON declarations (file_id);
+CREATE INDEX declarations_parent ON declarations (parent_id);
+CREATE INDEX declarations_name ON declarations (name, kind);
+CREATE INDEX declarations_qualified_name ON declarations (qualified_name);
+CREATE INDEX declarations_kind ON declarations (kind);
+CREATE INDEX comments_file ON comments (file_id);
+CREATE INDEX tags_tag ON tags (tag, value);
+CREATE INDEX tags_file ON tags (file_id);
+CREATE INDEX type_refs_name ON type_refs (simple_name);
+CREATE INDEX type_refs_declaration ON type_refs (declaration_id);
+CREATE INDEX type_refs_file ON type_refs (file_id);
+CREATE INDEX errors_file ON errors (file_id);
+'''
+
+# Tables with rows belonging to a file, deleted when it is reindexed.
+_FILE_TABLES = ('imports', 'declarations', 'comments', 'tags', 'type_refs', 'errors')
+
+IndexedFile = namedtuple('IndexedFile', 'path hash package')
+
+IndexedDeclaration = namedtuple(
+    'IndexedDeclaration', 'id kind name qualified_name package file line column parent_id base')
+
+# A reference to a type by a declaration, e.g. the type of a field. line
+# and column are those of the type name.
+TypeReference = namedtuple('TypeReference', 'declaration type_name line column')
+
+IndexedError = namedtuple('IndexedError', 'file message line column')
+
+# Result of SqliteIndex.update(): the lists of (re)indexed and removed
+# files and the number of files that were unchanged.
+UpdateResult = namedtuple('UpdateResult', 'indexed removed unchanged')
+
+_DECLARATION_COLUMNS = ('d.id, d.kind, d.name, d.qualified_name, f.package, f.path, '
+                        'd.line, d.column, d.parent_id, d.base')
+
+_DECLARATION_SELECT = 'SELECT %s FROM declarations d JOIN files f ON f.id = d.file_id' % _DECLARATION_COLUMNS
+
+def content_hash(text):
+    """ Returns the hash update() compares to tell whether a file
+        changed.
+    """
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+class _ReferenceCollector(franca_ast.NodeVisitor):
+    """ Collects the (Declaration, Typename node) pairs of a ModelDocument,
+        the same references DeclarationCollector records by name in
+        Declaration.type_refs, but with the nodes for their coordinates.
+    """
+    def __init__(self, document):
+        self._declarations = dict((id(declaration.node), declaration)
+                                  for declaration in document.declarations)
+        self._parents = []
+        self.references = []
+
+    def visit_Typename(self, node):
+        if isinstance(node.typename, franca_ast.Node):
+            # implicit array, e.g. UInt8[]
+            return self.generic_visit(node)
+        if self._parents:
+            self.references.append((self._parents[-1], node))
+
+    def generic_visit(self, node):
+        declaration = self._declarations.get(id(node))
+        if declaration is None:
+            return franca_ast.NodeVisitor.generic_visit(self, node)
+        self._parents.append(declaration)
+        franca_ast.NodeVisitor.generic_visit(self, node)
+        self._parents.pop()
+
+class SqliteIndex(object):
+    """ An SQLite index of Franca models.
+
+        path:
+            The database file, created if it does not exist. ':memory:'
+            keeps the index in memory.
+
+        parser:
+            The FrancaParser to parse changed files with, created on
+            first use if not given.
+
+        root:
+            The directory the paths of the indexed files are stored
+            relative to (see stored_path()), by default the directory of
+            the database, or the current directory for ':memory:'.
+
+        Names are matched like in franca_query: patterns may contain the
+        glob wildcards * ? and [], and names containing a '.' are matched
+        against the qualified name.
+    """
+    def __init__(self, path, parser=None, root=None):
+        self.path = path
+        self.parser = parser
+        if root is None:
+            root = os.getcwd() if path == ':memory:' else os.path.dirname(os.path.abspath(path))
+        self.root = os.path.abspath(root)
+        self.connection = sqlite3.connect(path)
+        # plain str on Python 2 as well, like the rest of the model
+        self.connection.text_factory = str
+        self._create()
+
+    def _create(self):
+        cursor = self.connection.cursor()
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return
+        tables = [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            cursor.execute('DROP TABLE %s' % table)
+        cursor.executescript(SCHEMA)
+        cursor.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_parser(self):
+        if self.parser is None:
+            self.parser = FrancaParser()
+        return self.parser
+
+    def stored_path(self, filename):
+        """ Returns the path filename is indexed under: normalized and
+            relative to root, e.g. 'models/a.fidl' for './models/a.fidl'
+            or an absolute path to the same file.
+        """
+        filename = os.path.abspath(filename)
+        try:
+            return os.path.relpath(filename, self.root)
+        except ValueError:
+            # on another drive than root
+            return filename
+
+    ##
+    ## Updating
+    ##
+
+    def update(self, paths, max_workers=None, prune=True, batch_size=256):
+        """ Bring the index up to date with the .fidl files in paths
+            (files or directories). Files whose content hash did not
+            change are not parsed. max_workers is passed on to
+            FrancaParser.parse_many(), batch_size is the number of files
+            parsed (and held in memory) at a time.
+
+            prune:
+                If True, indexed files that are no longer in paths are
+                removed from the index.
+
+            Returns an UpdateResult, with the stored paths of the files.
+        """
+        known = dict(self.connection.execute('SELECT path, hash FROM files'))
+        present = set()
+        indexed, unchanged, batch = [], 0, []
+        for filename in find_fidl_files(paths):
+            path = self.stored_path(filename)
+            if path in present:
+                # the same file given twice, e.g. as 'a.fidl' and './a.fidl'
+                continue
+            present.add(path)
+            with open(filename) as f:
+                text = f.read()
+            digest = content_hash(text)
+            if known.get(path) == digest:
+                unchanged += 1
+                continue
+            batch.append((path, text, digest))
+            if len(batch) >= batch_size:
+                indexed.extend(self._index_batch(batch, max_workers))
+                batch = []
+        indexed.extend(self._index_batch(batch, max_workers))
+
+        removed = []
+        if prune:
+            removed = sorted(path for path in known if path not in present)
+            for path in removed:
+                self._remove(path)
+            self.connection.commit()
+        return UpdateResult(indexed, removed, unchanged)
+
+    def index_source(self, filename, text):
+        """ Index text as the contents of filename, e.g. an unsaved
+            editor buffer. Returns False if the index already has this
+            content for filename.
+        """
+        filename = self.stored_path(filename)
+        digest = content_hash(text)
+        row = self.connection.execute('SELECT hash FROM files WHERE path = ?', (filename,)).fetchone()
+        if row is not None and row[0] == digest:
+            return False
+        self._index_batch([(filename, text, digest)], 1)
+        return True
+
+    def remove(self, filename):
+        """ Remove a file from the index. Returns False if it was not
+            indexed.
+        """
+        found = self._remove(self.stored_path(filename))
+        self.connection.commit()
+        return found
+
+    def _remove(self, filename):
+        row = self.connection.execute('SELECT id FROM files WHERE path = ?', (filename,)).fetchone()
+        if row is None:
+            return False
+        self._clear(row[0])
+        self.connection.execute('DELETE FROM files WHERE id = ?', row)
+        return True
+
+    def _clear(self, file_id):
+        for table in _FILE_TABLES:
+            self.connection.execute('DELETE FROM %s WHERE file_id = ?' % table, (file_id,))
+
+    def _index_batch(self, batch, max_workers):
+        if not batch:
+            return []
+        hashes = dict((filename, digest) for filename, text, digest in batch)
+        results = self._get_parser().parse_many(
+            [(filename, text) for filename, text, digest in batch], max_workers)
+        for result in results:
+            self._index_result(result, hashes[result.filename])
+        self.connection.commit()
+        return [result.filename for result in results]
+
+    def _index_result(self, result, digest):
+        execute = self.connection.execute
+        document = ModelDocument(result.filename, result.document) if result.document is not None else None
+        package = document.package if document is not None else ''
+
+        row = execute('SELECT id FROM files WHERE path = ?', (result.filename,)).fetchone()
+        if row is None:
+            file_id = execute('INSERT INTO files (path, hash, package) VALUES (?, ?, ?)',
+                              (result.filename, digest, package)).lastrowid
+        else:
+            file_id = row[0]
+            self._clear(file_id)
+            execute('UPDATE files SET hash = ?, package = ? WHERE id = ?', (digest, package, file_id))
+
+        self.connection.executemany(
+            'INSERT INTO errors (file_id, message, line, column) VALUES (?, ?, ?, ?)',
+            [(file_id, msg, line, column) for msg, line, column in result.errors])
+        if document is None:
+            return
+
+        self.connection.executemany(
+            'INSERT INTO imports (file_id, namespace, imported_file, imported_path) VALUES (?, ?, ?, ?)',
+            [(file_id, namespace, imported_file, document.resolve_import(imported_file))
+             for namespace, imported_file in document.imports])
+
+        # explicit ids, so the rows can be inserted with executemany()
+        next_id = execute('SELECT COALESCE(MAX(id), 0) + 1 FROM declarations').fetchone()[0]
+        ids = {}
+        declarations, comments, tags = [], [], []
+        line_starts = None
+        for declaration in document.declarations:
+            declaration_id = ids[declaration] = next_id
+            next_id += 1
+            coord = declaration.coord
+            declarations.append((
+                declaration_id, file_id, ids.get(declaration.parent), declaration.kind,
+                declaration.name, declaration.qualified_name, coord.line, coord.column,
+                base_name(declaration)))
+            comment = declaration.comment
+            if comment is None:
+                continue
+            if line_starts is None:
+                line_starts = _line_starts(comment.source)
+            comments.append((declaration_id, file_id, comment.start, comment.end,
+                             bisect.bisect_right(line_starts, comment.start), comment.text))
+            tags.extend((declaration_id, file_id, tag, value) for tag, value in sorted(comment.tags.items()))
+        self.connection.executemany(
+            'INSERT INTO declarations (id, file_id, parent_id, kind, name, qualified_name, line, column, base) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', declarations)
+        self.connection.executemany(
+            'INSERT INTO comments (declaration_id, file_id, start, stop, line, text) VALUES (?, ?, ?, ?, ?, ?)',
+            comments)
+        self.connection.executemany(
+            'INSERT INTO tags (declaration_id, file_id, tag, value) VALUES (?, ?, ?, ?)', tags)
+
+        collector = _ReferenceCollector(document)
+        collector.visit(document.ast)
+        self.connection.executemany(
+            'INSERT INTO type_refs (declaration_id, file_id, type_name, simple_name, line, column) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(ids[declaration], file_id, node.typename, node.typename.rsplit('.', 1)[-1],
+              node.coord.line if node.coord is not None else None,
+              node.coord.column if node.coord is not None else None)
+             for declaration, node in collector.references])
+
+    ##
+    ## Queries
+    ##
+
+    def files(self, package=None):
+        """ Returns the IndexedFiles, optionally only those of the
+            packages matching a glob pattern.
+        """
+        sql, parameters = 'SELECT path, hash, package FROM files', ()
+        if package is not None:
+            sql, parameters = sql + ' WHERE package GLOB ?', (package,)
+        return [IndexedFile(*row) for row in self.connection.execute(sql + ' ORDER BY path', parameters)]
+
+    def declarations(self, kind=None, name=None, package=None, tag=None, file=None):
+        """ Returns the IndexedDeclarations matching all given criteria,
+            in file and source order.
+
+            kind:
+                A declaration kind or a sequence of them.
+
+            name, package:
+                Glob patterns for the name and the package.
+
+            tag:
+                'TAG' or 'TAG=PATTERN', for declarations whose comment
+                has the tag, with a value matching PATTERN.
+
+            file:
+                Path of the file.
+        """
+        conditions, parameters = [], []
+        if kind is not None:
+            kinds = (kind,) if isinstance(kind, str) else tuple(kind)
+            conditions.append('d.kind IN (%s)' % ', '.join('?' * len(kinds)))
+            parameters.extend(kinds)
+        if name is not None:
+            column = 'd.qualified_name' if '.' in name else 'd.name'
+            conditions.append('%s %s ?' % (column, 'GLOB' if _is_pattern(name) else '='))
+            parameters.append(name)
+        if package is not None:
+            conditions.append('f.package %s ?' % ('GLOB' if _is_pattern(package) else '='))
+            parameters.append(package)
+        if tag is not None:
+            tag, _, pattern = tag.partition('=')
+            sql = 'd.id IN (SELECT declaration_id FROM tags WHERE tag = ?'
+            parameters.append(tag)
+            if pattern:
+                sql += ' AND value GLOB ?'
+                parameters.append(pattern)
+            conditions.append(sql + ')')
+        if file is not None:
+            conditions.append('f.path = ?')
+            parameters.append(self.stored_path(file))
+        sql = _DECLARATION_SELECT
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return self._declarations(sql + ' ORDER BY f.path, d.id', parameters)
+
+    def _declarations(self, sql, parameters=()):
+        return [IndexedDeclaration(*row) for row in self.connection.execute(sql, parameters)]
+
+    def declaration(self, declaration_id):
+        result = self._declarations(_DECLARATION_SELECT + ' WHERE d.id = ?', (declaration_id,))
+        return result[0] if result else None
+
+    def definitions(self, type_name):
+        """ Returns the declarations of the types (and interfaces) called
+            type_name. A qualified name, e.g. 'Common.Point', must match
+            the end of the qualified name of the type.
+        """
+        simple_name = type_name.rsplit('.', 1)[-1]
+        kinds = sorted(REFERENCE_KINDS)
+        result = self._declarations(
+            _DECLARATION_SELECT + ' WHERE d.name = ? AND d.kind IN (%s) ORDER BY f.path, d.id' %
+            ', '.join('?' * len(kinds)), [simple_name] + kinds)
+        if '.' in type_name:
+            result = [declaration for declaration in result
+                      if declaration.qualified_name == type_name or
+                         declaration.qualified_name.endswith('.' + type_name)]
+        return result
+
+    def uses(self, type_name):
+        """ Returns the TypeReferences to types called type_name, e.g. the
+            fields, arguments, attributes and typedefs using it and the
+            types extending it. References are matched by the unqualified
+            name, as in franca_query.
+        """
+        simple_name = type_name.rsplit('.', 1)[-1]
+        rows = self.connection.execute(
+            'SELECT %s, r.type_name, r.line, r.column FROM type_refs r '
+            'JOIN declarations d ON d.id = r.declaration_id JOIN files f ON f.id = d.file_id '
+            'WHERE r.simple_name = ? ORDER BY f.path, r.line, r.column' % _DECLARATION_COLUMNS,
+            (simple_name,))
+        return [TypeReference(IndexedDeclaration(*row[:10]), row[10], row[11], row[12]) for row in rows]
+
+    def members(self, qualified_name):
+        """ Returns the declarations directly inside the declaration(s)
+            called qualified_name, e.g. the fields of a struct.
+        """
+        return self._declarations(
+            _DECLARATION_SELECT + ' WHERE d.parent_id IN '
+            '(SELECT id FROM declarations WHERE qualified_name = ?) ORDER BY f.path, d.id',
+            (qualified_name,))
+
+    def comment(self, declaration_id):
+        """ Returns the text of the Franca comment of a declaration, or
+            None.
+        """
+        row = self.connection.execute(
+            'SELECT text FROM comments WHERE declaration_id = ?', (declaration_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def tags(self, declaration_id):
+        """ Returns the {tag: value} dictionary of the comment of a
+            declaration.
+        """
+        return dict(self.connection.execute(
+            'SELECT tag, value FROM tags WHERE declaration_id = ?', (declaration_id,)))
+
+    def imports(self, path):
+        """ Returns the list of (namespace, imported path) tuples of an
+            indexed file.
+        """
+        return list(self.connection.execute(
+            'SELECT i.namespace, i.imported_path FROM imports i JOIN files f ON f.id = i.file_id '
+            'WHERE f.path = ? ORDER BY i.rowid', (self.stored_path(path),)))
+
+    def importers(self, path):
+        """ Returns the sorted list of the files importing path.
+        """
+        return [row[0] for row in self.connection.execute(
+            'SELECT DISTINCT f.path FROM imports i JOIN files f ON f.id = i.file_id '
+            'WHERE i.imported_path = ? ORDER BY f.path', (self.stored_path(path),))]
+
+    def errors(self):
+        """ Returns the IndexedErrors of all files that failed to parse.
+        """
+        return [IndexedError(*row) for row in self.connection.execute(
+            'SELECT f.path, e.message, e.line, e.column FROM errors e JOIN files f ON f.id = e.file_id '
+            'ORDER BY f.path, e.rowid')]
+
+def _line_starts(text):
+    """ Returns the offsets at which the lines of text start, for finding
+        the line of an offset with bisect.
+    """
+    starts = [0]
+    position = text.find('\n')
+    while position >= 0:
+        starts.append(position + 1)
+        position = text.find('\n', position + 1)
+    return starts
+
+def declaration_to_dict(declaration):
+    return {
+        'kind': declaration.kind,
+        'name': declaration.name,
+        'qualified_name': declaration.qualified_name,
+        'package': declaration.package,
+        'file': declaration.file,
+        'line': declaration.line,
+        'column': declaration.column,
+    }
+
+def _print_declarations(declarations, output_format):
+    if output_format == 'json':
+        json.dump([declaration_to_dict(declaration) for declaration in declarations], sys.stdout, indent=2)
+        print()
+    else:
+        for declaration in declarations:
+            print('%-14s %s  (%s:%s:%s)' % (declaration.kind, declaration.qualified_name,
+                                           declaration.file, declaration.line, declaration.column))
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Maintain and query an SQLite index of a set of Franca models.')
+    argparser.add_argument('database', help='index database file')
+    argparser.add_argument('--format', choices=('text', 'json'), default='text')
+    commands = argparser.add_subparsers(dest='command')
+
+    update = commands.add_parser('update', help='index the files that changed since the last update')
+    update.add_argument('paths', nargs='+', help='.fidl files or directories to index recursively')
+    update.add_argument('--keep', action='store_true',
+                        help='keep indexed files that are no longer in paths')
+    update.add_argument('--workers', type=int, default=None, help='number of parser threads')
+
+    find = commands.add_parser('find', help='where a type or interface is defined')
+    find.add_argument('name', help='type name, optionally qualified')
+
+    uses = commands.add_parser('uses', help='where a type is used')
+    uses.add_argument('name', help='type name')
+
+    query = commands.add_parser('query', help='declarations matching all given selectors')
+    query.add_argument('--kind', action='append', choices=KINDS,
+                       help='declaration kind, may be given more than once')
+    query.add_argument('--name', help='glob pattern for the name, or the qualified name if it contains a "."')
+    query.add_argument('--package', help='glob pattern for the package, e.g. "a.b.*"')
+    query.add_argument('--tag', metavar='TAG[=PATTERN]',
+                       help='comment tag, optionally with a glob pattern for its value')
+    query.add_argument('--file', help='path of an indexed file')
+
+    members = commands.add_parser('members', help='declarations inside a declaration')
+    members.add_argument('name', help='qualified name')
+
+    importers = commands.add_parser('importers', help='files importing a file')
+    importers.add_argument('path')
+
+    commands.add_parser('files', help='indexed files')
+    commands.add_parser('errors', help='parse errors of the indexed files')
+
+    args = argparser.parse_args(argv)
+    if args.command is None:
+        argparser.error('a command is required')
+
+    with SqliteIndex(args.database) as index:
+        if args.command == 'update':
+            result = index.update(args.paths, args.workers, prune=not args.keep)
+            print('%d indexed, %d unchanged, %d removed' % (
+                len(result.indexed), result.unchanged, len(result.removed)))
+        elif args.command == 'find':
+            _print_declarations(index.definitions(args.name), args.format)
+        elif args.command == 'uses':
+            references = index.uses(args.name)
+            if args.format == 'json':
+                json.dump([dict(declaration_to_dict(reference.declaration), type_name=reference.type_name,
+                                line=reference.line, column=reference.column)
+                           for reference in references], sys.stdout, indent=2)
+                print()
+            else:
+                for reference in references:
+                    print('%s:%s:%s: %s %s' % (reference.declaration.file, reference.line, reference.column,
+                                               reference.declaration.kind, reference.declaration.qualified_name))
+        elif args.command == 'query':
+            _print_declarations(index.declarations(args.kind, args.name, args.package, args.tag, args.file),
+                                args.format)
+        elif args.command == 'members':
+            _print_declarations(index.members(args.name), args.format)
+        elif args.command == 'importers':
+            for path in index.importers(args.path):
+                print(path)
+        elif args.command == 'files':
+            for indexed_file in index.files():
+                print('%s  %s' % (indexed_file.path, indexed_file.package))
+        elif args.command == 'errors':
+            for error in index.errors():
+                print('%s:%s:%s: %s' % (error.file, error.line, error.column, error.message))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,418 @@
+#------------------------------------------------------------------------------
+# franca_parser: franca_watch.py
+#
+# Watcher class: Watches a tree of Franca models, reparses the documents that
+#                changed and reruns the registered generators for the
+#                affected interfaces and type collections only.
+#
+# Files are monitored with inotify on Linux and by polling elsewhere. Bursts
+# of changes (e.g. an editor saving several files) are debounced into one
+# cycle. Unchanged documents are never reparsed; their ASTs stay cached in
+# the ModelSet. Within a changed document only the declarations whose
+# structural hash changed count as changed; comments are part of the hash if
+# a generator renders them (Generator.uses_comments).
+#
+# Run with 'python -m franca_parser.franca_watch MODELS --generator mod:name'.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from .franca_compat import StructuralHasher
+from .franca_depgraph import DependencyGraph
+from .franca_generator import load_generator, output_dependencies, write_depfile
+from .franca_model import FIDL_EXTENSION, TYPE_KINDS, ModelSet, find_fidl_files
+
+class PollingMonitor(object):
+    """ Detects changed .fidl files by comparing modification times and
+        sizes.
+    """
+    def __init__(self, paths, interval=0.5):
+        self.paths = paths
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for filename in find_fidl_files(self.paths):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            snapshot[filename] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """ Wait up to timeout seconds (forever if None) for changes and
+            return the set of changed, created or deleted files. An empty
+            set means the timeout expired.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = set(filename for filename in set(snapshot) | set(self._snapshot)
+                          if snapshot.get(filename) != self._snapshot.get(filename))
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return changed
+                time.sleep(min(self.interval, remaining))
+            else:
+                time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+class InotifyMonitor(object):
+    """ Detects changed .fidl files with Linux inotify (through ctypes).
+        All directories below the watched paths are watched, including
+        directories created later.
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0x00000800
+
+    _MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self, paths):
+        libc_name = ctypes.util.find_library('c')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # wd -> (directory, True if all its .fidl files are watched)
+        self._watches = {}
+        # single files given on the command line: path in event -> given path
+        self._files = {}
+        for path in paths:
+            if os.path.isdir(path):
+                self._add_tree(path)
+            else:
+                directory = os.path.dirname(path) or '.'
+                self._files[os.path.join(directory, os.path.basename(path))] = path
+                self._add_watch(directory, False)
+
+    def _add_tree(self, path):
+        """ Watch path and all directories below it. Returns the .fidl
+            files found in them.
+        """
+        found = []
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            self._add_watch(dirpath, True)
+            found.extend(os.path.join(dirpath, f) for f in filenames if f.endswith(FIDL_EXTENSION))
+        return found
+
+    def _add_watch(self, directory, whole_directory):
+        wd = self._libc.inotify_add_watch(self._fd, directory.encode(sys.getfilesystemencoding()), self._MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed for %s' % directory)
+        # a directory may be watched as a whole and for single files
+        previous = self._watches.get(wd)
+        self._watches[wd] = (directory, whole_directory or (previous is not None and previous[1]))
+
+    def _read_events(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return changed
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+                offset += length
+                watch = self._watches.get(wd)
+                if watch is None or not name:
+                    continue
+                directory, whole_directory = watch
+                path = os.path.join(directory, name)
+                if mask & self.IN_ISDIR:
+                    if whole_directory and mask & (self.IN_CREATE | self.IN_MOVED_TO) and not name.startswith('.'):
+                        # a new directory may already contain files
+                        changed.update(self._add_tree(path))
+                    continue
+                if not name.endswith(FIDL_EXTENSION) or mask & self.IN_CREATE:
+                    continue # for new files, wait for IN_CLOSE_WRITE
+                if whole_directory:
+                    changed.add(path)
+                elif path in self._files:
+                    changed.add(self._files[path])
+
+    def wait(self, timeout=None):
+        """ See PollingMonitor.wait().
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return set()
+            # events of other files (e.g. editor backups) don't count
+            changed = self._read_events()
+            if changed:
+                return changed
+
+    def close(self):
+        os.close(self._fd)
+
+def create_monitor(paths, polling=False, interval=0.5):
+    """ Returns an InotifyMonitor if possible, a PollingMonitor otherwise.
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyMonitor(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingMonitor(paths, interval)
+
+class CycleReport(object):
+    """ What happened in one watch cycle, with the time spent per phase
+        (in seconds).
+
+        latency:
+            Time from the first detected change to the end of the cycle,
+            including the debounce delay.
+    """
+    def __init__(self, number):
+        self.number = number
+        self.changed_files = []
+        self.reparsed = 0
+        self.errors = []
+        self.roots = []
+        self.outputs = []
+        self.parse_time = 0.0
+        self.analysis_time = 0.0
+        self.generate_time = 0.0
+        self.latency = 0.0
+
+    def __str__(self):
+        return ('cycle %d: %d file(s) changed, %d reparsed, %d root(s) affected, %d output(s) '
+                'regenerated; parse %.1f ms, analysis %.1f ms, generate %.1f ms, latency %.1f ms' % (
+                    self.number, len(self.changed_files), self.reparsed, len(self.roots),
+                    len(self.outputs), self.parse_time * 1000.0, self.analysis_time * 1000.0,
+                    self.generate_time * 1000.0, self.latency * 1000.0))
+
+class Watcher(object):
+    """ Keeps a ModelSet of a model tree up to date and reruns the
+        registered generators (see franca_generator.Generator) for the
+        interfaces and type collections affected by each change.
+
+        paths:
+            .fidl files or directories to watch.
+
+        debounce:
+            A cycle starts once no further change was seen for this many
+            seconds.
+
+        depfile:
+            If given, the .fidl files every output depends on are written
+            to this file (see franca_generator.write_depfile()) after
+            each generation.
+    """
+    def __init__(self, paths, generators=(), debounce=0.2, monitor=None, depfile=None):
+        self.paths = paths
+        self.generators = list(generators)
+        self.debounce = debounce
+        self.depfile = depfile
+        self.monitor = monitor
+        self.model_set = None
+        self.cycles = 0
+
+    def register(self, generator):
+        self.generators.append(generator)
+
+    def load(self):
+        """ Parse the whole tree. Returns the list of parse errors.
+        """
+        self.model_set = ModelSet.load(self.paths)
+        return list(self.model_set.errors)
+
+    def generate_all(self):
+        """ Run all generators for all roots. Returns the list of outputs.
+        """
+        roots = [declaration for declaration in self.model_set.declarations() if declaration.parent is None]
+        outputs = self._generate(roots)
+        self._write_depfile(DependencyGraph(self.model_set) if self.depfile else None)
+        return outputs
+
+    def _generate(self, roots):
+        outputs = []
+        for generator in self.generators:
+            for root in roots:
+                if generator.handles(root):
+                    generator.generate(root, self.model_set)
+                    outputs.extend(generator.outputs(root))
+            outputs.extend(generator.finish(self.model_set))
+        return outputs
+
+    def _write_depfile(self, graph):
+        if self.depfile:
+            write_depfile(self.depfile, output_dependencies(self.model_set, self.generators, graph=graph))
+
+    def process(self, paths, first_change=None):
+        """ Process a set of changed files: reparse them, find the
+            affected roots and regenerate their outputs. Returns a
+            CycleReport.
+        """
+        start = time.time()
+        self.cycles += 1
+        report = CycleReport(self.cycles)
+        report.changed_files = sorted(path for path in paths if path.endswith(FIDL_EXTENSION))
+        # Comment changes only count if a generator renders comments
+        hasher = StructuralHasher(include_comments=any(generator.uses_comments for generator in self.generators))
+
+        # Remember the declarations of the old revisions
+        old_hashes = {}
+        old_types = {}
+        for filename in report.changed_files:
+            document = self.model_set.documents.get(filename)
+            if document is None:
+                continue
+            old_types[filename] = []
+            for declaration in document.declarations:
+                old_hashes[declaration.qualified_name] = hasher.hash(declaration.node)
+                if declaration.kind in TYPE_KINDS:
+                    old_types[filename].append((declaration.qualified_name, declaration.name))
+
+        changed_documents = []
+        replaced_files = []
+        for filename in report.changed_files:
+            old = self.model_set.documents.get(filename)
+            if not os.path.exists(filename):
+                self.model_set.remove(filename)
+                replaced_files.append(filename)
+                continue
+            try:
+                document = self.model_set.parse_file(filename)
+            except (IOError, OSError, UnicodeDecodeError) as e:
+                self.model_set.set_errors(filename, [(str(e), None, None)])
+                document = None
+            report.reparsed += 1
+            if document is None:
+                if old is not None:
+                    # keep the last good revision until the file parses again
+                    self.model_set.restore(old)
+                continue
+            changed_documents.append(document)
+            replaced_files.append(filename)
+        changed_files = set(report.changed_files)
+        report.errors = [error for error in self.model_set.errors if error[0] in changed_files]
+        parsed = time.time()
+        report.parse_time = parsed - start
+
+        # Only declarations whose structure changed count as changed
+        changed = []
+        new_names = set()
+        for document in changed_documents:
+            for declaration in document.declarations:
+                new_names.add(declaration.qualified_name)
+                if old_hashes.get(declaration.qualified_name) != hasher.hash(declaration.node):
+                    changed.append(declaration)
+        removed = [name for filename in replaced_files for qualified_name, name in old_types.get(filename, ())
+                   if qualified_name not in new_names]
+        graph = DependencyGraph(self.model_set)
+        impact = graph.impact(changed_declarations=changed, removed_names=removed)
+        report.roots = sorted(impact.roots, key=lambda root: root.qualified_name)
+        analysed = time.time()
+        report.analysis_time = analysed - parsed
+
+        report.outputs = self._generate(report.roots)
+        self._write_depfile(graph)
+        end = time.time()
+        report.generate_time = end - analysed
+        report.latency = end - (first_change if first_change is not None else start)
+        return report
+
+    def wait_for_changes(self):
+        """ Block until files change, then keep collecting changes until
+            none was seen for self.debounce seconds. Returns the set of
+            changed files and the time of the first change.
+        """
+        changed = set(self.monitor.wait(None))
+        first_change = time.time()
+        while True:
+            more = self.monitor.wait(self.debounce)
+            if not more:
+                return changed, first_change
+            changed.update(more)
+
+    def run(self, out=sys.stdout, generate_initially=False):
+        """ Watch forever, printing a line per cycle to out.
+        """
+        start = time.time()
+        for filename, msg, line, column in self.load():
+            print('%s:%s:%s: %s' % (filename, line, column, msg), file=out)
+        print('loaded %d document(s) in %.1f ms' % (len(self.model_set.documents), (time.time() - start) * 1000.0), file=out)
+        if generate_initially:
+            outputs = self.generate_all()
+            print('generated %d output(s)' % len(outputs), file=out)
+        if self.monitor is None:
+            self.monitor = create_monitor(self.paths)
+        print('watching %s (%s)' % (', '.join(self.paths), self.monitor.__class__.__name__), file=out)
+        out.flush()
+        try:
+            while True:
+                changed, first_change = self.wait_for_changes()
+                report = self.process(changed, first_change)
+                for filename, msg, line, column in report.errors:
+                    print('%s:%s:%s: %s' % (filename, line, column, msg), file=out)
+                for root in report.roots:
+                    print('  affected %s %s' % (root.kind, root.qualified_name), file=out)
+                print(report, file=out)
+                out.flush()
+        finally:
+            self.monitor.close()
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Watch Franca models and rerun generators for the affected interfaces.')
+    argparser.add_argument('paths', nargs='+', help='.fidl files or directories to watch')
+    argparser.add_argument('--generator', action='append', default=[], metavar='MODULE:NAME',
+                           help='generator to run, a franca_generator.Generator subclass or factory')
+    argparser.add_argument('--debounce', type=float, default=0.2,
+                           help='seconds without changes before a cycle starts (default: 0.2)')
+    argparser.add_argument('--poll', action='store_true', help='poll instead of using inotify')
+    argparser.add_argument('--poll-interval', type=float, default=0.5)
+    argparser.add_argument('--initial', action='store_true',
+                           help='run all generators for all roots at startup')
+    argparser.add_argument('--depfile', metavar='FILE',
+                           help='keep the .fidl files every output depends on in FILE')
+    args = argparser.parse_args(argv)
+
+    generators = [load_generator(spec) for spec in args.generator]
+    monitor = create_monitor(args.paths, args.poll, args.poll_interval)
+    watcher = Watcher(args.paths, generators, args.debounce, monitor, args.depfile)
+    try:
+        watcher.run(generate_initially=args.initial)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
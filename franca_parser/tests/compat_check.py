@@ -0,0 +1,100 @@
+#------------------------------------------------------------------------------
+# franca_parser: tests/compat_check.py
+#
+# Runs the compatibility checker on every old/new pair of model trees in
+# compat/ and compares the reports with the changes expected below. Every
+# pair needs an entry in EXPECTED, and every entry a pair.
+#
+# Run with 'python compat_check.py' from this directory. Exits with status 1
+# if a report differs from the expected one.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath('..'))
+
+from franca_parser.franca_compat import BREAKING, COMPATIBLE, check_compatibility
+from franca_parser.franca_model import ModelSet
+
+COMPAT_DIR = 'compat'
+
+# pair -> (compatible, versions ok, number of unchanged roots, roots), the
+# roots as (kind, name, status, required bump, changes), the changes as
+# (severity, path, message).
+EXPECTED = {
+    'added_method': (True, True, 0, [
+        ('interface', 'p.Player', 'changed', 'minor', [
+            (COMPATIBLE, 'p.Player.pause', 'method added'),
+        ]),
+    ]),
+    'comments': (True, True, 1, []),
+    'constants': (False, False, 0, [
+        ('typeCollection', 'p.Codes', 'changed', 'major', [
+            (BREAKING, 'p.Codes.Code.A', 'enumerator value changed from 10 to 20'),
+            (BREAKING, 'p.Codes.Code.B', 'enumerator value changed from 11 to 21'),
+            (BREAKING, 'p.Limits.BASE', 'uses changed constant p.Limits.BASE'),
+        ]),
+        ('typeCollection', 'p.Limits', 'changed', 'major', [
+            (BREAKING, 'p.Limits.BASE', 'value changed from 10 to 20'),
+        ]),
+    ]),
+    'removed_field': (False, False, 0, [
+        ('interface', 'p.Service', 'changed', 'major', [
+            (BREAKING, 'p.Types.Point', 'uses changed type p.Types.Point'),
+        ]),
+        ('typeCollection', 'p.Types', 'changed', 'major', [
+            (BREAKING, 'p.Types.Point.y', 'member removed'),
+        ]),
+    ]),
+}
+
+def load(path):
+    model_set = ModelSet.load([path])
+    for filename, msg, line, column in model_set.errors:
+        print('%s:%s:%s: %s' % (filename, line, column, msg))
+    return model_set
+
+def summary(report):
+    return (report.compatible, report.versions_ok, report.unchanged, [
+        (root.kind, root.name, root.status, root.required_bump,
+         [(change.severity, change.path, change.message) for change in root.changes])
+        for root in report.roots])
+
+def check_pair(name):
+    path = os.path.join(COMPAT_DIR, name)
+    old, new = load(os.path.join(path, 'old')), load(os.path.join(path, 'new'))
+    if old.errors or new.errors:
+        return False
+    actual = summary(check_compatibility(old, new))
+    if actual == EXPECTED[name]:
+        return True
+    print('expected: %r' % (EXPECTED[name],))
+    print('actual:   %r' % (actual,))
+    return False
+
+def main():
+    pairs = sorted(name for name in os.listdir(COMPAT_DIR) if os.path.isdir(os.path.join(COMPAT_DIR, name)))
+    failures = 0
+    for name in sorted(set(pairs) | set(EXPECTED)):
+        if name not in EXPECTED:
+            ok = False
+            print('no expected changes for %s' % name)
+        elif name not in pairs:
+            ok = False
+            print('no models for %s' % name)
+        else:
+            ok = check_pair(name)
+        print('%s  %s' % ('ok  ' if ok else 'FAIL', name))
+        failures += not ok
+    if failures:
+        print('%d pair(s) failed' % failures)
+        return 1
+    print('all pairs passed')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#------------------------------------------------------------------------------
+# franca_parser: tests/constant_references_check.py
+#
+# Checks that references in the values of constants and enumerators, e.g.
+# 'A = Limits.BASE', are edges of the DependencyGraph: a change to the file
+# declaring a constant affects the type collections using it, and an
+# enumeration referenced only from the value of a constant is not reported
+# as unused.
+#
+# Run with 'python constant_references_check.py' from this directory.
+# Exits with status 1 if a check fails.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath('..'))
+
+from franca_parser.franca_depgraph import DependencyGraph
+from franca_parser.franca_lint import Linter, UnusedTypeRule
+from franca_parser.franca_model import ModelSet
+
+CONSTANTS_DIR = os.path.join('compat', 'constants', 'new')
+
+COLORS = '''package p
+
+typeCollection Colors {
+    version { major 1 minor 0 }
+    enumeration Color {
+        kRed = 1
+        kGreen = kRed + 1
+    }
+    enumeration Unused {
+        kNone
+    }
+}
+
+typeCollection Defaults {
+    version { major 1 minor 0 }
+    const UInt32 DEFAULT_COLOR = Colors.Color.kGreen
+}
+'''
+
+failures = []
+
+def check(condition, description):
+    print('%s  %s' % ('ok  ' if condition else 'FAIL', description))
+    if not condition:
+        failures.append(description)
+
+def qualified_names(declarations):
+    return set(declaration.qualified_name for declaration in declarations)
+
+def check_fixture():
+    model_set = ModelSet.load([CONSTANTS_DIR])
+    check(not model_set.errors, 'the constants fixture parses')
+    graph = DependencyGraph(model_set)
+    limits = os.path.join(CONSTANTS_DIR, 'limits.fidl')
+    codes = os.path.join(CONSTANTS_DIR, 'codes.fidl')
+
+    impact = graph.impact(changed_files=[limits])
+    check('p.Codes' in qualified_names(impact.roots),
+          'a change to limits.fidl affects p.Codes')
+    check('p.Codes.Code.A' in qualified_names(impact.declarations),
+          'a change to limits.fidl affects p.Codes.Code.A')
+    check('p.Limits.BASE' in qualified_names(graph.dependencies(graph.find('p.Codes'))),
+          'p.Codes depends on p.Limits.BASE')
+    check(limits in graph.file_dependencies(codes),
+          'codes.fidl depends on limits.fidl')
+    check(not graph.unresolved, 'all references resolve')
+
+def check_enumerators():
+    model_set = ModelSet()
+    model_set.parse('colors.fidl', COLORS)
+    graph = DependencyGraph(model_set)
+
+    impact = graph.impact(changed_declarations=['p.Colors.Color.kRed'])
+    check('p.Defaults' in qualified_names(impact.roots),
+          'a change to an enumerator affects the constants using the enumeration')
+
+    unused = [diagnostic.message for diagnostic in Linter([UnusedTypeRule()]).lint(model_set)]
+    check(unused == ['enumeration Unused is not used'],
+          'an enumeration used by a constant is not reported as unused (got %r)' % unused)
+
+check_fixture()
+check_enumerators()
+
+if failures:
+    print('%d check(s) failed' % len(failures))
+    sys.exit(1)
+print('all checks passed')
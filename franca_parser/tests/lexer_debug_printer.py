@@ -1,3 +1,5 @@
+from __future__ import print_function
+
 import os
 import sys
 sys.path.insert(0, os.path.abspath('..'))
@@ -21,15 +23,15 @@ class FrancaLexerDebugPrinter(object):
     def token(self):
         return self.franca_lexer.token()
     
-    def on_error(self, error):
-        print "error: " + error
+    def on_error(self, msg, line, column):
+        print("error: %s:%s: %s" % (line, column, msg))
     
     def print_tokens(self):
         while True:
             tok = self.token()
             if not tok:
                 break # no more input
-            print tok
+            print(tok)
 
 lexer_printer = FrancaLexerDebugPrinter()
 lexer_printer.input(input_text)
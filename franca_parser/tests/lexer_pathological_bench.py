@@ -0,0 +1,104 @@
+#------------------------------------------------------------------------------
+# franca_parser: tests/lexer_pathological_bench.py
+#
+# Lexes inputs built to make backtracking regular expressions blow up (huge
+# comments, long star runs, banner comments, unterminated comments and
+# strings, strings full of escapes) at doubling sizes and checks that the
+# lexing time grows linearly with the size of the input.
+#
+# Run with 'python lexer_pathological_bench.py [size]' from this directory,
+# size being the smallest input size in characters. Exits with status 1 if
+# the lexing time grows superlinearly: by more than MAX_GROWTH on two
+# consecutive doublings of the input size. Single doublings are too noisy
+# to judge on their own.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import math
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath('..'))
+
+from franca_parser.franca_lexer import FrancaLexer
+
+# Number of input sizes, each twice the previous one.
+STEPS = 4
+
+# Number of times every input is lexed, the best time counts.
+REPEATS = 5
+
+# Allowed growth of the lexing time when the input size doubles. Linear
+# lexing stays around 2, quadratic lexing grows by 4, and the old regular
+# expressions grew exponentially on some of these.
+MAX_GROWTH = 3.0
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+def repeat(unit, size):
+    return unit * (size // len(unit) + 1)
+
+def banner(size):
+    line = '/' + '*' * 78 + '/\n<** ' + '*' * 72 + ' **>\n'
+    return repeat(line, size) + 'package org.example\n'
+
+CASES = [
+    ('huge Franca comment', lambda size: '<** ' + repeat('lorem ipsum\n', size) + '**>'),
+    ('huge C comment', lambda size: '/* ' + repeat('lorem ipsum\n', size) + '*/'),
+    ('star run in Franca comment', lambda size: '<**' + '*' * size + ' **>'),
+    ('star run in C comment', lambda size: '/*' + '*' * size + '/'),
+    ('single stars before >', lambda size: '<** ' + repeat('*> ', size) + '**>'),
+    ('banner comments', banner),
+    ('unterminated Franca comment', lambda size: '<**' + repeat('*\n', size)),
+    ('unterminated C comment', lambda size: '/*' + repeat('*\n', size)),
+    ('repeated comment openers', lambda size: repeat('<** /* ', size)),
+    ('string of escapes', lambda size: '"' + repeat('\\x1f\\123', size) + '"'),
+    ('unterminated string of escapes', lambda size: '"' + repeat('\\1', size)),
+    ('unterminated strings of quotes', lambda size: repeat('"' + '\\"' * 64 + '\n', size)),
+]
+
+def lex(lexer, text):
+    """ Returns the time to lex text and the number of errors.
+    """
+    errors = []
+    clone = lexer.clone(lambda msg, line, column: errors.append(msg))
+    clone.input(text)
+    start = _clock()
+    while clone.token() is not None:
+        pass
+    return _clock() - start, len(errors)
+
+def main(argv):
+    # smaller inputs fit into the CPU caches while the larger ones do
+    # not, which makes the time jump between two of the sizes
+    size = int(argv[1]) if len(argv) > 1 else 400000
+
+    lexer = FrancaLexer(lambda msg, line, column: None)
+    lexer.build()
+
+    failures = []
+    for name, make in CASES:
+        times = []
+        for step in range(STEPS):
+            text = make(size << step)
+            elapsed, errors = min(lex(lexer, text) for round in range(REPEATS))
+            times.append(max(elapsed, 1e-9))
+        growths = [times[i + 1] / times[i] for i in range(STEPS - 1)]
+        # exponent of the time as a function of the input size, 1 for
+        # linear lexing
+        exponent = math.log(times[-1] / times[0], 2) / (STEPS - 1)
+        print('%-32s %9d chars: %7.3f s, %5.1f MB/s, %d errors, growth %s, exponent %.2f' % (
+            name, len(text), elapsed, len(text) / elapsed / 1e6, errors,
+            ' '.join('%.2f' % growth for growth in growths), exponent))
+        if any(growths[i] > MAX_GROWTH and growths[i + 1] > MAX_GROWTH for i in range(len(growths) - 1)):
+            failures.append(name)
+
+    if failures:
+        print('superlinear: %s' % ', '.join(failures))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
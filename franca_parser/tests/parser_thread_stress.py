@@ -0,0 +1,96 @@
+#------------------------------------------------------------------------------
+# franca_parser: tests/parser_thread_stress.py
+#
+# Hammers one shared FrancaParser from many threads and checks that every
+# parse produces the same AST (including coordinates) and the same errors as
+# a sequential parse of the same source. Then parses the batch again with
+# FrancaParser.parse_many() and reports its throughput for a few pool sizes;
+# on free-threaded builds these should scale with the number of workers.
+#
+# Run with 'python parser_thread_stress.py [threads] [rounds]' from this
+# directory. Exits with status 1 on a mismatch.
+#
+# Copyright (C) 2016, Ingmar Lehmann
+# License: BSD
+#------------------------------------------------------------------------------
+from __future__ import print_function
+
+import os
+import re
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath('..'))
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from franca_parser.franca_parser import FrancaParser, gil_enabled
+
+FIDL_DIR = 'fidl'
+
+def load_sources(copies=4):
+    """ The .fidl fixtures, each under a few different filenames so mixed
+        up coordinates between concurrent parses show up in the dumps.
+    """
+    sources = []
+    for name in sorted(os.listdir(FIDL_DIR)):
+        with open(os.path.join(FIDL_DIR, name)) as f:
+            text = f.read()
+        for copy in range(copies):
+            sources.append(('%d/%s' % (copy, name), text))
+    return sources
+
+def dump(result):
+    buf = StringIO()
+    if result.document is not None:
+        result.document.show(buf, attrnames=True, showcoord=True)
+    # nodes held in attributes print with their address
+    return re.sub(r' at 0x[0-9a-fA-F]+', '', buf.getvalue()), result.errors
+
+def hammer(parser, sources, expected, rounds, offset, failures):
+    for round in range(rounds):
+        for index in range(len(sources)):
+            # every thread walks the sources from a different offset
+            source = sources[(index + round + offset) % len(sources)]
+            result = parser._parse_source(source)
+            if dump(result) != expected[source[0]]:
+                failures.append(source[0])
+
+def main(argv):
+    threads = int(argv[1]) if len(argv) > 1 else 16
+    rounds = int(argv[2]) if len(argv) > 2 else 20
+
+    parser = FrancaParser()
+    sources = load_sources()
+    expected = dict((result.filename, dump(result))
+                    for result in parser.parse_many(sources, max_workers=1))
+
+    failures = []
+    workers = [threading.Thread(target=hammer, args=(parser, sources, expected, rounds, offset, failures))
+               for offset in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start
+    print('%d threads x %d parses: %d mismatches in %.2f s' % (
+        threads, rounds * len(sources), len(failures), elapsed))
+
+    batch = sources * 10
+    print('parse_many, %d sources, GIL %s:' % (len(batch), 'enabled' if gil_enabled() else 'disabled'))
+    for max_workers in (1, 2, 4, 8):
+        start = time.time()
+        results = parser.parse_many(batch, max_workers)
+        elapsed = time.time() - start
+        mismatches = sum(1 for result in results if dump(result) != expected[result.filename])
+        failures.extend([None] * mismatches)
+        print('  %d workers: %.3f s, %d mismatches' % (max_workers, elapsed, mismatches))
+
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))